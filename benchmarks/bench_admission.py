@@ -0,0 +1,123 @@
+"""
+Admission micro-benchmark: per-message overhead on traffic the bot ignores.
+
+Compares the checks on_message used to run inline (strip, per-message closure, mentions list scan,
+metric and debug-log calls) with MessageAdmission.admit on a mix of other bots' messages, chatter in
+channels the bot only answers when addressed, replies to other users and empty messages.
+
+    python -m benchmarks.bench_admission --messages 20000
+"""
+import argparse
+import logging
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.fake_discord import FakeChannel, FakeGuild, FakeMessage, FakeUser
+from bot.admission import MessageAdmission
+from bot.intent import is_pr_request
+from bot.metrics import Metrics
+
+CHATTER = [
+    "anyone up for lunch?", "lol", "did the build go green", "brb", "pushed the fix, can someone review",
+    "the standup notes are in the doc", "👍", "meeting moved to 3", "who broke main again",
+]
+
+logger = logging.getLogger("DiscordBot")
+
+
+class LegacyAdmission:
+    """The admission part of on_message before the admission stage existed."""
+
+    def __init__(self, bot_user, channel_id, metrics):
+        self.user = bot_user
+        self.target_channel_id = channel_id
+        self.metrics = metrics
+
+    def admit(self, message):
+        if message.author.bot:
+            return "ignored"
+        self.metrics.count("gideon_messages_total", outcome="received")
+        content = message.content.strip()
+        if not content:
+            return "ignored"
+        main_channel_id = self.target_channel_id
+        in_main_channel = (message.channel.id == main_channel_id)
+
+        def is_reply_to_bot(msg):
+            return msg.reference and hasattr(msg.reference, "resolved") and getattr(msg.reference.resolved, "author", None) == self.user
+
+        explicitly_mentioned = self.user in message.mentions
+        replying_to_bot = is_reply_to_bot(message)
+        if not in_main_channel and not (explicitly_mentioned or replying_to_bot):
+            logger.debug(f"Ignoring message {message.id} in #{message.channel.name}: not main channel, not mentioned, not a reply to me")
+            self.metrics.count("gideon_messages_total", outcome="ignored")
+            return "ignored"
+        if is_pr_request(content.lower()):
+            return "pr_request"
+        return "accept"
+
+
+def ignored_traffic(rng, count, bot_user):
+    guild = FakeGuild()
+    channels = [FakeChannel(name, guild, bot_user) for name in ("random", "dev", "ops", "memes")]
+    humans = [FakeUser(f"user{i}") for i in range(20)]
+    other_bot = FakeUser("Dyno", bot=True)
+    messages = []
+    for _ in range(count):
+        channel = rng.choice(channels)
+        roll = rng.random()
+        if roll < 0.25:
+            messages.append(FakeMessage(rng.choice(CHATTER), other_bot, channel))
+        elif roll < 0.3:
+            messages.append(FakeMessage("", rng.choice(humans), channel))
+        elif roll < 0.45:
+            # A reply, but to another user
+            parent = SimpleNamespace(author=rng.choice(humans))
+            reference = SimpleNamespace(resolved=parent)
+            messages.append(FakeMessage(rng.choice(CHATTER), rng.choice(humans), channel, reference=reference))
+        else:
+            mentioned = rng.sample(humans, rng.randint(0, 2))
+            text = " ".join(f"<@{u.id}>" for u in mentioned) + " " + rng.choice(CHATTER)
+            messages.append(FakeMessage(text, rng.choice(humans), channel, mentions=mentioned))
+    return messages
+
+
+def bench(admit, messages, passes):
+    t0 = time.perf_counter()
+    for _ in range(passes):
+        for message in messages:
+            admit(message)
+    return (time.perf_counter() - t0) / (passes * len(messages))
+
+
+def main(args):
+    logging.getLogger("Admission").setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    rng = random.Random(args.seed)
+    bot_user = FakeUser("Gideon", bot=True)
+    main_channel_id = 1
+    messages = ignored_traffic(rng, args.messages, bot_user)
+
+    legacy = LegacyAdmission(bot_user, main_channel_id, Metrics(enabled=args.metrics))
+    admission = MessageAdmission(bot_user.id, channel_ids=[main_channel_id], wake_words=args.wake_words)
+    assert {legacy.admit(m) for m in messages} == {"ignored"}
+    assert {admission.admit(m) for m in messages} <= {"ignored_bot", "ignored_empty", "ignored_channel"}
+
+    results = [
+        ("inline checks", bench(legacy.admit, messages, args.passes)),
+        ("MessageAdmission", bench(admission.admit, messages, args.passes)),
+    ]
+    print(f"{'admission':<20}{'ns/msg':>10}")
+    for name, seconds in results:
+        print(f"{name:<20}{seconds * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--passes", type=int, default=5)
+    parser.add_argument("--metrics", action="store_true", help="count legacy outcomes into enabled metrics")
+    parser.add_argument("--wake-words", nargs="*", default=[], help="also build the wake-word automaton")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,319 @@
+"""
+Offline load test: replays a message trace through GideonBot.on_message against a local fake
+OpenAI server and fake Discord channels, then reports throughput, end-to-end and per-stage
+latency percentiles, and upstream calls per message.
+
+    python -m benchmarks.bench_load --messages 300 --rate 40
+    python -m benchmarks.bench_load --trace trace.jsonl --streaming --error-rate 0.05
+    python -m benchmarks.bench_load --messages 300 --rate 40 --json out.json --max-p95-ms 900
+
+A trace is JSON lines: {"content": "...", "channel": "general", "author": "alice", "at": 1.25,
+"mention": true}. Only content is required; "at" (seconds from start) is used unless --rate is
+given. Messages outside the main channel (the first channel seen) only get an answer when they
+mention the bot, as in production.
+
+Exits non-zero when --max-p95-ms is given and the end-to-end p95 exceeds it, so it can gate changes.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+
+import discord
+
+from benchmarks.fake_discord import FakeChannel, FakeGuild, FakeMessage, FakeUser
+from benchmarks.fake_openai import FakeOpenAIServer
+from bot.intent import IntentClassifier
+from bot.main import GideonBot
+from bot.metrics import Metrics
+from bot.openai_client import OpenAIClient
+from bot.request_executor import RequestExecutor
+from bot.response_cache import ResponseCache
+
+SYNTHETIC = {
+    "ASSISTANT": [
+        "what's the capital of portugal?", "give me three ideas for a team lunch",
+        "how many days until christmas?", "summarize the plot of dune in two lines",
+    ],
+    "DEVELOPER": [
+        "why does this python code raise KeyError on the second loop?",
+        "can you review my refactor of the auth middleware?", "how do I deploy with zero downtime?",
+    ],
+    "EVENT": [
+        "schedule a meeting with the design team next tuesday at 3pm",
+        "set a reminder event for the release on friday at 10",
+    ],
+}
+PERSONA_MIX = [("ASSISTANT", 0.6), ("DEVELOPER", 0.3), ("EVENT", 0.1)]
+QUIET_LOGGERS = (
+    "DiscordBot", "OpenAI", "Prompts", "Scheduler", "HistoryCache", "Context", "Intent", "EventCache",
+    "EventMatcher", "RequestExecutor", "ResponseCache", "ResponseParser", "Streaming", "Metrics", "discord",
+)
+
+
+class RecordingMetrics(Metrics):
+    """Metrics that also keeps every raw sample, so the report can give exact percentiles."""
+
+    def __init__(self):
+        super().__init__(enabled=True)
+        self.samples = defaultdict(list)
+
+    def observe(self, name, value, **labels):
+        super().observe(name, value, **labels)
+        stage = labels.get("stage")
+        if stage is None:
+            key = name.replace("gideon_", "").replace("_seconds", "")
+        elif "call" in labels:
+            key = f"{stage}: {labels['call']}"
+        else:
+            key = stage
+        self.samples[key].append(value)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def load_trace(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_trace(count, channels, users, rng):
+    personas, weights = zip(*PERSONA_MIX)
+    trace = []
+    for i in range(count):
+        persona = rng.choices(personas, weights)[0]
+        trace.append({
+            "content": f"{rng.choice(SYNTHETIC[persona])} (#{i})",
+            "channel": f"channel-{rng.randrange(channels)}",
+            "author": f"user-{rng.randrange(users)}",
+        })
+    return trace
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.metrics = RecordingMetrics()
+        self.server = FakeOpenAIServer(
+            router_latency=args.router_latency, persona_latency=args.persona_latency,
+            token_interval=args.token_interval, error_rate=args.error_rate, seed=args.seed,
+        )
+        self.guild = FakeGuild()
+        self.bot_user = FakeUser("Gideon", bot=True)
+        self.channels = {}
+        self.users = {}
+        self.submitted_at = {}
+        self.latencies = []
+        self.outstanding = set()
+        self.done = asyncio.Event()
+        self.outcomes = defaultdict(int)
+
+    def _channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = FakeChannel(
+                name, self.guild, self.bot_user, send_latency=self.args.send_latency, echo=self.bot.on_message
+            )
+            self.channels[name] = channel
+        return channel
+
+    def _user(self, name):
+        user = self.users.get(name)
+        if user is None:
+            user = self.users[name] = FakeUser(name)
+        return user
+
+    async def _timed_handler(self, message, content, message_ids):
+        try:
+            await self.handler(message, content, message_ids)
+        finally:
+            now = time.perf_counter()
+            for mid in message_ids:
+                self.latencies.append(now - self.submitted_at[mid])
+                self.outstanding.discard(mid)
+            if not self.outstanding and self.replay_finished:
+                self.done.set()
+
+    def _build_bot(self):
+        args = self.args
+        client = OpenAIClient(
+            api_key="bench",
+            routing_mode=args.routing_mode,
+            intent_classifier=IntentClassifier() if args.classifier else None,
+            streaming=args.streaming,
+            response_cache=ResponseCache(),
+            executor=RequestExecutor(max_retries=args.max_retries, base_delay=0.05, max_delay=1.0),
+            metrics=self.metrics,
+            api_url=self.server.url,
+        )
+        self.bot = GideonBot(channel_id=0, openai_client=client, metrics=self.metrics, intents=discord.Intents.none())
+        self.bot._connection.user = self.bot_user
+        self.bot.stream_edit_interval = args.edit_interval
+        scheduler = self.bot.scheduler
+        scheduler.max_concurrency = args.concurrency
+        scheduler.max_pending = args.max_pending
+        scheduler.coalesce_window = args.coalesce_window
+        self.handler = scheduler.handler
+        scheduler.handler = self._timed_handler
+
+    async def _deliver(self, item):
+        channel = self._channel(item.get("channel", "general"))
+        mention = item.get("mention", channel.id != self.bot.target_channel_id)
+        content = f"<@{self.bot_user.id}> {item['content']}" if mention else item["content"]
+        message = FakeMessage(
+            content, self._user(item.get("author", "user")), channel,
+            mentions=[self.bot_user] if mention else (),
+        )
+        channel.remember(message)
+        before = {k: self.metrics.value("gideon_messages_total", outcome=k) for k in ("queued", "merged")}
+        self.submitted_at[message.id] = time.perf_counter()
+        self.outstanding.add(message.id)
+        await self.bot.on_message(message)
+        for outcome, count in before.items():
+            if self.metrics.value("gideon_messages_total", outcome=outcome) > count:
+                self.outcomes[outcome] += 1
+                return
+        # ignored, shed or a PR request: nothing will be handled for it
+        self.outstanding.discard(message.id)
+        self.outcomes["not_scheduled"] += 1
+
+    async def run(self, trace):
+        args = self.args
+        await self.server.start()
+        self._build_bot()
+        # The first channel in the trace plays the bot's main channel
+        if trace:
+            self.bot.target_channel_id = self._channel(trace[0].get("channel", "general")).id
+        self.bot._build_admission()
+        await self.bot.openai_client.start()
+        self.bot.scheduler.start()
+        self.replay_finished = False
+        started = time.perf_counter()
+        try:
+            for i, item in enumerate(trace):
+                if args.rate:
+                    due = started + i / args.rate
+                else:
+                    due = started + float(item.get("at", 0.0))
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._deliver(item)
+            self.replay_finished = True
+            if self.outstanding:
+                try:
+                    await asyncio.wait_for(self.done.wait(), timeout=args.timeout)
+                except asyncio.TimeoutError:
+                    print(f"timed out with {len(self.outstanding)} messages unanswered", file=sys.stderr)
+            elapsed = time.perf_counter() - started
+        finally:
+            await self.bot.scheduler.stop()
+            await self.bot.openai_client.close()
+            await self.server.stop()
+        return self._report(len(trace), elapsed)
+
+    def _report(self, sent, elapsed):
+        handled = len(self.latencies)
+        executor = self.bot.openai_client.executor
+        stages = {
+            key: {
+                "count": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+            for key, values in sorted(self.metrics.samples.items())
+        }
+        return {
+            "messages": sent,
+            "handled": handled,
+            "outcomes": dict(self.outcomes),
+            "elapsed_s": elapsed,
+            "msgs_per_sec": handled / elapsed if elapsed else 0.0,
+            "e2e": {
+                "p50_ms": percentile(self.latencies, 50) * 1000,
+                "p95_ms": percentile(self.latencies, 95) * 1000,
+                "p99_ms": percentile(self.latencies, 99) * 1000,
+            },
+            "upstream_calls_per_msg": self.server.calls / handled if handled else 0.0,
+            "router_calls_per_msg": self.server.router_calls / handled if handled else 0.0,
+            "rate_limited": self.server.rate_limited,
+            "retries": executor.retries,
+            "failures": executor.failures,
+            "discord_sends": sum(len(c.sent) for c in self.channels.values()),
+            "discord_edits": sum(c.edits for c in self.channels.values()),
+            "stages": stages,
+        }
+
+
+def print_report(report):
+    print(
+        f"{report['handled']}/{report['messages']} messages answered in {report['elapsed_s']:.2f}s "
+        f"({report['msgs_per_sec']:.1f} msgs/s), outcomes {report['outcomes']}"
+    )
+    e2e = report["e2e"]
+    print(f"end-to-end  p50={e2e['p50_ms']:.1f}ms  p95={e2e['p95_ms']:.1f}ms  p99={e2e['p99_ms']:.1f}ms")
+    print(
+        f"upstream calls/msg={report['upstream_calls_per_msg']:.2f} "
+        f"(router {report['router_calls_per_msg']:.2f}), 429s={report['rate_limited']}, "
+        f"retries={report['retries']}, failures={report['failures']}, "
+        f"discord sends={report['discord_sends']} edits={report['discord_edits']}"
+    )
+    print(f"\n{'stage':<48}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for key, s in report["stages"].items():
+        print(f"{key[:47]:<48}{s['count']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+
+def main(args):
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.ERROR)
+    rng = random.Random(args.seed)
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.messages, args.channels, args.users, rng)
+    if not args.trace and not args.rate:
+        args.rate = 20.0
+    report = asyncio.run(LoadTest(args).run(trace))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.max_p95_ms is not None and report["e2e"]["p95_ms"] > args.max_p95_ms:
+        print(f"FAIL: end-to-end p95 {report['e2e']['p95_ms']:.1f}ms > {args.max_p95_ms}ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="JSON lines trace to replay (default: synthetic)")
+    parser.add_argument("--messages", type=int, default=200, help="synthetic trace length")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--rate", type=float, help="messages/sec (default 20 for synthetic traces)")
+    parser.add_argument("--routing-mode", default="sequential", choices=("sequential", "combined", "speculative"))
+    parser.add_argument("--no-classifier", dest="classifier", action="store_false", help="always ask the LLM router")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--edit-interval", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=50)
+    parser.add_argument("--coalesce-window", type=float, default=0.0)
+    parser.add_argument("--router-latency", type=float, default=0.05, help="median seconds")
+    parser.add_argument("--persona-latency", type=float, default=0.2, help="median seconds")
+    parser.add_argument("--token-interval", type=float, default=0.002, help="seconds between streamed tokens")
+    parser.add_argument("--send-latency", type=float, default=0.01, help="seconds per Discord send")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls answered 429")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="exit 1 if the end-to-end p95 is above this")
+    main(parser.parse_args())
@@ -0,0 +1,85 @@
+"""
+Conversation memory benchmark: background batch embedding throughput and retrieval latency for a
+guild filled to MEMORY_MAX_PER_GUILD, with the local hashing embedder and a temporary SQLite file.
+
+    python -m benchmarks.bench_memory --entries 5000 --queries 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bot.memory import MemoryStore
+
+TOPICS = [
+    "the staging deploy failed on the docker build", "standup moves to 10am tomorrow",
+    "postgres connection pool is exhausted again", "who owns the billing service",
+    "release notes for 2.4 are in the wiki", "flaky pytest in the payments suite",
+    "game night on friday, bring snacks", "rotate the api keys before the audit",
+]
+WORDS = "alpha beta gamma delta sprint review retro ticket merge branch hotfix cache queue latency".split()
+
+
+def _message(rng, i, guild, channels):
+    content = f"{rng.choice(TOPICS)} {' '.join(rng.choices(WORDS, k=rng.randint(3, 12)))}"
+    return SimpleNamespace(
+        id=i, content=content, guild=guild, channel=SimpleNamespace(id=rng.choice(channels)),
+        author=SimpleNamespace(bot=rng.random() < 0.3, display_name=f"user{rng.randint(1, 30)}"),
+        created_at=None,
+    )
+
+
+def _pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    guild = SimpleNamespace(id=1)
+    channels = list(range(1, args.channels + 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(path=os.path.join(tmp, "memory.sqlite3"), max_per_guild=args.entries, scope=args.scope)
+        await store.start()
+        try:
+            for i in range(args.entries):
+                store.add(_message(rng, i, guild, channels))
+            t0 = time.perf_counter()
+            await store.flush(force=True)
+            embed_seconds = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            await store._index(guild.id)
+            load_seconds = time.perf_counter() - t0
+            timings = []
+            for _ in range(args.queries):
+                query = f"{rng.choice(TOPICS)} {rng.choice(WORDS)}"
+                t0 = time.perf_counter()
+                await store.search(guild.id, rng.choice(channels), query)
+                timings.append((time.perf_counter() - t0) * 1000)
+        finally:
+            await store.stop()
+    print(f"embedded+stored {args.entries} messages in {embed_seconds:.2f}s "
+          f"({args.entries / embed_seconds:.0f} msgs/s, {store.batches} batches)")
+    print(f"loaded the guild index in {load_seconds * 1000:.1f}ms")
+    print(f"search ({args.scope} scope)  p50={statistics.median(timings):.2f}ms  "
+          f"p95={_pct(timings, 0.95):.2f}ms  p99={_pct(timings, 0.99):.2f}ms")
+
+
+def main(args):
+    logging.getLogger("Memory").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--scope", choices=("channel", "guild"), default="channel")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+Response parsing micro-benchmark: the old three re.search calls (one per event tag, run over
+every reply) against the single-pass parse_response.
+
+Replies are a mix of plain answers, answers containing brackets, and event blocks.
+
+    python -m benchmarks.bench_parser --replies 20000
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import time
+
+from bot.response_parser import parse_response
+
+PLAIN = (
+    "Sure! To reverse a list in Python use `items[::-1]` or `items.reverse()`; the first makes a copy. "
+    * 4
+)
+BRACKETS = "Arrays are indexed like `a[0]` and `a[-1]`; see [the docs] for slices like [1:3]. " * 4
+EVENT = "[SCHEDULE_EVENT]\n" + json.dumps({
+    "title": "Game night", "description": "Bring snacks", "participants": ["@ana", "@bo"],
+    "datetime": "2025-06-25T20:00:00", "timezone": "Europe/Brussels",
+}, indent=2) + "\n[/SCHEDULE_EVENT]"
+CANCEL = '[CANCEL_EVENT]\n{"title": "Game night", "datetime": "2025-06-25T20:00:00"}\n[/CANCEL_EVENT]'
+MIX = [(PLAIN, 0.6), (BRACKETS, 0.2), (EVENT, 0.15), (CANCEL, 0.05)]
+
+
+def legacy_parse(response):
+    """What _respond used to do for each reply: three searches, then json.loads of the first hit."""
+    sched_match = re.search(r"\[SCHEDULE_EVENT\](.*?)\[/SCHEDULE_EVENT\]", response, re.DOTALL)
+    update_match = re.search(r"\[UPDATE_EVENT\](.*?)\[/UPDATE_EVENT\]", response, re.DOTALL)
+    cancel_match = re.search(r"\[CANCEL_EVENT\](.*?)\[/CANCEL_EVENT\]", response, re.DOTALL)
+    for match in (sched_match, update_match, cancel_match):
+        if match:
+            return json.loads(match.group(1).strip())
+    return None
+
+
+def bench(fn, replies, passes):
+    t0 = time.perf_counter()
+    for _ in range(passes):
+        for reply in replies:
+            fn(reply)
+    return (time.perf_counter() - t0) / (passes * len(replies))
+
+
+def main(args):
+    logging.getLogger("ResponseParser").setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    texts, weights = zip(*MIX)
+    replies = rng.choices(texts, weights, k=args.replies)
+    # Warm the re module's pattern cache so the legacy path is measured at its best
+    bench(legacy_parse, replies[:100], 1)
+    legacy = bench(legacy_parse, replies, args.passes)
+    single = bench(parse_response, replies, args.passes)
+    # The old _respond ran the whole chain a second time for every non-DEVELOPER reply
+    print(f"{'parser':<22}{'us/reply':>10}")
+    print(f"{'triple re.search':<22}{legacy * 1e6:>10.2f}")
+    print(f"{'triple re.search x2':<22}{legacy * 2e6:>10.2f}")
+    print(f"{'parse_response':<22}{single * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", type=int, default=20000)
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,101 @@
+"""
+Routing latency benchmark: sequential router->persona vs combined vs speculative.
+
+Runs fully offline. OpenAIClient._send_chat is replaced by a simulated upstream whose
+latency is drawn from a log-normal distribution per call type, so only the orchestration
+differs between modes.
+
+    python -m benchmarks.bench_routing --messages 400 --scale 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import time
+
+from bot.openai_client import OpenAIClient, ROUTER_SYSTEM_PROMPT
+
+# median seconds per call type, before scaling
+ROUTER_LATENCY = 0.45
+PERSONA_LATENCY = 1.30
+COMBINED_EXTRA = 0.10   # longer prompt + JSON wrapper
+PERSONA_MIX = [("ASSISTANT", 0.60), ("DEVELOPER", 0.25), ("EVENT", 0.15)]
+
+
+class SimulatedClient(OpenAIClient):
+    def __init__(self, routing_mode, scale, rng):
+        super().__init__(api_key="bench", routing_mode=routing_mode)
+        self.scale = scale
+        self.rng = rng
+        self.upstream_calls = 0
+
+    def _latency(self, median):
+        return median * self.rng.lognormvariate(0, 0.35) * self.scale
+
+    async def _send_chat(self, payload, label, role="chat"):
+        self.upstream_calls += 1
+        messages = payload["messages"]
+        truth = messages[-1]["content"].split(":", 1)[0]
+        if messages[0]["content"] == ROUTER_SYSTEM_PROMPT:
+            await asyncio.sleep(self._latency(ROUTER_LATENCY))
+            content = truth
+        elif "response_format" in payload:
+            await asyncio.sleep(self._latency(PERSONA_LATENCY + COMBINED_EXTRA))
+            content = json.dumps({"persona": truth, "reply": "ok"})
+        else:
+            await asyncio.sleep(self._latency(PERSONA_LATENCY))
+            content = "ok"
+        return {"choices": [{"message": {"content": content}}]}
+
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+async def run_mode(mode, messages, concurrency, scale, seed):
+    rng = random.Random(seed)
+    client = SimulatedClient(mode, scale, rng)
+    personas, weights = zip(*PERSONA_MIX)
+    trace = [f"{p}: message {i}" for i, p in enumerate(rng.choices(personas, weights, k=messages))]
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text):
+        async with sem:
+            t0 = time.perf_counter()
+            await client.route_and_respond(text)
+            latencies.append((time.perf_counter() - t0) / scale)
+
+    await asyncio.gather(*(one(t) for t in trace))
+    return {
+        "mode": mode,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "calls_per_msg": client.upstream_calls / messages,
+    }
+
+
+async def main(args):
+    logging.getLogger("OpenAI").setLevel(logging.WARNING)
+    logging.getLogger("Prompts").setLevel(logging.WARNING)
+    baseline = None
+    for mode in ("sequential", "combined", "speculative"):
+        r = await run_mode(mode, args.messages, args.concurrency, args.scale, args.seed)
+        baseline = baseline or r
+        print(
+            f"{r['mode']:<12} p50={r['p50_ms']:7.1f}ms  p95={r['p95_ms']:7.1f}ms  "
+            f"calls/msg={r['calls_per_msg']:.2f}  "
+            f"p50 delta={r['p50_ms'] - baseline['p50_ms']:+7.1f}ms  "
+            f"p95 delta={r['p95_ms'] - baseline['p95_ms']:+7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scale", type=float, default=0.05, help="multiply simulated latencies (results are unscaled)")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Minimal stand-ins for the discord.py objects GideonBot touches, for offline benchmarks.
+Only the attributes and coroutines the bot actually uses are implemented.
+"""
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import discord
+
+_ids = itertools.count(10_000)
+
+
+class FakeUser:
+    def __init__(self, name: str, bot: bool = False, id: int = None):
+        self.id = id if id is not None else next(_ids)
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+
+    def __str__(self):
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, id: int = None):
+        self.id = id if id is not None else next(_ids)
+        self.events = []
+
+    async def fetch_scheduled_events(self):
+        return list(self.events)
+
+    async def create_scheduled_event(self, name, start_time, description="", **kwargs):
+        event = SimpleNamespace(
+            id=next(_ids), guild_id=self.id, name=name, description=description,
+            scheduled_start_time=start_time,
+        )
+        self.events.append(event)
+        return event
+
+
+class _Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeMessage:
+    def __init__(self, content: str, author, channel, mentions=(), reference=None):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.mentions = list(mentions)
+        self.reference = reference
+
+    async def edit(self, content=None, **kwargs):
+        if content is not None:
+            self.content = content
+        self.channel.edits += 1
+        return self
+
+
+class FakeChannel:
+    """
+    Text channel. send() optionally takes a simulated Discord round trip, and echoes the sent
+    message back through `echo` (normally bot.on_message) like the gateway would.
+    """
+
+    def __init__(self, name: str, guild, bot_user, id: int = None, send_latency: float = 0.0, echo=None):
+        self.id = id if id is not None else next(_ids)
+        self.name = name
+        self.guild = guild
+        self.type = discord.ChannelType.text
+        self.bot_user = bot_user
+        self.send_latency = send_latency
+        self.echo = echo
+        self.sent = []
+        self.edits = 0
+        self._history = []
+
+    def typing(self):
+        return _Typing()
+
+    async def send(self, content=None, **kwargs):
+        if self.send_latency:
+            await asyncio.sleep(self.send_latency)
+        message = FakeMessage(content or "", self.bot_user, self)
+        self.sent.append(message)
+        self._history.append(message)
+        if self.echo is not None:
+            await self.echo(message)
+        return message
+
+    def remember(self, message):
+        self._history.append(message)
+
+    async def history(self, limit=100, **kwargs):
+        for message in reversed(self._history[-limit:]):
+            yield message
@@ -0,0 +1,122 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for offline benchmarks.
+
+Answers router calls with a persona picked from keywords in the user message, persona calls with
+filler text (or an event block for scheduling requests), streams as server-sent events when asked,
+and can inject 429s. Latency per call is log-normal around a configurable median.
+
+    server = FakeOpenAIServer(router_latency=0.3, persona_latency=1.0, error_rate=0.05)
+    await server.start()
+    client = OpenAIClient(api_key="bench", api_url=server.url)
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+from bot.openai_client import ROUTER_SYSTEM_PROMPT
+
+DEVELOPER_WORDS = ("code", "bug", "python", "stack trace", "refactor", "review", "deploy")
+EVENT_WORDS = ("schedule", "meeting", "event", "reminder", "cancel")
+
+
+def persona_for(text: str) -> str:
+    lowered = text.lower()
+    if any(w in lowered for w in DEVELOPER_WORDS):
+        return "DEVELOPER"
+    if any(w in lowered for w in EVENT_WORDS):
+        return "EVENT"
+    return "ASSISTANT"
+
+
+class FakeOpenAIServer:
+    def __init__(self, router_latency: float = 0.3, persona_latency: float = 1.0, jitter: float = 0.35,
+                 token_interval: float = 0.02, reply_words: int = 60, error_rate: float = 0.0,
+                 retry_after: float = 0.05, seed: int = 1):
+        self.router_latency = router_latency
+        self.persona_latency = persona_latency
+        self.jitter = jitter
+        self.token_interval = token_interval
+        self.reply_words = reply_words
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.router_calls = 0
+        self.streamed_calls = 0
+        self.rate_limited = 0
+        self.url = None
+        self._runner = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}/v1/chat/completions"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _latency(self, median: float) -> float:
+        return median * self.rng.lognormvariate(0, self.jitter)
+
+    def _reply(self, payload: dict) -> str:
+        messages = payload["messages"]
+        user_text = messages[-1]["content"]
+        if messages[0]["content"] == ROUTER_SYSTEM_PROMPT:
+            return persona_for(user_text)
+        if persona_for(user_text) == "EVENT" and "[SCHEDULE_EVENT]" in messages[0]["content"]:
+            start = (datetime.now(timezone.utc) + timedelta(days=2)).replace(microsecond=0)
+            return "[SCHEDULE_EVENT]\n" + json.dumps({
+                "title": "Load test sync", "description": user_text[:80], "participants": [],
+                "datetime": start.isoformat(), "timezone": "UTC",
+            }) + "\n[/SCHEDULE_EVENT]"
+        return " ".join(f"word{i}" for i in range(self.reply_words))
+
+    def _usage(self, payload: dict, reply: str) -> dict:
+        prompt_chars = sum(len(m.get("content") or "") for m in payload["messages"])
+        return {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(reply) // 4}
+
+    async def _handle(self, request):
+        payload = await request.json()
+        self.calls += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached (injected)"}},
+                status=429, headers={"retry-after-ms": str(int(self.retry_after * 1000))},
+            )
+        is_router = payload["messages"][0]["content"] == ROUTER_SYSTEM_PROMPT
+        if is_router:
+            self.router_calls += 1
+        reply = self._reply(payload)
+        usage = self._usage(payload, reply)
+        latency = self._latency(self.router_latency if is_router else self.persona_latency)
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            return web.json_response({
+                "choices": [{"message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        self.streamed_calls += 1
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        # Time to first token is a fraction of the full latency; the rest is spread over the tokens
+        await asyncio.sleep(latency * 0.3)
+        for i, word in enumerate(reply.split(" ")):
+            delta = {"content": word if i == 0 else " " + word}
+            await resp.write(f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n".encode())
+            await asyncio.sleep(self.token_interval)
+        await resp.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
@@ -0,0 +1,68 @@
+import re
+from bot.intent import is_pr_request
+from bot.logger import setup_logger
+
+logger = setup_logger("Admission")
+
+ACCEPT = "accept"
+PR_REQUEST = "pr_request"
+IGNORED_BOT = "ignored_bot"
+IGNORED_EMPTY = "ignored_empty"
+IGNORED_CHANNEL = "ignored_channel"
+DECISIONS = (ACCEPT, PR_REQUEST, IGNORED_BOT, IGNORED_EMPTY, IGNORED_CHANNEL)
+ADMITTED = frozenset((ACCEPT, PR_REQUEST))
+
+
+class MessageAdmission:
+    """
+    Decides, before any other per-message work, whether a gateway message is for the bot.
+    Built once the bot user is known:
+      - allowlisted channels (the main channel and any extras) are answered unconditionally
+      - elsewhere only mentions (checked against the precompiled <@id>/<@!id> tokens), replies to
+        the bot, or an optional wake-word automaton get through
+      - admitted messages are checked against the PR-request automaton
+    Rejections are a handful of attribute reads and set lookups; they allocate nothing.
+    """
+
+    def __init__(self, bot_user_id: int, channel_ids=(), wake_words=()):
+        self.bot_user_id = bot_user_id
+        self.channel_ids = frozenset(channel_ids)
+        self.mention_tokens = (f"<@{bot_user_id}>", f"<@!{bot_user_id}>")
+        words = [w.strip().lower() for w in wake_words if w.strip()]
+        self.wake_automaton = (
+            re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", re.IGNORECASE) if words else None
+        )
+        self.counts = dict.fromkeys(DECISIONS, 0)
+        logger.info(
+            f"Admission built: {len(self.channel_ids)} allowlisted channel(s), "
+            f"{len(words)} wake word(s)"
+        )
+
+    def _addressed(self, message) -> bool:
+        content = message.content
+        if self.mention_tokens[0] in content or self.mention_tokens[1] in content:
+            return True
+        reference = message.reference
+        if reference is not None:
+            author = getattr(reference.resolved, "author", None)
+            if author is not None and author.id == self.bot_user_id:
+                return True
+        return self.wake_automaton is not None and self.wake_automaton.search(content) is not None
+
+    def admit(self, message) -> str:
+        """One of ACCEPT, PR_REQUEST or an IGNORED_* decision."""
+        if message.author.bot:
+            decision = IGNORED_BOT
+        elif not message.content or message.content.isspace():
+            decision = IGNORED_EMPTY
+        elif message.channel.id not in self.channel_ids and not self._addressed(message):
+            decision = IGNORED_CHANNEL
+        elif is_pr_request(message.content.lower()):
+            decision = PR_REQUEST
+        else:
+            decision = ACCEPT
+        self.counts[decision] += 1
+        return decision
+
+    def stats(self) -> dict:
+        return dict(self.counts)
@@ -0,0 +1,176 @@
+import re
+import time
+
+from bot.context import default_tokenizer
+from bot.logger import setup_logger
+from bot.memory import GuildIndex, HashingEmbedder
+
+logger = setup_logger("AnswerCache")
+
+# Personas whose answers depend only on the question, not on events or live server state
+CACHEABLE_PERSONAS = frozenset(("ASSISTANT", "DEVELOPER"))
+
+# Questions whose right answer changes with the clock are never served from (or written to) the cache
+TIME_SENSITIVE_WORDS = (
+    "today", "tonight", "tomorrow", "yesterday", "now", "currently", "latest", "recent", "recently",
+    "this week", "this month", "this year", "next week", "next month", "next year", "last week",
+    "last month", "last year", "last night", "what time", "what day", "what date", "what year",
+    "what month", "weather", "news", "deadline", "countdown", "how long until", "how long ago",
+)
+
+
+def _phrase_re(words):
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", re.IGNORECASE)
+
+
+class CachedAnswer:
+    __slots__ = ("message_id", "channel_id", "persona", "question", "answer", "tokens", "expires", "answer_ids", "hits")
+
+    def __init__(self, message_id, channel_id, persona, question, answer, tokens, expires, answer_ids):
+        # message_id is the question's; GuildIndex keys its slots on it
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.persona = persona
+        self.question = question
+        self.answer = answer
+        self.tokens = tokens
+        self.expires = expires
+        self.answer_ids = answer_ids
+        self.hits = 0
+
+
+class AnswerProbe:
+    """Result of lookup(): the cached answer on a hit, and the question's vector for store() on a miss."""
+    __slots__ = ("channel_id", "question", "vector", "hit")
+
+    def __init__(self, channel_id, question, vector, hit=None):
+        self.channel_id = channel_id
+        self.question = question
+        self.vector = vector
+        self.hit = hit
+
+
+class SemanticAnswerCache:
+    """
+    Answers to repeated ASSISTANT/DEVELOPER questions, per channel. Each question is embedded once;
+    lookup() scans the channel's vectors with one matrix-vector product (a bounded GuildIndex ring)
+    and returns the stored answer of the closest earlier question scoring at least `threshold`.
+      - entries expire after `ttl` seconds; deleting or editing the question, or deleting any
+        message the answer was sent as, drops the entry
+      - time-dependent questions (today, latest, what year...) and very short ones, which lean on
+        the conversation around them, are neither served nor stored
+    saved_tokens estimates the prompt and completion tokens of the calls each hit avoided.
+    """
+
+    def __init__(self, embedder=None, threshold: float = 0.9, ttl: float = 86400.0, max_per_channel: int = 500,
+                 min_words: int = 3, skip_words=(), tokenizer=None, clock=time.time):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_channel = max_per_channel
+        self.min_words = min_words
+        self.skip_re = _phrase_re(TIME_SENSITIVE_WORDS + tuple(skip_words))
+        self.tokenizer = tokenizer or default_tokenizer()
+        self.clock = clock
+        self._channels = {}
+        # Discord message id (question or any answer chunk) -> (channel_id, question message_id)
+        self._owners = {}
+        self.lookups = 0
+        self.hits = 0
+        self.skipped = 0
+        self.stored = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.saved_tokens = 0
+
+    def cacheable(self, question: str) -> bool:
+        return len(question.split()) >= self.min_words and not self.skip_re.search(question)
+
+    async def lookup(self, channel_id, question: str):
+        """AnswerProbe for the question, with .hit set when a fresh near-duplicate was answered before; None when opted out."""
+        if not self.cacheable(question):
+            self.skipped += 1
+            return None
+        vectors = await self.embedder.embed([question])
+        if vectors is None:
+            return None
+        probe = AnswerProbe(channel_id, question, vectors[0])
+        self.lookups += 1
+        index = self._channels.get(channel_id)
+        if index is None:
+            return probe
+        for score, entry in index.search(probe.vector, None, k=1, min_score=self.threshold):
+            if entry.expires < self.clock():
+                self.expired += 1
+                self._drop(channel_id, entry)
+                continue
+            entry.hits += 1
+            self.hits += 1
+            self.saved_tokens += entry.tokens
+            probe.hit = entry
+            logger.info(f"Answered from cache (score {score:.3f}, {entry.persona})")
+        return probe
+
+    def store(self, probe, message_id, persona: str, answer: str, sent=(), prompt_tokens: int = 0):
+        """Remember the answer sent for a probed miss; sent are the Discord messages carrying it."""
+        if probe is None or probe.hit is not None or persona not in CACHEABLE_PERSONAS or not answer:
+            return
+        index = self._channels.get(probe.channel_id)
+        if index is None:
+            index = self._channels[probe.channel_id] = GuildIndex(self.max_per_channel, len(probe.vector))
+        tokens = prompt_tokens + self.tokenizer(probe.question) + self.tokenizer(answer)
+        entry = CachedAnswer(
+            message_id, probe.channel_id, persona, probe.question, answer, tokens,
+            self.clock() + self.ttl, [m.id for m in sent],
+        )
+        # The ring slot about to be reused, if the channel is full
+        oldest = index.replaced_next() if message_id not in index.slots else None
+        if index.add(entry, probe.vector) is not None:
+            self._forget_owner(oldest.message_id, oldest.answer_ids)
+        self._owners[message_id] = (probe.channel_id, message_id)
+        for answer_id in entry.answer_ids:
+            self._owners[answer_id] = (probe.channel_id, message_id)
+        self.stored += 1
+
+    def track(self, entry, sent):
+        """The cached answer was sent again as `sent`; deleting one of those copies invalidates it too."""
+        for m in sent:
+            entry.answer_ids.append(m.id)
+            self._owners[m.id] = (entry.channel_id, entry.message_id)
+
+    def forget(self, message_id) -> bool:
+        """Drop the entry asked or answered by this Discord message (it was deleted or its question edited)."""
+        owner = self._owners.get(message_id)
+        if owner is None:
+            return False
+        channel_id, question_id = owner
+        index = self._channels.get(channel_id)
+        slot = index.slots.get(question_id) if index is not None else None
+        if slot is None:
+            self._owners.pop(message_id, None)
+            return False
+        self._drop(channel_id, index.entries[slot])
+        self.invalidated += 1
+        return True
+
+    def _drop(self, channel_id, entry):
+        self._channels[channel_id].remove(entry.message_id)
+        self._forget_owner(entry.message_id, entry.answer_ids)
+
+    def _forget_owner(self, question_id, answer_ids):
+        self._owners.pop(question_id, None)
+        for answer_id in answer_ids:
+            self._owners.pop(answer_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": (self.hits / self.lookups) if self.lookups else 0.0,
+            "skipped": self.skipped,
+            "stored": self.stored,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+            "entries": sum(len(index) for index in self._channels.values()),
+            "saved_tokens": self.saved_tokens,
+        }
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import time
+from collections import deque
+from bot.logger import setup_logger
+from bot.metrics import NULL_METRICS
+from bot.request_executor import RequestExecutor
+
+logger = setup_logger("Backends")
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# router: the one-word persona pick and other tiny classification calls; chat: persona replies and summaries;
+# economy: optional cheaper backends for chat while a guild is short of token budget (falls back to chat)
+ROLES = ("router", "chat", "economy")
+REQUIRED_ROLES = ("router", "chat")
+
+
+class BackendStats:
+    """Latency and error EWMAs of one backend for one role, plus a window of recent latencies for p95."""
+    __slots__ = ("latency", "errors", "samples", "requests", "failures", "hedges", "last_failure")
+
+    def __init__(self, window: int = 100):
+        self.latency = None
+        self.errors = 0.0
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.last_failure = -math.inf
+
+    def observe(self, seconds: float, ok: bool, alpha: float, now: float):
+        self.errors += alpha * ((0.0 if ok else 1.0) - self.errors)
+        if not ok:
+            self.failures += 1
+            self.last_failure = now
+            return
+        self.latency = seconds if self.latency is None else self.latency + alpha * (seconds - self.latency)
+        self.samples.append(seconds)
+
+    def expected(self) -> float:
+        """Latency adjusted for the calls that fail; unmeasured backends come first unless they only ever failed."""
+        if self.latency is None:
+            return math.inf if self.failures else 0.0
+        return self.latency / max(1.0 - self.errors, 0.05)
+
+    def p95(self):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class Backend:
+    """
+    One OpenAI-compatible chat completions endpoint (OpenAI itself, another provider, a local
+    server) serving a model for some roles. Each backend has its own RequestExecutor, since rate
+    limits are per provider. api_key None sends no Authorization header (local servers).
+    """
+
+    def __init__(self, name: str, url: str = OPENAI_CHAT_URL, model: str = "gpt-3.5-turbo", api_key: str = None,
+                 roles=REQUIRED_ROLES, executor=None, window: int = 100):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.roles = tuple(roles)
+        self.executor = executor or RequestExecutor()
+        self.stats = {role: BackendStats(window) for role in self.roles}
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+
+    def payload(self, payload: dict) -> dict:
+        return dict(payload, model=self.model)
+
+
+class BackendPool:
+    """
+    Sends each chat call to the fastest healthy backend serving its role:
+      - per backend and role it keeps EWMAs of latency and of the error rate (alpha), and the
+        recent latencies; a backend whose error EWMA is above error_threshold is skipped for
+        `cooldown` seconds after its last failure (it stays a last resort)
+      - hedging: when the chosen backend has not answered by its own p95 (at least hedge_min,
+        once min_samples latencies are known), the same request also goes to the next backend
+        and the first answer wins; the loser is cancelled
+      - failover: a failed call (after the executor's retries) moves on to the next backend
+    Streams are not hedged, only failed over when the request cannot be opened.
+    """
+
+    def __init__(self, backends, alpha: float = 0.2, error_threshold: float = 0.5, cooldown: float = 30.0,
+                 hedge: bool = True, hedge_min: float = 0.25, min_samples: int = 20, metrics=None,
+                 clock=time.monotonic):
+        self.backends = list(backends)
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_min = hedge_min
+        self.min_samples = min_samples
+        self.metrics = metrics or NULL_METRICS
+        self.clock = clock
+        self.failovers = 0
+
+    def healthy(self, stats) -> bool:
+        return stats.errors <= self.error_threshold or self.clock() - stats.last_failure >= self.cooldown
+
+    def resolve(self, role: str) -> str:
+        """The role calls for `role` are served and accounted as: economy falls back to chat when nothing serves it."""
+        if role == "economy" and not any(role in b.roles for b in self.backends):
+            return "chat"
+        return role
+
+    def candidates(self, role: str) -> list:
+        """Backends for role (already resolved), best first: healthy before unhealthy, then by error-adjusted latency EWMA."""
+        serving = [b for b in self.backends if role in b.roles]
+        return sorted(serving, key=lambda b: (not self.healthy(b.stats[role]), b.stats[role].expected()))
+
+    def _hedge_after(self, stats):
+        if not self.hedge or len(stats.samples) < self.min_samples:
+            return None
+        return max(self.hedge_min, stats.p95())
+
+    async def _call(self, backend, session, payload, label, role, estimated_tokens):
+        stats = backend.stats[role]
+        stats.requests += 1
+        started = self.clock()
+        try:
+            data = await backend.executor.post_json(
+                session, backend.url, backend.payload(payload), f"{label} [{backend.name}]",
+                estimated_tokens=estimated_tokens, headers=backend.headers(),
+            )
+        except Exception as e:
+            # Counted as a failed call like any other, so the pool fails over instead of failing the reply
+            logger.error(f"{label}: {backend.name} raised {type(e).__name__}: {e}")
+            data = None
+        stats.observe(self.clock() - started, data is not None, self.alpha, self.clock())
+        self.metrics.count("gideon_backend_requests_total", backend=backend.name, role=role,
+                           outcome="ok" if data is not None else "error")
+        return data
+
+    async def post_json(self, session, payload: dict, label: str, role: str = "chat", estimated_tokens: int = 0):
+        """The decoded JSON of the first backend to answer, or None when every backend failed."""
+        role = self.resolve(role)
+        order = self.candidates(role)
+        if not order:
+            logger.error(f"{label}: no backend serves role '{role}'")
+            return None
+        running = {}
+
+        def launch():
+            backend = order.pop(0)
+            running[asyncio.ensure_future(self._call(backend, session, payload, label, role, estimated_tokens))] = backend
+            return backend
+
+        hedged = False
+        # Only hedge when there is another backend left to race
+        backend = launch()
+        deadline = self._hedge_after(backend.stats[role]) if order else None
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than it usually is: race the next backend instead of waiting it out
+                    slow = next(iter(running.values()))
+                    slow.stats[role].hedges += 1
+                    self.metrics.count("gideon_backend_hedges_total", backend=slow.name, role=role)
+                    logger.info(f"{label}: {slow.name} slower than {deadline:.2f}s, hedging on {order[0].name}")
+                    launch()
+                    hedged, deadline = True, None
+                    continue
+                for task in done:
+                    del running[task]
+                    data = task.result()
+                    if data is not None:
+                        return data
+                if not running and order:
+                    self.failovers += 1
+                    self.metrics.count("gideon_backend_failovers_total", role=role)
+                    logger.info(f"{label}: failing over to {order[0].name}")
+                    backend = launch()
+                    deadline = self._hedge_after(backend.stats[role]) if order and not hedged else None
+            return None
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def open(self, session, payload: dict, label: str, role: str = "chat", estimated_tokens: int = 0):
+        """Open a streaming response on the first backend that accepts it; None when all fail."""
+        role = self.resolve(role)
+        for i, backend in enumerate(self.candidates(role)):
+            if i:
+                self.failovers += 1
+                self.metrics.count("gideon_backend_failovers_total", role=role)
+                logger.info(f"{label}: failing over to {backend.name}")
+            stats = backend.stats[role]
+            stats.requests += 1
+            started = self.clock()
+            try:
+                resp = await backend.executor.open(
+                    session, backend.url, backend.payload(payload), f"{label} [{backend.name}]",
+                    estimated_tokens=estimated_tokens, headers=backend.headers(),
+                )
+            except Exception as e:
+                logger.error(f"{label}: {backend.name} raised {type(e).__name__}: {e}")
+                resp = None
+            # Time to response headers: the part of a stream's latency the backend controls
+            stats.observe(self.clock() - started, resp is not None, self.alpha, self.clock())
+            self.metrics.count("gideon_backend_requests_total", backend=backend.name, role=role,
+                               outcome="ok" if resp is not None else "error")
+            if resp is not None:
+                return resp
+        return None
+
+    def stats(self) -> dict:
+        """Per "backend/role": latency EWMA and p95 (-1 until measured), error EWMA, health and counters."""
+        stats = {}
+        for backend in self.backends:
+            for role, s in backend.stats.items():
+                p95 = s.p95()
+                stats[f"{backend.name}/{role}"] = {
+                    "healthy": self.healthy(s),
+                    "latency_ewma_seconds": s.latency if s.latency is not None else -1.0,
+                    "latency_p95_seconds": p95 if p95 is not None else -1.0,
+                    "error_ewma": s.errors,
+                    "requests": s.requests,
+                    "failures": s.failures,
+                    "hedges": s.hedges,
+                }
+        return stats
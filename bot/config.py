@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
-from bot.logger import setup_logger
+import logging
+from bot.logger import setup_logger, BODY_MODES
+from bot.backends import OPENAI_CHAT_URL, ROLES, REQUIRED_ROLES
 
 logger = setup_logger("Config")
 
@@ -12,8 +14,160 @@ class BotConfig:
         self.openai_key = os.getenv("OPENAI_API_KEY")
         self.github_token = os.getenv("GITHUB_TOKEN")
         self.github_repo = os.getenv("GITHUB_REPO")
+        self.http_pool_size = self._get_number("HTTP_POOL_SIZE", 100, int)
+        self.http_pool_per_host = self._get_number("HTTP_POOL_PER_HOST", 20, int)
+        self.http_keepalive_timeout = self._get_number("HTTP_KEEPALIVE_TIMEOUT", 75.0, float)
+        self.http_dns_cache_ttl = self._get_number("HTTP_DNS_CACHE_TTL", 300, int)
+        self.routing_mode = (os.getenv("OPENAI_ROUTING_MODE") or "sequential").strip().lower()
+        self.intent_confidence = self._get_number("INTENT_CONFIDENCE_THRESHOLD", 0.9, float)
+        self.history_per_channel = self._get_number("HISTORY_CACHE_PER_CHANNEL", 50, int)
+        self.history_max_channels = self._get_number("HISTORY_CACHE_MAX_CHANNELS", 256, int)
+        self.context_token_budget = self._get_number("CONTEXT_TOKEN_BUDGET", 1500, int)
+        self.context_max_messages = self._get_number("CONTEXT_MAX_MESSAGES", 30, int)
+        self.streaming = self._get_flag("OPENAI_STREAMING", False)
+        self.stream_edit_interval = self._get_number("STREAM_EDIT_INTERVAL", 1.0, float)
+        self.tool_calling = self._get_flag("OPENAI_TOOL_CALLING", False)
+        self.response_cache_size = self._get_number("RESPONSE_CACHE_SIZE", 1024, int)
+        self.response_cache_ttl = self._get_number("RESPONSE_CACHE_TTL", 3600.0, float)
+        self.response_cache_path = os.getenv("RESPONSE_CACHE_PATH") or None
+        self.openai_max_retries = self._get_number("OPENAI_MAX_RETRIES", 3, int)
+        self.openai_retry_base_delay = self._get_number("OPENAI_RETRY_BASE_DELAY", 0.5, float)
+        self.openai_retry_max_delay = self._get_number("OPENAI_RETRY_MAX_DELAY", 20.0, float)
+        self.llm_backends = self._get_backends("LLM_BACKENDS")
+        self.llm_hedge = self._get_flag("LLM_HEDGE", True)
+        self.llm_hedge_min = self._get_number("LLM_HEDGE_MIN", 0.25, float)
+        self.llm_backend_cooldown = self._get_number("LLM_BACKEND_COOLDOWN", 30.0, float)
+        self.usage_enabled = self._get_flag("USAGE_ENABLED", False)
+        self.usage_path = os.getenv("USAGE_PATH") or "gideon_usage.sqlite3"
+        self.usage_flush_interval = self._get_number("USAGE_FLUSH_INTERVAL", 30.0, float)
+        self.usage_daily_tokens = self._get_number("USAGE_GUILD_DAILY_TOKENS", 0, int)
+        self.usage_guild_budgets = self._get_weights("USAGE_GUILD_BUDGETS")
+        self.usage_economy_model = os.getenv("USAGE_ECONOMY_MODEL") or None
+        self.scheduler_concurrency = self._get_number("SCHEDULER_MAX_CONCURRENCY", 4, int)
+        self.scheduler_max_pending = self._get_number("SCHEDULER_MAX_PENDING", 50, int)
+        self.scheduler_coalesce_window = self._get_number("SCHEDULER_COALESCE_WINDOW", 0.0, float)
+        self.scheduler_guild_weights = self._get_weights("SCHEDULER_GUILD_WEIGHTS")
+        self.event_match_threshold = self._get_number("EVENT_MATCH_THRESHOLD", 0.55, float)
+        self.event_match_margin = self._get_number("EVENT_MATCH_MARGIN", 0.15, float)
+        self.metrics_enabled = self._get_flag("METRICS_ENABLED", False)
+        self.metrics_host = os.getenv("METRICS_HOST") or "127.0.0.1"
+        self.metrics_port = self._get_number("METRICS_PORT", 9108, int)
+        self.metrics_tracing = self._get_flag("METRICS_TRACING", False)
+        self.log_format = (os.getenv("LOG_FORMAT") or "text").strip().lower()
+        self.log_level = (os.getenv("LOG_LEVEL") or "INFO").strip().upper()
+        self.log_levels = self._get_levels("LOG_LEVELS")
+        self.log_bodies = (os.getenv("LOG_BODIES") or "truncate").strip().lower()
+        self.log_body_chars = self._get_number("LOG_BODY_CHARS", 80, int)
+        self.log_rate_burst = self._get_number("LOG_RATE_BURST", 20, int)
+        self.log_rate_window = self._get_number("LOG_RATE_WINDOW", 10.0, float)
+        self.admission_channels = self._get_ids("ADMISSION_CHANNELS")
+        self.memory_enabled = self._get_flag("MEMORY_ENABLED", False)
+        self.memory_path = os.getenv("MEMORY_PATH") or "gideon_memory.sqlite3"
+        self.memory_embedder = (os.getenv("MEMORY_EMBEDDER") or "hashing").strip().lower()
+        self.memory_embedding_model = os.getenv("MEMORY_EMBEDDING_MODEL") or "text-embedding-3-small"
+        self.memory_max_per_guild = self._get_number("MEMORY_MAX_PER_GUILD", 5000, int)
+        self.memory_top_k = self._get_number("MEMORY_TOP_K", 4, int)
+        self.memory_token_budget = self._get_number("MEMORY_TOKEN_BUDGET", 300, int)
+        self.memory_min_score = self._get_number("MEMORY_MIN_SCORE", 0.3, float)
+        self.memory_scope = (os.getenv("MEMORY_SCOPE") or "channel").strip().lower()
+        self.jobs_enabled = self._get_flag("JOBS_ENABLED", False)
+        self.jobs_path = os.getenv("JOBS_PATH") or "gideon_jobs.sqlite3"
+        self.jobs_workers = self._get_number("JOBS_WORKERS", 2, int)
+        self.jobs_max_attempts = self._get_number("JOBS_MAX_ATTEMPTS", 3, int)
+        self.summarize_min_chars = self._get_number("SUMMARIZE_MIN_CHARS", 1500, int)
+        self.answer_cache_enabled = self._get_flag("ANSWER_CACHE_ENABLED", False)
+        self.answer_cache_threshold = self._get_number("ANSWER_CACHE_THRESHOLD", 0.9, float)
+        self.answer_cache_ttl = self._get_number("ANSWER_CACHE_TTL", 86400.0, float)
+        self.answer_cache_max_per_channel = self._get_number("ANSWER_CACHE_MAX_PER_CHANNEL", 500, int)
+        self.answer_cache_skip_words = [
+            w.strip() for w in (os.getenv("ANSWER_CACHE_SKIP_WORDS") or "").split(",") if w.strip()
+        ]
+        self.sharding = self._get_flag("SHARDING", False)
+        self.shard_count = self._get_number("SHARD_COUNT", 0, int)
+        self.shard_ids = self._get_ids("SHARD_IDS")
+        self.shard_processes = self._get_number("SHARD_PROCESSES", 0, int)
+        self.admission_wake_words = [w.strip() for w in (os.getenv("ADMISSION_WAKE_WORDS") or "").split(",") if w.strip()]
         self.validate()
 
+    def _get_flag(self, name, default):
+        raw = os.getenv(name)
+        if raw is None or raw.strip() == "":
+            return default
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+
+    def _get_levels(self, name):
+        """Parse "<logger>=<LEVEL>,..." into {logger: LEVEL}."""
+        raw = os.getenv(name) or ""
+        levels = {}
+        for item in raw.split(","):
+            if not item.strip():
+                continue
+            key, _, value = item.partition("=")
+            if not key.strip() or not value.strip():
+                logger.error(f"{name} entries must look like <logger>=<LEVEL>, got '{item}'")
+                raise ValueError(f"{name} entries must look like <logger>=<LEVEL>")
+            levels[key.strip()] = value.strip().upper()
+        return levels
+
+    def _get_ids(self, name):
+        """Parse "<id>,<id>,..." into a list of ints."""
+        raw = os.getenv(name) or ""
+        ids = []
+        for item in raw.split(","):
+            if not item.strip():
+                continue
+            if not item.strip().isdigit():
+                logger.error(f"{name} entries must be numeric IDs, got '{item}'")
+                raise ValueError(f"{name} entries must be numeric IDs")
+            ids.append(int(item))
+        return ids
+
+    def _get_backends(self, name):
+        """
+        Parse "<name>,<name>" into backend specs, each read from LLM_BACKEND_<NAME>_URL, _MODEL,
+        _API_KEY and _ROLES ("router,chat", optionally "economy"). The key defaults to OPENAI_API_KEY
+        for OpenAI's own URL only.
+        """
+        specs = []
+        for item in (os.getenv(name) or "").split(","):
+            if not item.strip():
+                continue
+            prefix = f"LLM_BACKEND_{item.strip().upper()}_"
+            url = os.getenv(prefix + "URL") or OPENAI_CHAT_URL
+            roles = os.getenv(prefix + "ROLES") or ",".join(REQUIRED_ROLES)
+            specs.append({
+                "name": item.strip(),
+                "url": url,
+                "model": os.getenv(prefix + "MODEL") or "gpt-3.5-turbo",
+                "api_key": os.getenv(prefix + "API_KEY") or (self.openai_key if url == OPENAI_CHAT_URL else None),
+                "roles": [r.strip().lower() for r in roles.split(",") if r.strip()],
+            })
+        return specs
+
+    def _get_weights(self, name):
+        """Parse "<id>:<weight>,<id>:<weight>" into {int id: int weight}."""
+        raw = os.getenv(name) or ""
+        weights = {}
+        for item in raw.split(","):
+            if not item.strip():
+                continue
+            key, _, value = item.partition(":")
+            if not key.strip().isdigit() or not value.strip().isdigit():
+                logger.error(f"{name} entries must look like <id>:<weight>, got '{item}'")
+                raise ValueError(f"{name} entries must look like <id>:<weight>")
+            weights[int(key)] = int(value)
+        return weights
+
+    def _get_number(self, name, default, cast):
+        raw = os.getenv(name)
+        if raw is None or raw.strip() == "":
+            return default
+        try:
+            return cast(raw)
+        except ValueError:
+            logger.error(f"{name} must be a number, got '{raw}'")
+            raise ValueError(f"{name} must be a number")
+
     def validate(self):
         if not self.token:
             logger.error("DISCORD_BOT_TOKEN is missing in .env")
@@ -27,6 +181,41 @@ class BotConfig:
         if not self.openai_key:
             logger.error("OPENAI_API_KEY is missing in .env")
             raise ValueError("OPENAI_API_KEY is required in the environment")
+        if self.routing_mode not in ("sequential", "combined", "speculative"):
+            logger.error(f"OPENAI_ROUTING_MODE '{self.routing_mode}' is not one of sequential, combined, speculative")
+            raise ValueError("OPENAI_ROUTING_MODE must be sequential, combined or speculative")
+        if self.log_format not in ("text", "json"):
+            logger.error(f"LOG_FORMAT '{self.log_format}' is not one of text, json")
+            raise ValueError("LOG_FORMAT must be text or json")
+        if self.log_bodies not in BODY_MODES:
+            logger.error(f"LOG_BODIES '{self.log_bodies}' is not one of {', '.join(BODY_MODES)}")
+            raise ValueError("LOG_BODIES must be full, truncate or redact")
+        if self.memory_embedder not in ("hashing", "openai"):
+            logger.error(f"MEMORY_EMBEDDER '{self.memory_embedder}' is not one of hashing, openai")
+            raise ValueError("MEMORY_EMBEDDER must be hashing or openai")
+        if self.memory_scope not in ("channel", "guild"):
+            logger.error(f"MEMORY_SCOPE '{self.memory_scope}' is not one of channel, guild")
+            raise ValueError("MEMORY_SCOPE must be channel or guild")
+        for spec in self.llm_backends:
+            unknown = [r for r in spec["roles"] if r not in ROLES]
+            if unknown:
+                logger.error(f"LLM backend '{spec['name']}' has unknown roles {unknown}, expected {', '.join(ROLES)}")
+                raise ValueError("LLM backend roles must be router, chat or economy")
+        if self.llm_backends:
+            missing = [r for r in REQUIRED_ROLES if not any(r in spec["roles"] for spec in self.llm_backends)]
+            if missing:
+                logger.error(f"LLM_BACKENDS has no backend for {', '.join(missing)}")
+                raise ValueError("LLM_BACKENDS must cover the router and chat roles")
+        if self.shard_ids and not self.shard_count:
+            logger.error("SHARD_IDS is set but SHARD_COUNT is not")
+            raise ValueError("SHARD_IDS requires SHARD_COUNT")
+        if any(i >= self.shard_count for i in self.shard_ids):
+            logger.error(f"SHARD_IDS {self.shard_ids} must all be below SHARD_COUNT {self.shard_count}")
+            raise ValueError("SHARD_IDS must be below SHARD_COUNT")
+        for name, level in [("LOG_LEVEL", self.log_level)] + list(self.log_levels.items()):
+            if not isinstance(logging.getLevelName(level), int):
+                logger.error(f"Unknown log level '{level}' for {name}")
+                raise ValueError(f"Unknown log level '{level}'")
 
     def get_token(self):
         return self.token
@@ -37,6 +226,183 @@ class BotConfig:
     def get_openai_key(self):
         return self.openai_key
 
+    def get_routing_mode(self):
+        return self.routing_mode
+
+    def get_intent_confidence(self):
+        """Minimum local classifier confidence to skip the LLM router (> 1 disables local routing)."""
+        return self.intent_confidence
+
+    def get_history_cache_options(self):
+        return {
+            "per_channel": self.history_per_channel,
+            "max_channels": self.history_max_channels,
+        }
+
+    def get_context_options(self):
+        return {
+            "token_budget": self.context_token_budget,
+            "max_messages": self.context_max_messages,
+        }
+
+    def get_streaming(self):
+        return self.streaming
+
+    def get_tool_calling(self):
+        return self.tool_calling
+
+    def get_stream_edit_interval(self):
+        return self.stream_edit_interval
+
+    def get_response_cache_options(self):
+        """Router/deterministic call cache; RESPONSE_CACHE_PATH adds an on-disk SQLite tier."""
+        return {
+            "max_entries": self.response_cache_size,
+            "ttl": self.response_cache_ttl,
+            "path": self.response_cache_path,
+        }
+
+    def get_retry_options(self):
+        return {
+            "max_retries": self.openai_max_retries,
+            "base_delay": self.openai_retry_base_delay,
+            "max_delay": self.openai_retry_max_delay,
+        }
+
+    def get_backend_specs(self):
+        """
+        LLM_BACKENDS as [{name, url, model, api_key, roles}]; empty means OpenAI only. Without
+        LLM_BACKENDS, USAGE_ECONOMY_MODEL adds an OpenAI economy backend next to the default one.
+        """
+        if not self.llm_backends and self.usage_economy_model:
+            return [
+                {"name": "openai", "url": OPENAI_CHAT_URL, "model": "gpt-3.5-turbo", "api_key": self.openai_key,
+                 "roles": list(REQUIRED_ROLES)},
+                {"name": "economy", "url": OPENAI_CHAT_URL, "model": self.usage_economy_model,
+                 "api_key": self.openai_key, "roles": ["economy"]},
+            ]
+        return self.llm_backends
+
+    def get_backend_pool_options(self):
+        return {
+            "hedge": self.llm_hedge,
+            "hedge_min": self.llm_hedge_min,
+            "cooldown": self.llm_backend_cooldown,
+        }
+
+    def get_usage_enabled(self):
+        return self.usage_enabled
+
+    def get_usage_options(self):
+        """UsageLedger settings; budgets are tokens per guild per UTC day (0 = unlimited)."""
+        return {
+            "path": self.usage_path,
+            "flush_interval": self.usage_flush_interval,
+            "daily_tokens": self.usage_daily_tokens,
+            "guild_budgets": self.usage_guild_budgets,
+        }
+
+    def get_scheduler_options(self):
+        return {
+            "max_concurrency": self.scheduler_concurrency,
+            "max_pending": self.scheduler_max_pending,
+            "coalesce_window": self.scheduler_coalesce_window,
+            "guild_weights": self.scheduler_guild_weights,
+        }
+
+    def get_logging_options(self):
+        return {
+            "fmt": self.log_format,
+            "level": self.log_level,
+            "levels": self.log_levels,
+            "body_mode": self.log_bodies,
+            "body_chars": self.log_body_chars,
+            "rate_burst": self.log_rate_burst,
+            "rate_window": self.log_rate_window,
+        }
+
+    def get_metrics_options(self):
+        return {
+            "enabled": self.metrics_enabled,
+            "host": self.metrics_host,
+            "port": self.metrics_port,
+            "tracing": self.metrics_tracing,
+        }
+
+    def get_event_match_options(self):
+        return {
+            "threshold": self.event_match_threshold,
+            "margin": self.event_match_margin,
+        }
+
+    def get_admission_options(self):
+        """Channels answered without a mention (besides DISCORD_CHANNEL_ID) and optional wake words."""
+        return {
+            "channel_ids": [self.get_channel_id()] + self.admission_channels,
+            "wake_words": self.admission_wake_words,
+        }
+
+    def get_memory_enabled(self):
+        return self.memory_enabled
+
+    def get_memory_embedder(self):
+        """(kind, model) for bot.memory.make_embedder."""
+        return self.memory_embedder, self.memory_embedding_model
+
+    def get_memory_options(self):
+        return {
+            "path": self.memory_path,
+            "max_per_guild": self.memory_max_per_guild,
+            "top_k": self.memory_top_k,
+            "token_budget": self.memory_token_budget,
+            "min_score": self.memory_min_score,
+            "scope": self.memory_scope,
+        }
+
+    def get_jobs_enabled(self):
+        return self.jobs_enabled
+
+    def get_jobs_options(self):
+        return {
+            "path": self.jobs_path,
+            "workers": self.jobs_workers,
+            "max_attempts": self.jobs_max_attempts,
+            # bot.launcher children share JOBS_PATH: each claims only the jobs of its own shards
+            "shard_count": self.shard_count if self.sharding else 0,
+            "shard_ids": self.shard_ids if self.sharding else None,
+        }
+
+    def get_summarize_min_chars(self):
+        """Messages at least this long get a background summary for later context (0 disables)."""
+        return self.summarize_min_chars
+
+    def get_answer_cache_enabled(self):
+        return self.answer_cache_enabled
+
+    def get_answer_cache_options(self):
+        """SemanticAnswerCache settings; questions are embedded with the MEMORY_EMBEDDER embedder."""
+        return {
+            "threshold": self.answer_cache_threshold,
+            "ttl": self.answer_cache_ttl,
+            "max_per_channel": self.answer_cache_max_per_channel,
+            "skip_words": self.answer_cache_skip_words,
+        }
+
+    def get_sharding(self):
+        return self.sharding
+
+    def get_shard_options(self):
+        """AutoShardedClient arguments: None lets discord.py use Discord's recommended count / all shards."""
+        if not self.sharding:
+            return {}
+        return {
+            "shard_count": self.shard_count or None,
+            "shard_ids": self.shard_ids or None,
+        }
+
+    def get_shard_processes(self):
+        return self.shard_processes
+
     def get_github_token(self):
         if not self.github_token:
             logger.error("GITHUB_TOKEN not set in .env")
@@ -45,4 +411,13 @@ class BotConfig:
     def get_github_repo(self):
         if not self.github_repo:
             logger.error("GITHUB_REPO not set in .env")
-        return self.github_repo
\ No newline at end of file
+        return self.github_repo
+
+    def get_http_pool_options(self):
+        """Connection pool settings shared by the long-lived aiohttp sessions."""
+        return {
+            "pool_size": self.http_pool_size,
+            "pool_per_host": self.http_pool_per_host,
+            "keepalive_timeout": self.http_keepalive_timeout,
+            "dns_cache_ttl": self.http_dns_cache_ttl,
+        }
@@ -0,0 +1,109 @@
+import re
+from bot.logger import setup_logger
+
+logger = setup_logger("Context")
+
+CODE_BLOCK_RE = re.compile(r"```[^\n`]*\n(.*?)```", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Fallback estimator: roughly 4 characters per token for English text and code."""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def default_tokenizer(model: str = "gpt-3.5-turbo"):
+    """
+    Return a callable text -> token count. Uses tiktoken when it is installed,
+    otherwise the character-based estimator.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=())) if text else 0
+
+
+def compact_code_blocks(text: str, max_block_lines: int = 40, keep_head: int = 15, keep_tail: int = 5) -> str:
+    """Shorten oversize fenced code blocks to their first and last lines, keeping the fences intact."""
+    if "```" not in text:
+        return text
+
+    def shorten(match):
+        body = match.group(1)
+        lines = body.splitlines()
+        if len(lines) <= max_block_lines:
+            return match.group(0)
+        omitted = len(lines) - keep_head - keep_tail
+        kept = lines[:keep_head] + [f"... [{omitted} lines omitted] ..."] + lines[-keep_tail:]
+        opening = match.group(0)[:match.start(1) - match.start(0)]
+        return opening + "\n".join(kept) + "\n```"
+
+    return CODE_BLOCK_RE.sub(shorten, text)
+
+
+class ContextBuilder:
+    """
+    Builds the chat history sent with each completion. Messages are taken newest to oldest
+    until the token budget (shared with the current message) is used up. Token counts and
+    compacted text are cached on the history cache entries, so each message is only
+    tokenized once however many turns it stays in context.
+    """
+
+    def __init__(self, token_budget: int = 1500, max_messages: int = 30, tokenizer=None, max_block_lines: int = 40):
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.tokenizer = tokenizer or default_tokenizer()
+        self.max_block_lines = max_block_lines
+        self.requests = 0
+        self.saved_tokens_total = 0
+
+    def _prepare(self, entry):
+        if entry.tokens is None:
+            entry.raw_tokens = self.tokenizer(entry.content)
+            if entry.summary:
+                entry.prompt = entry.summary
+            else:
+                entry.prompt = compact_code_blocks(entry.content, max_block_lines=self.max_block_lines)
+            entry.tokens = entry.raw_tokens if entry.prompt is entry.content else self.tokenizer(entry.prompt)
+        return entry
+
+    def build(self, entries, message: str = "", token_budget: int = None) -> tuple:
+        """
+        entries: CachedMessage objects, oldest first. token_budget overrides the configured budget.
+        Returns (history, stats): history as [{"role", "content"}] oldest first, and a dict with
+        used_tokens, raw_tokens and saved_tokens for this request.
+        """
+        budget = (self.token_budget if token_budget is None else token_budget) - self.tokenizer(message)
+        candidates = entries[-self.max_messages:] if self.max_messages else entries
+        selected = []
+        used = 0
+        raw = 0
+        full = False
+        for entry in reversed(candidates):
+            self._prepare(entry)
+            raw += entry.raw_tokens
+            if not full and used + entry.tokens <= budget:
+                selected.append(entry)
+                used += entry.tokens
+            else:
+                # Keep the window contiguous: once a message does not fit, older ones are dropped too
+                full = True
+        selected.reverse()
+        saved = raw - used
+        self.requests += 1
+        self.saved_tokens_total += saved
+        history = [{"role": e.role, "content": e.prompt} for e in selected]
+        return history, {"used_tokens": used, "raw_tokens": raw, "saved_tokens": saved}
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "saved_tokens_total": self.saved_tokens_total,
+            "avg_saved_tokens": (self.saved_tokens_total / self.requests) if self.requests else 0.0,
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import re
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from bot.logger import setup_logger
+
+logger = setup_logger("EventCache")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def title_trigrams(text) -> frozenset:
+    """Character trigrams of the normalized title (word-padded), for similarity ranking."""
+    if not text:
+        return frozenset()
+    normalized = " ".join(_TOKEN_RE.findall(text.lower()))
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def start_timestamp(event) -> float:
+    start = event.scheduled_start_time
+    return start.timestamp() if start is not None else 0.0
+
+
+def parse_iso_window(dt_str: str):
+    """
+    Turn an ISO string from the LLM into an epoch range covering its precision:
+    '2025-06-25' is the whole day, '2025-06-25T20:00' the whole minute, and so on.
+    Naive values are read as UTC. Returns (start, end) or None if unparseable.
+    """
+    if not dt_str:
+        return None
+    text = dt_str.strip().replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    time_part = text.split("T", 1)[1] if "T" in text else ""
+    time_part = re.split(r"[+-]", time_part, maxsplit=1)[0]
+    if not time_part:
+        width = 86400.0
+    elif time_part.count(":") == 0:
+        width = 3600.0
+    elif time_part.count(":") == 1:
+        width = 60.0
+    else:
+        width = 1.0
+    start = dt.timestamp()
+    return start, start + width
+
+
+class GuildEventIndex:
+    """
+    Scheduled events of one guild, indexed by id, by title trigram and by start time (a sorted list
+    searched with bisect): the candidate lookups of EventMatcher. The keys each id was indexed
+    under are kept, because discord.py updates cached events in place: remove() cannot rebuild
+    them from the event it is handed.
+    """
+
+    def __init__(self, events=()):
+        self.events = {}
+        self.by_trigram = {}
+        self.trigrams = {}
+        self.starts = {}
+        self.by_start = []
+        for event in events:
+            self.add(event)
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        if event.id in self.events:
+            self.remove(event.id)
+        self.events[event.id] = event
+        grams = title_trigrams(event.name)
+        self.trigrams[event.id] = grams
+        for gram in grams:
+            self.by_trigram.setdefault(gram, set()).add(event.id)
+        key = (start_timestamp(event), event.id)
+        self.starts[event.id] = key
+        insort(self.by_start, key)
+
+    def remove(self, event_id):
+        event = self.events.pop(event_id, None)
+        if event is None:
+            return None
+        for gram in self.trigrams.pop(event_id, ()):
+            ids = self.by_trigram.get(gram)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del self.by_trigram[gram]
+        key = self.starts.pop(event_id)
+        i = bisect_left(self.by_start, key)
+        if i < len(self.by_start) and self.by_start[i] == key:
+            del self.by_start[i]
+        return event
+
+    def get(self, event_id):
+        return self.events.get(event_id)
+
+    def all(self) -> list:
+        return list(self.events.values())
+
+    def between(self, start: float, end: float) -> list:
+        """Events starting in [start, end), earliest first."""
+        lo = bisect_left(self.by_start, (start, -1))
+        hi = bisect_left(self.by_start, (end, -1))
+        return [self.events[eid] for _, eid in self.by_start[lo:hi]]
+
+
+class ScheduledEventCache:
+    """
+    Per-guild GuildEventIndex, fetched once with guild.fetch_scheduled_events() and then kept
+    current from the gateway's scheduled event create/update/delete events.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+        self._seeding = {}
+        self.fetches = 0
+
+    async def _seed(self, guild):
+        events = await guild.fetch_scheduled_events()
+        self.fetches += 1
+        return GuildEventIndex(events)
+
+    async def get(self, guild) -> GuildEventIndex:
+        index = self._guilds.get(guild.id)
+        if index is not None:
+            return index
+        task = self._seeding.get(guild.id)
+        if task is None:
+            task = asyncio.ensure_future(self._seed(guild))
+            self._seeding[guild.id] = task
+        try:
+            index = await task
+        finally:
+            self._seeding.pop(guild.id, None)
+        return self._guilds.setdefault(guild.id, index)
+
+    def upsert(self, event):
+        index = self._guilds.get(event.guild_id)
+        if index is not None:
+            index.add(event)
+
+    def remove(self, event):
+        index = self._guilds.get(event.guild_id)
+        if index is not None:
+            index.remove(event.id)
+
+    def invalidate(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self._guilds),
+            "events": sum(len(i) for i in self._guilds.values()),
+            "fetches": self.fetches,
+        }
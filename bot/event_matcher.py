@@ -0,0 +1,82 @@
+from bot.event_cache import parse_iso_window, title_trigrams
+from bot.logger import setup_logger
+
+logger = setup_logger("EventMatcher")
+
+
+class EventMatch:
+    __slots__ = ("event", "score", "title_score", "time_score")
+
+    def __init__(self, event, score, title_score, time_score):
+        self.event = event
+        self.score = score
+        self.title_score = title_score
+        self.time_score = time_score
+
+    def __repr__(self):
+        return f"EventMatch({self.event.name!r}, score={self.score:.2f})"
+
+
+class EventMatcher:
+    """
+    Ranks a guild's scheduled events against the title/datetime an LLM extracted from a request.
+      - title: Dice similarity of character trigrams, candidates gathered from the trigram index
+      - time:  1.0 inside the window the datetime denotes, decaying linearly to 0 over time_slack
+               seconds on either side; candidates come from a bisect range query
+    A ranking is confident when the best score clears `threshold` and beats the runner-up by `margin`.
+    """
+
+    def __init__(self, threshold: float = 0.55, margin: float = 0.15, time_slack: float = 3 * 3600,
+                 title_weight: float = 0.6):
+        self.threshold = threshold
+        self.margin = margin
+        self.time_slack = time_slack
+        self.title_weight = title_weight
+
+    def _title_scores(self, index, title) -> dict:
+        query = title_trigrams(title)
+        if not query:
+            return {}
+        overlap = {}
+        for gram in query:
+            for eid in index.by_trigram.get(gram, ()):
+                overlap[eid] = overlap.get(eid, 0) + 1
+        return {
+            eid: 2.0 * shared / (len(query) + len(index.trigrams[eid]))
+            for eid, shared in overlap.items()
+        }
+
+    def _time_scores(self, index, window) -> dict:
+        start, end = window
+        scores = {}
+        for ev in index.between(start - self.time_slack, end + self.time_slack):
+            ts = ev.scheduled_start_time.timestamp()
+            distance = 0.0 if start <= ts < end else min(abs(ts - start), abs(ts - end))
+            scores[ev.id] = max(0.0, 1.0 - distance / self.time_slack)
+        return scores
+
+    def rank(self, index, title=None, dt_str=None, limit: int = 5) -> list:
+        """Best matches first, at most `limit` of them."""
+        window = parse_iso_window(dt_str)
+        use_title = bool(title_trigrams(title))
+        use_time = window is not None
+        title_scores = self._title_scores(index, title) if use_title else {}
+        time_scores = self._time_scores(index, window) if use_time else {}
+        matches = []
+        for eid in set(title_scores) | set(time_scores):
+            t_score = title_scores.get(eid, 0.0)
+            d_score = time_scores.get(eid, 0.0)
+            if use_title and use_time:
+                score = self.title_weight * t_score + (1 - self.title_weight) * d_score
+            elif use_title:
+                score = t_score
+            else:
+                score = d_score
+            matches.append(EventMatch(index.get(eid), score, t_score, d_score))
+        matches.sort(key=lambda m: (m.score, m.event.scheduled_start_time.timestamp()), reverse=True)
+        return matches[:limit]
+
+    def is_confident(self, matches) -> bool:
+        if not matches or matches[0].score < self.threshold:
+            return False
+        return len(matches) == 1 or matches[0].score - matches[1].score >= self.margin
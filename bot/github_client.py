@@ -1,18 +1,124 @@
-import requests
+import re
+from collections import OrderedDict
+import aiohttp
 from bot.logger import setup_logger
+from bot.metrics import NULL_METRICS
 
 logger = setup_logger("GitHub")
 
+_LINK_RE = re.compile(r'<([^>]+)>\s*;\s*rel="([^"]+)"')
+
+
+def parse_link_header(value: str) -> dict:
+    """Parse a GitHub Link header into {rel: url}."""
+    if not value:
+        return {}
+    return {rel: url for url, rel in _LINK_RE.findall(value)}
+
+
 class GitHubClient:
-    def __init__(self, token: str, repo: str):
+    """
+    asyncio GitHub REST client on one pooled aiohttp session.
+    GET requests are conditional: the ETag of every response is kept in a local LRU and sent back
+    as If-None-Match, so unchanged resources come back as 304 (which GitHub does not count against
+    the rate limit). List endpoints follow Link-header pagination.
+    """
+
+    def __init__(self, token: str, repo: str, api_url: str = "https://api.github.com", pool_size: int = 20,
+                 pool_per_host: int = 10, keepalive_timeout: float = 75.0, dns_cache_ttl: int = 300,
+                 etag_cache_size: int = 512, metrics=None):
         self.token = token
         self.repo = repo
-        self.base_url = f"https://api.github.com/repos/{repo}"
+        self.api_url = api_url.rstrip("/")
+        self.base_url = f"{self.api_url}/repos/{repo}"
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.etag_cache_size = etag_cache_size
+        self._etags = OrderedDict()
+        self.metrics = metrics or NULL_METRICS
+        self._session = None
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.requests = 0
+        self.not_modified = 0
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"token {self.token}"
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=20), headers=headers
+        )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    def _track_rate_limit(self, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+        reset = headers.get("X-RateLimit-Reset")
+        if reset is not None and reset.isdigit():
+            self.rate_limit_reset = int(reset)
 
-    def create_pr(self, branch: str, title: str, body: str, base: str = "main"):
+    async def _get(self, url: str):
+        """
+        Conditional GET. Returns (data, links); served from the ETag cache on 304.
+        Raises aiohttp.ClientResponseError on HTTP errors.
+        """
+        session = await self._get_session()
+        headers = {}
+        cached = self._etags.get(url)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        self.requests += 1
+        with self.metrics.stage("github", method="GET"):
+            async with session.get(url, headers=headers) as resp:
+                self._track_rate_limit(resp.headers)
+                if resp.status == 304 and cached is not None:
+                    self.not_modified += 1
+                    self._etags.move_to_end(url)
+                    return cached[1], cached[2]
+                resp.raise_for_status()
+                data = await resp.json()
+                links = parse_link_header(resp.headers.get("Link", ""))
+                etag = resp.headers.get("ETag")
+        if etag:
+            self._etags[url] = (etag, data, links)
+            self._etags.move_to_end(url)
+            while len(self._etags) > self.etag_cache_size:
+                self._etags.popitem(last=False)
+        return data, links
+
+    async def paginate(self, url: str):
+        """Async iterator over every item of a list endpoint, following rel="next" links."""
+        while url:
+            data, links = await self._get(url)
+            for item in data:
+                yield item
+            url = links.get("next")
+
+    async def create_pr(self, branch: str, title: str, body: str, base: str = "main"):
         """Creates a Pull Request on GitHub (assumes branch already pushed to remote)."""
         url = f"{self.base_url}/pulls"
-        headers = {"Authorization": f"token {self.token}", "Accept": "application/vnd.github+json"}
         data = {
             "title": title,
             "head": branch,
@@ -20,35 +126,32 @@ class GitHubClient:
             "body": body
         }
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            response.raise_for_status()
-            pr_data = response.json()
+            session = await self._get_session()
+            self.requests += 1
+            with self.metrics.stage("github", method="POST"):
+                async with session.post(url, json=data) as resp:
+                    self._track_rate_limit(resp.headers)
+                    resp.raise_for_status()
+                    pr_data = await resp.json()
             logger.info(f"Created PR: {pr_data.get('html_url')}")
             return pr_data
         except Exception as e:
             logger.error(f"Error creating PR: {e}")
             return None
-    def list_repos(self, org_or_user: str):
-        """List repos for an organization or user."""
-        url = f"https://api.github.com/users/{org_or_user}/repos"
-        headers = {"Authorization": f"token {self.token}"}
+
+    async def list_repos(self, org_or_user: str):
+        """List repos for an organization or user (all pages)."""
+        url = f"{self.api_url}/users/{org_or_user}/repos?per_page=100"
         try:
-            response = requests.get(url, headers=headers, timeout=20)
-            response.raise_for_status()
-            data = response.json()
-            return [repo['full_name'] for repo in data]
+            return [repo["full_name"] async for repo in self.paginate(url)]
         except Exception as e:
             logger.error(f"Error listing repos for {org_or_user}: {e}")
             return []
 
-    def list_pull_requests(self, repo: str, state="open"):
-        """List PRs for the given repo."""
-        url = f"https://api.github.com/repos/{repo}/pulls?state={state}"
-        headers = {"Authorization": f"token {self.token}"}
+    async def list_pull_requests(self, repo: str, state="open"):
+        """List PRs for the given repo (all pages)."""
+        url = f"{self.api_url}/repos/{repo}/pulls?state={state}&per_page=100"
         try:
-            response = requests.get(url, headers=headers, timeout=20)
-            response.raise_for_status()
-            data = response.json()
             return [
                 {
                     "number": pr["number"],
@@ -56,20 +159,26 @@ class GitHubClient:
                     "url": pr["html_url"],
                     "user": pr["user"]["login"],
                 }
-                for pr in data
+                async for pr in self.paginate(url)
             ]
         except Exception as e:
             logger.error(f"Error listing PRs for {repo}: {e}")
             return []
-        
-    def get_pull_request(self, repo: str, pr_number: int):
-            """Fetch PR details from GitHub."""
-            url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-            headers = {"Authorization": f"token {self.token}"}
-            try:
-                response = requests.get(url, headers=headers, timeout=20)
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                logger.error(f"Error fetching PR {pr_number} from {repo}: {e}")
-                return None
\ No newline at end of file
+
+    async def get_pull_request(self, repo: str, pr_number: int):
+        """Fetch PR details from GitHub."""
+        url = f"{self.api_url}/repos/{repo}/pulls/{pr_number}"
+        try:
+            data, _ = await self._get(url)
+            return data
+        except Exception as e:
+            logger.error(f"Error fetching PR {pr_number} from {repo}: {e}")
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "rate_limit_remaining": self.rate_limit_remaining,
+            "etag_entries": len(self._etags),
+        }
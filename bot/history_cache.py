@@ -0,0 +1,138 @@
+import asyncio
+from collections import OrderedDict, deque
+from bot.logger import setup_logger
+
+logger = setup_logger("HistoryCache")
+
+
+class CachedMessage:
+    # tokens/raw_tokens/prompt are filled lazily by the ContextBuilder and reset on edit;
+    # summary is set by the background summarize job for long messages
+    __slots__ = ("id", "role", "content", "tokens", "raw_tokens", "prompt", "summary")
+
+    def __init__(self, id, role, content):
+        self.id = id
+        self.role = role
+        self.content = content
+        self.tokens = None
+        self.raw_tokens = None
+        self.prompt = None
+        self.summary = None
+
+    @classmethod
+    def from_discord(cls, message):
+        return cls(message.id, "assistant" if message.author.bot else "user", message.content)
+
+
+class ChannelHistoryCache:
+    """
+    Per-channel ring buffers of recent messages, kept current from gateway events.
+    A channel is seeded from channel.history() the first time its context is needed;
+    after that, building context is a local lookup. Each buffer holds at most
+    per_channel messages and the least recently used channels are evicted past max_channels.
+    """
+
+    def __init__(self, per_channel: int = 50, max_channels: int = 256):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        self._channels = OrderedDict()
+        self._seeding = {}
+        self.seeds = 0
+        self.evictions = 0
+
+    def __contains__(self, channel_id):
+        return channel_id in self._channels
+
+    def _touch(self, channel_id, buffer):
+        self._channels[channel_id] = buffer
+        self._channels.move_to_end(channel_id)
+        while len(self._channels) > self.max_channels:
+            evicted, _ = self._channels.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted idle channel {evicted} from history cache")
+
+    async def _seed(self, channel):
+        buffer = deque(maxlen=self.per_channel)
+        async for msg in channel.history(limit=self.per_channel):
+            if msg.content:
+                buffer.appendleft(CachedMessage.from_discord(msg))
+        self.seeds += 1
+        return buffer
+
+    async def get_messages(self, channel, limit: int = 10, exclude_ids=()) -> list:
+        """
+        Return up to `limit` most recent cached messages (oldest first), seeding the channel if needed.
+        exclude_ids: message ids to leave out (the ones currently being answered).
+        """
+        buffer = self._channels.get(channel.id)
+        if buffer is None:
+            # Concurrent first messages in a channel share one history fetch
+            task = self._seeding.get(channel.id)
+            if task is None:
+                task = asyncio.ensure_future(self._seed(channel))
+                self._seeding[channel.id] = task
+            try:
+                seeded = await task
+            finally:
+                self._seeding.pop(channel.id, None)
+            buffer = self._channels.get(channel.id)
+            if buffer is None:
+                buffer = seeded
+        self._touch(channel.id, buffer)
+        entries = [m for m in buffer if m.id not in exclude_ids]
+        return entries[-limit:] if limit else entries
+
+    async def get_history(self, channel, limit: int = 10, exclude_ids=()) -> list:
+        """Recent messages as chat-completion dicts: [{"role": ..., "content": ...}, ...]."""
+        entries = await self.get_messages(channel, limit=limit, exclude_ids=exclude_ids)
+        return [{"role": m.role, "content": m.content} for m in entries]
+
+    def record(self, message):
+        """Append a new gateway message. Channels that were never seeded are left alone."""
+        buffer = self._channels.get(message.channel.id)
+        if buffer is None or not message.content:
+            return
+        buffer.append(CachedMessage.from_discord(message))
+        self._channels.move_to_end(message.channel.id)
+
+    def update(self, message):
+        buffer = self._channels.get(message.channel.id)
+        if buffer is None:
+            return
+        for i, cached in enumerate(buffer):
+            if cached.id == message.id:
+                if message.content:
+                    cached.content = message.content
+                    cached.summary = None
+                    cached.tokens = None
+                else:
+                    del buffer[i]
+                return
+
+    def set_summary(self, channel_id, message_id, summary: str):
+        """Use `summary` instead of the full text when the message is sent as context from now on."""
+        buffer = self._channels.get(channel_id)
+        if buffer is None:
+            return
+        for cached in buffer:
+            if cached.id == message_id:
+                cached.summary = summary
+                cached.tokens = None
+                return
+
+    def remove(self, channel_id, message_id):
+        buffer = self._channels.get(channel_id)
+        if buffer is None:
+            return
+        for i, cached in enumerate(buffer):
+            if cached.id == message_id:
+                del buffer[i]
+                return
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "messages": sum(len(b) for b in self._channels.values()),
+            "seeds": self.seeds,
+            "evictions": self.evictions,
+        }
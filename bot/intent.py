@@ -0,0 +1,218 @@
+import math
+import re
+import time
+import zlib
+from bot.logger import setup_logger
+
+logger = setup_logger("Intent")
+
+INTENTS = ("DEVELOPER", "EVENT", "ASSISTANT")
+
+# Keyword automaton: one compiled alternation, scanned once per message; the named group
+# that matched tells which intent the keyword votes for.
+_KEYWORDS = {
+    "DEVELOPER": [
+        r"python", r"java", r"\bjs\b", r"typescript", r"react", r"\bbug", r"debug", r"\berror", r"stack ?trace",
+        r"exception", r"variable", r"function", r"\bmethod", r"\bclass\b", r"\bloop", r"\barray", r"\bdict(ionary)?\b",
+        r"\bapi\b", r"database", r"\bsql\b", r"nosql", r"compil", r"\bdeploy", r"docker", r"test case", r"test failed",
+        r"pytest", r"\bimport\b", r"\bcode\b", r"```", r"\btry:", r"\bdef\s", r"\bpublic\s", r"\bprivate\s",
+        r"\bconst\s", r"\blet\s", r"\bvar\s", r"regex", r"refactor", r"\bgit\b", r"traceback", r"null pointer",
+        r"segfault", r"endpoint", r"\bnpm\b", r"\bpip\b",
+    ],
+    "EVENT": [
+        r"\bschedul", r"\breschedul", r"\bmeeting", r"\bevents?\b", r"\bremind", r"calendar", r"\bcancel",
+        r"postpone", r"\bbook\b", r"set up a call", r"\bsync\b", r"stand-?up", r"\btonight\b", r"\btomorrow\b",
+        r"\bnext (week|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+        r"\b(on|this) (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+        r"\b\d{1,2}(:\d{2})?\s?(am|pm)\b", r"\bat \d{1,2}(:\d{2})?\b",
+    ],
+    "ASSISTANT": [
+        r"^(hi|hello|hey|yo)\b", r"\bthanks?\b", r"thank you", r"what can you do", r"who are you", r"how are you",
+        r"\bjoke\b", r"roadmap", r"\bfeatures?\b", r"what year", r"good (morning|night|evening)", r"\brecipe",
+        r"\bweather\b", r"\btranslate\b", r"\bsummar",
+    ],
+}
+KEYWORD_AUTOMATON = re.compile(
+    "|".join(f"(?P<{intent}>{'|'.join(patterns)})" for intent, patterns in _KEYWORDS.items())
+)
+
+PR_REQUEST_AUTOMATON = re.compile(
+    r"pull request|open a pr|make a pr|create a pr|start a pr|github pr|review pr|merge this|branch and pr"
+)
+
+_WORD_RE = re.compile(r"[a-z0-9_']+|[^\sa-z0-9_']")
+
+# Seed corpus for the hashed n-gram model; trained once when the classifier is built.
+TRAINING_EXAMPLES = [
+    ("DEVELOPER", "why does my python script throw a keyerror"),
+    ("DEVELOPER", "how do i reverse a list in python"),
+    ("DEVELOPER", "can you review this function for me"),
+    ("DEVELOPER", "what's the difference between let and const in javascript"),
+    ("DEVELOPER", "my docker build keeps failing on pip install"),
+    ("DEVELOPER", "how do i write a sql join across three tables"),
+    ("DEVELOPER", "getting a null pointer exception in java"),
+    ("DEVELOPER", "explain async await in typescript"),
+    ("DEVELOPER", "how should i structure a react component with hooks"),
+    ("DEVELOPER", "the pytest suite fails on ci but passes locally"),
+    ("DEVELOPER", "what is the best way to handle errors in a rest api"),
+    ("DEVELOPER", "write a regex that matches email addresses"),
+    ("DEVELOPER", "how do i squash commits in git"),
+    ("DEVELOPER", "refactor this class to use dependency injection"),
+    ("DEVELOPER", "why is my for loop so slow"),
+    ("DEVELOPER", "how do i deploy a flask app"),
+    ("DEVELOPER", "segfault when calling the c extension"),
+    ("DEVELOPER", "what does this stack trace mean"),
+    ("DEVELOPER", "how do i mock a database call in tests"),
+    ("DEVELOPER", "is a dict lookup constant time"),
+    ("EVENT", "schedule a meeting tomorrow at 10am"),
+    ("EVENT", "can you set up a call with ana on friday at 2pm"),
+    ("EVENT", "plan a team sync next monday"),
+    ("EVENT", "cancel the standup tomorrow"),
+    ("EVENT", "move the demo to thursday at 4pm"),
+    ("EVENT", "reschedule our retro to next week"),
+    ("EVENT", "remind everyone about the launch party tonight"),
+    ("EVENT", "create an event for the workshop on saturday"),
+    ("EVENT", "delete the planning event"),
+    ("EVENT", "update the description of the design review event"),
+    ("EVENT", "book a meeting with faizan and faseeh tonight at 8pm"),
+    ("EVENT", "what's on the calendar this week"),
+    ("EVENT", "change the location of tomorrow's meeting"),
+    ("EVENT", "postpone the kickoff by an hour"),
+    ("EVENT", "organise a game night on friday at 9"),
+    ("EVENT", "add a review session at 3pm"),
+    ("ASSISTANT", "hey gideon"),
+    ("ASSISTANT", "thanks a lot"),
+    ("ASSISTANT", "thank you so much"),
+    ("ASSISTANT", "what can you do"),
+    ("ASSISTANT", "who are you"),
+    ("ASSISTANT", "how are you today"),
+    ("ASSISTANT", "tell me a joke"),
+    ("ASSISTANT", "what features are coming next"),
+    ("ASSISTANT", "what's on the roadmap"),
+    ("ASSISTANT", "what year is it"),
+    ("ASSISTANT", "what's 3 plus 2"),
+    ("ASSISTANT", "good morning everyone"),
+    ("ASSISTANT", "give me a recipe for pancakes"),
+    ("ASSISTANT", "translate hello into french"),
+    ("ASSISTANT", "summarize the news for me"),
+    ("ASSISTANT", "what is the capital of belgium"),
+    ("ASSISTANT", "hello there"),
+    ("ASSISTANT", "how tall is the eiffel tower"),
+    ("ASSISTANT", "recommend a good book"),
+    ("ASSISTANT", "what's the weather like"),
+]
+
+
+def is_pr_request(text: str) -> bool:
+    """True when the (lower-cased) message asks for pull request automation."""
+    return PR_REQUEST_AUTOMATON.search(text) is not None
+
+
+class IntentResult:
+    __slots__ = ("persona", "confidence", "keyword_hits")
+
+    def __init__(self, persona, confidence, keyword_hits):
+        self.persona = persona
+        self.confidence = confidence
+        self.keyword_hits = keyword_hits
+
+    def __repr__(self):
+        return f"IntentResult({self.persona}, confidence={self.confidence:.2f}, keyword_hits={self.keyword_hits})"
+
+
+class IntentClassifier:
+    """
+    Local, in-process persona router. Combines the keyword automaton with a small softmax
+    model over hashed word/bigram/char-trigram features. classify() returns the best persona
+    and its probability; callers only skip the LLM router when confidence >= threshold.
+    """
+
+    def __init__(self, threshold: float = 0.9, n_buckets: int = 1 << 14, keyword_weight: float = 1.5,
+                 examples=None, epochs: int = 40, learning_rate: float = 0.5):
+        self.threshold = threshold
+        self.n_buckets = n_buckets
+        self.keyword_weight = keyword_weight
+        self.weights = {intent: {} for intent in INTENTS}
+        self.bias = {intent: 0.0 for intent in INTENTS}
+        self.calls = 0
+        self.local_hits = 0
+        self.total_us = 0.0
+        self._train(examples if examples is not None else TRAINING_EXAMPLES, epochs, learning_rate)
+
+    def _features(self, text: str):
+        words = _WORD_RE.findall(text)
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {text} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        buckets = {}
+        for g in grams:
+            b = zlib.crc32(g.encode("utf-8")) % self.n_buckets
+            buckets[b] = buckets.get(b, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in buckets.values())) or 1.0
+        return {b: v / norm for b, v in buckets.items()}
+
+    def _softmax(self, features, hits):
+        logits = {}
+        for intent in INTENTS:
+            w = self.weights[intent]
+            score = self.bias[intent] + self.keyword_weight * hits[intent]
+            for b, v in features.items():
+                score += w.get(b, 0.0) * v
+            logits[intent] = score
+        top = max(logits.values())
+        exps = {intent: math.exp(s - top) for intent, s in logits.items()}
+        total = sum(exps.values())
+        return {intent: e / total for intent, e in exps.items()}
+
+    def _keyword_hits(self, text: str):
+        hits = {intent: 0 for intent in INTENTS}
+        for m in KEYWORD_AUTOMATON.finditer(text):
+            hits[m.lastgroup] += 1
+        return hits
+
+    def _train(self, examples, epochs, learning_rate):
+        # Plain SGD on the cross-entropy loss, in a fixed order so the model is reproducible
+        prepared = [(label, self._features(text.lower()), self._keyword_hits(text.lower())) for label, text in examples]
+        for _ in range(epochs):
+            for label, features, hits in prepared:
+                probs = self._softmax(features, hits)
+                for intent in INTENTS:
+                    grad = probs[intent] - (1.0 if intent == label else 0.0)
+                    if grad == 0.0:
+                        continue
+                    w = self.weights[intent]
+                    for b, v in features.items():
+                        w[b] = w.get(b, 0.0) - learning_rate * grad * v
+                    self.bias[intent] -= learning_rate * grad * 0.1
+
+    def classify(self, text: str) -> IntentResult:
+        t0 = time.perf_counter()
+        lowered = text.lower()
+        hits = self._keyword_hits(lowered)
+        probs = self._softmax(self._features(lowered), hits)
+        persona = max(probs, key=probs.get)
+        result = IntentResult(persona, probs[persona], hits)
+        self.calls += 1
+        self.total_us += (time.perf_counter() - t0) * 1e6
+        return result
+
+    def is_confident(self, result: IntentResult) -> bool:
+        return result.confidence >= self.threshold
+
+    def record_local_route(self):
+        """Count a message that was routed without calling the LLM router."""
+        self.local_hits += 1
+        if self.local_hits % 100 == 0:
+            stats = self.stats()
+            logger.info(
+                f"Local intent routing saved {stats['saved_fraction']:.0%} of router calls "
+                f"({stats['avg_latency_us']:.0f}us per classification)"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "local_hits": self.local_hits,
+            "saved_fraction": (self.local_hits / self.calls) if self.calls else 0.0,
+            "avg_latency_us": (self.total_us / self.calls) if self.calls else 0.0,
+        }
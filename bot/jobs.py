@@ -0,0 +1,250 @@
+import asyncio
+import json
+import sqlite3
+import time
+from bot.logger import setup_logger
+from bot.metrics import NULL_METRICS
+from bot.sharding import shard_for
+
+logger = setup_logger("Jobs")
+
+
+class JobKind:
+    __slots__ = ("name", "handler", "batch_size", "priority", "batches", "jobs", "failures")
+
+    def __init__(self, name, handler, batch_size, priority):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.priority = priority
+        self.batches = 0
+        self.jobs = 0
+        self.failures = 0
+
+
+class JobQueue:
+    """
+    Durable background work: jobs are rows in a local SQLite queue, run by a small asyncio worker pool.
+      - register(kind, handler, batch_size, priority): handler(payloads) gets up to batch_size queued
+        jobs of one kind at once, so many small requests become one upstream call
+      - lower priority numbers run first; a job is retried max_attempts times, then marked failed
+      - submit() only appends to an in-process buffer; the buffer is written to SQLite every
+        batch_window seconds, so callers on the reply path never wait on disk
+      - while busy() is true (replies queued or running) workers start no new batch: interactive
+        work always goes first and background calls never compete with it for the rate limit
+    Each job records the gateway shard of its guild. With shard_ids (a bot.launcher child, whose
+    siblings share the same file) a queue only claims its own shards' jobs, whose guild state lives
+    in this process, and on start or stop only requeues those shards' running jobs: they were
+    claimed by the process that served the shards before, which is gone. Without shard_ids the
+    process owns the whole file.
+    """
+
+    def __init__(self, path: str = "gideon_jobs.sqlite3", workers: int = 2, batch_window: float = 0.25,
+                 max_attempts: int = 3, busy=None, poll_interval: float = 0.2, retry_delay: float = 1.0,
+                 shard_count: int = 0, shard_ids=None, metrics=None):
+        self.path = path
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.busy = busy
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.shard_count = shard_count
+        self.shard_ids = list(shard_ids) if shard_ids else None
+        self.metrics = metrics or NULL_METRICS
+        self.kinds = {}
+        self._conn = None
+        # sqlite calls run in a worker thread so they never block the event loop; one at a time
+        self._db_lock = asyncio.Lock()
+        self._incoming = []
+        self._ready = asyncio.Event()
+        self._tasks = []
+        self.queued = 0
+        self.running = 0
+        self.failed = 0
+        self.deferrals = 0
+
+    def register(self, kind: str, handler, batch_size: int = 1, priority: int = 5):
+        self.kinds[kind] = JobKind(kind, handler, batch_size, priority)
+
+    def submit(self, kind: str, payload, priority: int = None, guild_id=None):
+        """Queue a job for guild_id (None: DMs or no guild). Never blocks; durable from the next batch_window tick."""
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        if priority is None:
+            priority = self.kinds[kind].priority
+        shard = shard_for(guild_id, self.shard_count)
+        self._incoming.append((kind, json.dumps(payload), priority, time.time(), shard))
+        self.queued += 1
+
+    def _mine(self):
+        """SQL condition (and its parameters) for the jobs this process may claim and requeue."""
+        if self.shard_ids is None:
+            return "1", ()
+        return f"shard IN ({', '.join('?' * len(self.shard_ids))})", tuple(self.shard_ids)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+            "payload TEXT NOT NULL, priority INTEGER NOT NULL, created REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, state TEXT NOT NULL DEFAULT 'queued')"
+        )
+        if "shard" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+            # Queues written before jobs were tagged with a shard
+            conn.execute("ALTER TABLE jobs ADD COLUMN shard INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (state, priority, id)")
+        conn.commit()
+        return conn
+
+    def _requeue_running(self):
+        """Claimed by the process that served our shards before (gone now): run them again."""
+        mine, params = self._mine()
+        self._conn.execute(f"UPDATE jobs SET state = 'queued' WHERE state = 'running' AND {mine}", params)
+        self._conn.commit()
+
+    def _count_queued(self):
+        mine, params = self._mine()
+        return self._conn.execute(f"SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND {mine}", params).fetchone()[0]
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._conn = await asyncio.to_thread(self._open)
+        await asyncio.to_thread(self._requeue_running)
+        self.queued += await asyncio.to_thread(self._count_queued)
+        if self.queued:
+            logger.info(f"Resuming {self.queued} queued background jobs")
+            self._ready.set()
+        self._tasks = [asyncio.create_task(self._writer())]
+        self._tasks += [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._conn is not None:
+            # Jobs submitted since the last tick are kept for the next start
+            await self._write_incoming()
+            async with self._db_lock:
+                await asyncio.to_thread(self._requeue_running)
+                await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    async def _write_incoming(self):
+        if not self._incoming:
+            return
+        rows, self._incoming = self._incoming, []
+        async with self._db_lock:
+            await asyncio.to_thread(self._insert, rows)
+        self._ready.set()
+
+    def _insert(self, rows):
+        self._conn.executemany("INSERT INTO jobs (kind, payload, priority, created, shard) VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+
+    async def _writer(self):
+        while True:
+            await asyncio.sleep(self.batch_window)
+            try:
+                await self._write_incoming()
+            except Exception as e:
+                logger.error(f"Writing background jobs failed: {e}")
+
+    def _claim(self):
+        """Take the next batch of our shards: the most urgent queued kind, up to its batch_size, oldest first."""
+        mine, params = self._mine()
+        while True:
+            row = self._conn.execute(
+                f"SELECT kind FROM jobs WHERE state = 'queued' AND {mine} ORDER BY priority, id LIMIT 1", params
+            ).fetchone()
+            if row is None:
+                return None, []
+            kind = self.kinds.get(row[0])
+            if kind is not None:
+                break
+            # Left over from a build that had this handler; park it instead of spinning on it
+            self._conn.execute(f"UPDATE jobs SET state = 'failed' WHERE kind = ? AND state = 'queued' AND {mine}",
+                               (row[0],) + params)
+            self._conn.commit()
+            logger.error(f"No handler for queued background jobs of kind '{row[0]}'")
+        rows = self._conn.execute(
+            f"SELECT id, payload, attempts FROM jobs WHERE state = 'queued' AND kind = ? AND {mine} "
+            "ORDER BY priority, id LIMIT ?",
+            (kind.name,) + params + (kind.batch_size,),
+        ).fetchall()
+        self._conn.executemany("UPDATE jobs SET state = 'running', attempts = attempts + 1 WHERE id = ?",
+                               [(r[0],) for r in rows])
+        self._conn.commit()
+        return kind, rows
+
+    def _finish(self, done_ids, retry_ids, failed_ids):
+        self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in done_ids])
+        self._conn.executemany("UPDATE jobs SET state = 'queued' WHERE id = ?", [(i,) for i in retry_ids])
+        self._conn.executemany("UPDATE jobs SET state = 'failed' WHERE id = ?", [(i,) for i in failed_ids])
+        self._conn.commit()
+
+    async def _worker(self, n):
+        while True:
+            await self._ready.wait()
+            # Interactive replies first: start nothing new while any are waiting or running
+            while self.busy is not None and self.busy():
+                self.deferrals += 1
+                await asyncio.sleep(self.poll_interval)
+            # Cleared before looking, so a submission that lands meanwhile sets it again
+            self._ready.clear()
+            async with self._db_lock:
+                kind, rows = await asyncio.to_thread(self._claim)
+            if not rows:
+                continue
+            # There may be more: let the other workers look too
+            self._ready.set()
+            await self._run_batch(kind, rows)
+
+    async def _run_batch(self, kind, rows):
+        ids = [r[0] for r in rows]
+        self.queued -= len(rows)
+        self.running += len(rows)
+        try:
+            with self.metrics.stage("job", kind=kind.name):
+                await kind.handler([json.loads(r[1]) for r in rows])
+        except Exception as e:
+            kind.failures += 1
+            retry = [r[0] for r in rows if r[2] + 1 < self.max_attempts]
+            failed = [r[0] for r in rows if r[2] + 1 >= self.max_attempts]
+            logger.error(f"Background {kind.name} batch of {len(rows)} failed: {e}")
+            self.queued += len(retry)
+            self.failed += len(failed)
+            self.metrics.count("gideon_jobs_total", len(failed), kind=kind.name, outcome="failed")
+            async with self._db_lock:
+                await asyncio.to_thread(self._finish, [], retry, failed)
+            if retry:
+                # Back off before this worker (or another) picks the batch up again
+                await asyncio.sleep(min(self.retry_delay * 2 ** rows[0][2], 60.0))
+                self._ready.set()
+        else:
+            kind.batches += 1
+            kind.jobs += len(rows)
+            self.metrics.count("gideon_jobs_total", len(rows), kind=kind.name, outcome="done")
+            async with self._db_lock:
+                await asyncio.to_thread(self._finish, ids, [], [])
+        finally:
+            self.running -= len(rows)
+
+    def stats(self) -> dict:
+        batches = sum(k.batches for k in self.kinds.values())
+        jobs = sum(k.jobs for k in self.kinds.values())
+        stats = {
+            "queued": self.queued,
+            "running": self.running,
+            "failed": self.failed,
+            "deferrals": self.deferrals,
+            "batches": batches,
+            "jobs_per_batch": (jobs / batches) if batches else 0.0,
+        }
+        for kind in self.kinds.values():
+            stats[f"{kind.name}_jobs_per_batch"] = (kind.jobs / kind.batches) if kind.batches else 0.0
+            stats[f"{kind.name}_batch_fill"] = (kind.jobs / (kind.batches * kind.batch_size)) if kind.batches else 0.0
+        return stats
@@ -0,0 +1,154 @@
+"""
+Multi-process shard launcher: splits the bot's gateway shards over several processes.
+
+    SHARD_COUNT=8 SHARD_PROCESSES=4 python -m bot.launcher
+
+Each child runs bot.main with SHARDING=1 and its own slice of SHARD_IDS. When METRICS_ENABLED is
+on, child i serves /metrics on METRICS_PORT + i. SHARD_COUNT=0 asks Discord for the recommended
+count, and SHARD_PROCESSES=0 uses one process per CPU core. Children that crash are restarted
+with exponential backoff. SIGINT/SIGTERM stop all of them.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+import time
+
+import aiohttp
+
+from bot.config import BotConfig
+from bot.logger import setup_logger, configure_logging
+from bot.sharding import split_shards
+
+logger = setup_logger("Launcher")
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+# Discord allows max_concurrency IDENTIFYs per 5 seconds across all processes of a bot
+IDENTIFY_INTERVAL = 5.0
+MAX_BACKOFF = 60.0
+
+
+async def fetch_gateway_info(token: str) -> dict:
+    """GET /gateway/bot: recommended shard count and the IDENTIFY concurrency limit."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+
+def _run_shards(env: dict):
+    os.environ.update(env)
+    from bot.main import main
+    main()
+
+
+class ShardProcess:
+    __slots__ = ("index", "shard_ids", "env", "delay", "process", "started", "backoff")
+
+    def __init__(self, index, shard_ids, env, delay):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.env = env
+        self.delay = delay
+        self.process = None
+        self.started = 0.0
+        self.backoff = 1.0
+
+
+class ShardLauncher:
+    """Starts one bot process per shard slice, staggered to respect Discord's IDENTIFY limit."""
+
+    def __init__(self, shard_count: int, processes: int, metrics_port: int, max_concurrency: int = 1):
+        self.shard_count = shard_count
+        self.context = multiprocessing.get_context("spawn")
+        self.children = []
+        offset = 0.0
+        for i, shard_ids in enumerate(split_shards(shard_count, processes)):
+            env = {
+                "SHARDING": "1",
+                "SHARD_COUNT": str(shard_count),
+                "SHARD_IDS": ",".join(str(s) for s in shard_ids),
+                "METRICS_PORT": str(metrics_port + i),
+            }
+            self.children.append(ShardProcess(i, shard_ids, env, offset))
+            offset += IDENTIFY_INTERVAL * math.ceil(len(shard_ids) / max(1, max_concurrency))
+        self.stopping = False
+
+    def _start(self, child):
+        child.process = self.context.Process(
+            target=_run_shards, args=(child.env,), name=f"gideon-shards-{child.index}"
+        )
+        child.process.start()
+        child.started = time.monotonic()
+        logger.info(f"Started process {child.index} (pid {child.process.pid}) for shards {child.shard_ids}")
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self, poll: float = 1.0):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        launch_at = time.monotonic()
+        pending = list(self.children)
+        try:
+            while not self.stopping:
+                now = time.monotonic()
+                while pending and now - launch_at >= pending[0].delay:
+                    self._start(pending.pop(0))
+                for child in self.children:
+                    process = child.process
+                    if process is None or process.is_alive() or child in pending:
+                        continue
+                    logger.error(
+                        f"Process {child.index} for shards {child.shard_ids} exited with code {process.exitcode}; "
+                        f"restarting in {child.backoff:.0f}s"
+                    )
+                    # A child that stayed up for a while starts over with a short backoff
+                    if now - child.started > MAX_BACKOFF:
+                        child.backoff = 1.0
+                    child.delay = now - launch_at + child.backoff
+                    child.backoff = min(child.backoff * 2, MAX_BACKOFF)
+                    pending.append(child)
+                    pending.sort(key=lambda c: c.delay)
+                time.sleep(poll)
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout: float = 10.0):
+        for child in self.children:
+            if child.process is not None and child.process.is_alive():
+                child.process.terminate()
+        for child in self.children:
+            if child.process is not None:
+                child.process.join(timeout)
+        logger.info("All shard processes stopped")
+
+
+def main():
+    try:
+        config = BotConfig()
+    except ValueError as e:
+        logger.error(f"Config error: {e}")
+        exit(1)
+    configure_logging(**config.get_logging_options())
+
+    shard_count = config.shard_count
+    max_concurrency = 1
+    try:
+        info = asyncio.run(fetch_gateway_info(config.get_token()))
+        shard_count = shard_count or info["shards"]
+        max_concurrency = info.get("session_start_limit", {}).get("max_concurrency", 1)
+    except Exception as e:
+        if not shard_count:
+            logger.error(f"Could not fetch the recommended shard count from Discord: {e}")
+            exit(1)
+        logger.warning(f"Could not fetch gateway info, assuming max_concurrency=1: {e}")
+    processes = config.get_shard_processes() or os.cpu_count() or 1
+    launcher = ShardLauncher(shard_count, processes, config.metrics_port, max_concurrency)
+    logger.info(f"Launching {shard_count} shards over {len(launcher.children)} processes")
+    launcher.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,163 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import time
+import threading
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+BODY_MODES = ("full", "truncate", "redact")
+
+# Record attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any `extra` fields, and exc when present."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records per call site (logger + line) through every `window` seconds.
+    The first record after a suppressed stretch says how many similar lines were dropped.
+    """
+
+    def __init__(self, burst: int = 20, window: float = 10.0, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.clock = clock
+        self._sites = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.lineno)
+        now = self.clock()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                dropped = site[2] if site is not None else 0
+                self._sites[key] = [now, 1, 0]
+                if dropped:
+                    record.msg = f"{record.getMessage()} ({dropped} similar lines suppressed)"
+                    record.args = None
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class _LoopSafeQueueHandler(logging.handlers.QueueHandler):
+    """
+    Only merges the message and captures the traceback text on the calling thread; timestamps,
+    formatting and the actual write happen on the listener thread.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_plain = logging.Formatter()
+_queue = queue.SimpleQueue()
+_output = logging.StreamHandler(sys.stdout)
+_output.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+_queue_handler = _LoopSafeQueueHandler(_queue)
+_rate_limit = RateLimitFilter()
+_queue_handler.addFilter(_rate_limit)
+_listener = None
+_levels = {}
+_default_level = logging.INFO
+_body_mode = "truncate"
+_body_chars = 80
+
+
+def _start_listener():
+    global _listener
+    if _listener is None:
+        _listener = logging.handlers.QueueListener(_queue, _output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush everything still queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
-    if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            '[%(asctime)s] [%(levelname)s] %(name)s: %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
-    return logger
\ No newline at end of file
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
+        _start_listener()
+    logger.setLevel(_levels.get(name, _default_level))
+    return logger
+
+
+def configure_logging(fmt: str = "text", level: str = "INFO", levels=None, body_mode: str = "truncate",
+                      body_chars: int = 80, rate_burst: int = None, rate_window: float = None):
+    """
+    Apply the LOG_* settings to every logger created through setup_logger.
+    fmt: "text" (the classic one-line format) or "json"; levels: {logger name: level name}.
+    """
+    global _default_level, _levels, _body_mode, _body_chars
+    _output.setFormatter(
+        JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+    )
+    _default_level = logging.getLevelName(level.upper())
+    _levels = {name: logging.getLevelName(lvl.upper()) for name, lvl in (levels or {}).items()}
+    _body_mode = body_mode
+    _body_chars = body_chars
+    if rate_burst is not None:
+        _rate_limit.burst = rate_burst
+    if rate_window is not None:
+        _rate_limit.window = rate_window
+    for name, logger in logging.Logger.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and _queue_handler in logger.handlers:
+            logger.setLevel(_levels.get(name, _default_level))
+
+
+def body(text) -> str:
+    """
+    Render user content or upstream bodies for a log line according to LOG_BODIES:
+    full, truncate (first LOG_BODY_CHARS characters) or redact (length only).
+    """
+    text = "" if text is None else str(text)
+    if _body_mode == "full":
+        return text
+    if _body_mode == "redact":
+        return f"<{len(text)} chars>"
+    if len(text) <= _body_chars:
+        return text
+    return f"{text[:_body_chars]}…(+{len(text) - _body_chars} chars)"
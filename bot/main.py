@@ -1,26 +1,169 @@
 import discord
 import asyncio
-import re
-import json
-from datetime import datetime
+import math
+from functools import partial
+from datetime import datetime, timezone, timedelta
 from bot.config import BotConfig
-from bot.logger import setup_logger
+from bot.logger import setup_logger, configure_logging, body
+from bot.history_cache import ChannelHistoryCache
+from bot.context import ContextBuilder
+from bot.streaming import StreamingReply, send_chunks
+from bot.scheduler import MessageScheduler
+from bot.event_cache import ScheduledEventCache
+from bot.event_matcher import EventMatcher
+from bot.response_parser import ParsedResponse, parse_response
+from bot.metrics import Metrics, current_message_id
+from bot.sharding import ShardLocal, shard_for
+from bot.memory import MemoryStore, make_embedder
+from bot.jobs import JobQueue
+from bot.answer_cache import SemanticAnswerCache
+from bot.admission import MessageAdmission, ADMITTED, PR_REQUEST
+from bot.usage import UsageLedger, current_usage, NORMAL
 
 logger = setup_logger("DiscordBot")
 
+ACTION_HANDLERS = {
+    "SCHEDULE_EVENT": "create_discord_event",
+    "UPDATE_EVENT": "update_discord_event",
+    "CANCEL_EVENT": "cancel_discord_event",
+}
+ACTION_VERBS = {"SCHEDULE_EVENT": "schedule", "UPDATE_EVENT": "update", "CANCEL_EVENT": "cancel"}
+SUMMARIZE_JOB = "summarize"
+
 from bot.github_client import GitHubClient
 class GideonBot(discord.Client):
-    def __init__(self, channel_id: int, openai_client, config=None, **kwargs):
+    def __init__(self, channel_id: int, openai_client, config=None, metrics=None, memory=None, **kwargs):
         super().__init__(**kwargs)
         self.target_channel_id = channel_id
         self.openai_client = openai_client
         self.config = config
+        self.metrics = metrics or Metrics(enabled=False)
+        # Token accounting and budgets live on the client, which sees every response's usage
+        self.usage = openai_client.usage
+        # History and event caches are shard-local: one instance per gateway shard this process runs
+        if config is not None:
+            self.history_cache = ShardLocal(partial(ChannelHistoryCache, **config.get_history_cache_options()), "history")
+            self.context_builder = ContextBuilder(**config.get_context_options())
+        else:
+            self.history_cache = ShardLocal(ChannelHistoryCache, "history")
+            self.context_builder = ContextBuilder()
+        self.event_cache = ShardLocal(ScheduledEventCache, "event")
+        # Background work (embeddings, summaries) waits whenever replies are queued or running
+        self.jobs = None
+        self.summarize_min_chars = 0
+        if config is not None and config.get_jobs_enabled():
+            self.jobs = JobQueue(busy=self._replies_in_flight, metrics=self.metrics, **config.get_jobs_options())
+            self.jobs.register(SUMMARIZE_JOB, self._run_summarize_jobs, batch_size=8, priority=3)
+            self.summarize_min_chars = config.get_summarize_min_chars()
+        self.memory = memory
+        if memory is None and config is not None and config.get_memory_enabled():
+            kind, model = config.get_memory_embedder()
+            self.memory = MemoryStore(
+                embedder=make_embedder(kind, openai_client, model), jobs=self.jobs, **config.get_memory_options()
+            )
+        # Repeated ASSISTANT/DEVELOPER questions are answered from earlier replies in the channel
+        self.answer_cache = None
+        if config is not None and config.get_answer_cache_enabled():
+            kind, model = config.get_memory_embedder()
+            self.answer_cache = SemanticAnswerCache(
+                embedder=make_embedder(kind, openai_client, model), **config.get_answer_cache_options()
+            )
+        self.event_matcher = EventMatcher(**config.get_event_match_options()) if config is not None else EventMatcher()
+        self.stream_edit_interval = config.get_stream_edit_interval() if config is not None else 1.0
+        scheduler_options = config.get_scheduler_options() if config is not None else {}
+        self.scheduler = MessageScheduler(self._respond, metrics=self.metrics, **scheduler_options)
         self.github_client = None
         if config is not None:
-            from bot.github_client import GitHubClient
             self.github_client = GitHubClient(
-                config.get_github_token(), config.get_github_repo()
+                config.get_github_token(), config.get_github_repo(), metrics=self.metrics,
+                **config.get_http_pool_options()
             )
+        self._register_collectors()
+
+    def _register_collectors(self):
+        """Export the subsystems' stats() dicts as gauges on /metrics."""
+        self.metrics.add_collector("scheduler", self.scheduler.stats)
+        self.metrics.add_collector("history_cache", self.history_cache.stats, label="shard")
+        self.metrics.add_collector("context", self.context_builder.stats)
+        self.metrics.add_collector("event_cache", self.event_cache.stats, label="shard")
+        self.metrics.add_collector("openai_requests", self.openai_client.executor.stats)
+        self.metrics.add_collector("prompt_cache", self.openai_client.prompts.stats)
+        if self.openai_client.response_cache is not None:
+            self.metrics.add_collector("response_cache", self.openai_client.response_cache.stats)
+        if self.openai_client.intent_classifier is not None:
+            self.metrics.add_collector("intent", self.openai_client.intent_classifier.stats)
+        if self.github_client is not None:
+            self.metrics.add_collector("github", self.github_client.stats)
+        if self.memory is not None:
+            self.metrics.add_collector("memory", self.memory.stats)
+        if self.jobs is not None:
+            self.metrics.add_collector("jobs", self.jobs.stats)
+        if self.answer_cache is not None:
+            self.metrics.add_collector("answer_cache", self.answer_cache.stats)
+        self.metrics.add_collector("llm_backend", self.openai_client.backends.stats, label="backend")
+        if self.usage is not None:
+            self.metrics.add_collector("usage", self.usage.stats)
+
+    def _history(self, guild):
+        """Channel history cache of the shard that serves `guild` (None for DMs)."""
+        return self.history_cache[shard_for(guild.id if guild is not None else None, self.shard_count)]
+
+    def _events(self, guild_id):
+        """Scheduled event cache of the shard that serves `guild_id`."""
+        return self.event_cache[shard_for(guild_id, self.shard_count)]
+
+    def _replies_in_flight(self) -> bool:
+        return self.scheduler.pending > 0 or self.scheduler.running > 0
+
+    async def _run_summarize_jobs(self, payloads):
+        """JobQueue handler: one summarize request for the batch; the summaries replace the long texts in history."""
+        summaries = await self.openai_client.summarize([p["content"] for p in payloads])
+        if summaries is None:
+            raise RuntimeError("summarize request failed")
+        for payload, summary in zip(payloads, summaries):
+            cache = self.history_cache[shard_for(payload["guild_id"], self.shard_count)]
+            cache.set_summary(payload["channel_id"], payload["message_id"], summary)
+
+    def _build_admission(self):
+        """Build the per-message admission checks once the bot user is known (after login)."""
+        options = self.config.get_admission_options() if self.config is not None else {
+            "channel_ids": [self.target_channel_id],
+        }
+        self.admission = MessageAdmission(self.user.id, **options)
+        # The bot's possible names/aliases (username, display_name, 'assistant', 'gideon')
+        self.bot_names = [str(self.user.name), str(self.user.display_name), "assistant", "gideon"]
+        self.metrics.add_collector("admission", self.admission.stats)
+
+    async def setup_hook(self):
+        self._build_admission()
+        # Open the pooled OpenAI session once; every LLM call reuses its warm connections
+        await self.openai_client.start()
+        if self.github_client is not None:
+            await self.github_client.start()
+        self.scheduler.start()
+        if self.jobs is not None:
+            await self.jobs.start()
+        if self.memory is not None:
+            await self.memory.start()
+        if self.usage is not None:
+            await self.usage.start()
+        await self.metrics.start()
+
+    async def close(self):
+        try:
+            await self.metrics.stop()
+            await self.scheduler.stop()
+            if self.memory is not None:
+                await self.memory.stop()
+            if self.jobs is not None:
+                await self.jobs.stop()
+            if self.usage is not None:
+                await self.usage.stop()
+            await self.openai_client.close()
+            if self.github_client is not None:
+                await self.github_client.close()
+        finally:
+            await super().close()
 
     async def on_ready(self):
         logger.info(f"Bot is online as {self.user}")
@@ -35,6 +178,11 @@ class GideonBot(discord.Client):
                     target_channel = chan
                     break
             if not target_channel:
+                shard_ids = getattr(self, "shard_ids", None)
+                if shard_ids:
+                    # Another launcher process serves the main channel's guild; this one answers mentions only
+                    logger.info(f"Target channel ID {self.target_channel_id} is not on shards {shard_ids}.")
+                    return
                 logger.error(f"Target channel ID {self.target_channel_id} not found in any connected guild.")
                 return
             needed_perms = {
@@ -51,219 +199,204 @@ class GideonBot(discord.Client):
             logger.error(f"Error checking permissions at startup: {e}")
 
     async def on_message(self, message):
-        # Ignore messages from the bot itself (or other bots)
-        if message.author.bot:
-            return
+        # Keep the channel's cached history current (including our own replies)
+        self._history(message.guild).record(message)
 
-        content = message.content.strip()
-        logger.info(f"Message in #{message.channel.name}: '{content}'")
-        if not content:
+        decision = self.admission.admit(message)
+        if self.memory is not None and (decision in ADMITTED or message.author.id == self.user.id):
+            # Conversations the bot takes part in: admitted messages and its own replies
+            self.memory.add(message)
+        if decision not in ADMITTED:
             return
+        content = message.content.strip()
+        logger.info(f"Message in #{message.channel.name}: '{body(content)}'")
+        if self.summarize_min_chars and len(content) >= self.summarize_min_chars:
+            # Answered in full now; later turns get the summary as context instead
+            guild_id = message.guild.id if message.guild is not None else None
+            self.jobs.submit(SUMMARIZE_JOB, {
+                "guild_id": guild_id, "channel_id": message.channel.id, "message_id": message.id, "content": content,
+            }, guild_id=guild_id)
 
-        main_channel_id = self.target_channel_id
-        in_main_channel = (message.channel.id == main_channel_id)
-
-        # Per-instructions:
-        # In non-main channels, only respond if
-        #   (A) the bot is mentioned
-        #   (B) the message is a reply to the bot's message
-        def is_reply_to_bot(msg):
-            # Discord implements reply by message reference
-            return msg.reference and hasattr(msg.reference, "resolved") and getattr(msg.reference.resolved, "author", None) == self.user
-
-        explicitly_mentioned = self.user in message.mentions
-        replying_to_bot = is_reply_to_bot(message)
-
-        if not in_main_channel and not (explicitly_mentioned or replying_to_bot):
-            logger.info("Ignoring message: not in main channel, not mentioned, not a reply to me.")
-            return
-
-        import re
-        import json
-        from datetime import datetime
-
-        # Gather bot's possible names/aliases (username, display_name, 'assistant', 'gideon')
-        bot_names = [
-            str(self.user.name),
-            str(self.user.display_name),
-            "assistant",
-            "gideon"
-        ]
-        # Gather last 10 recent text messages (for context, oldest first)
-        history = []
-        async for msg in message.channel.history(limit=10, oldest_first=True):
-            if not msg.content:
-                continue
-            role = "assistant" if msg.author.bot else "user"
-            history.append({"role": role, "content": msg.content})
-
-        # Simple code/dev-related query detection
-        def is_code_question(msg):
-            code_keywords = [
-                "python", "java", "js", "typescript", "react", "bug", "debug", "error", "stack trace", "exception",
-                "variable", "function", "method", "class", "loop", "array", "dict", "dictionary", "object",
-                "API", "database", "sql", "NoSQL", "compil", "build", "deploy", "docker", "test case", "test failed", "pytest", "package", "import",
-                "code:", "```", "try:", "def ", "public ", "private ", "const ", "let ", "var "
-            ]
-            pr_keywords = [
-                "pull request", "open a pr", "make a pr", "create a pr", "start a pr", "github pr", "review pr", "merge this", "branch and pr"
-            ]
-            text = msg.lower()
-            if any(pr_kw in text for pr_kw in pr_keywords):
-                return "pr"
-            if "```" in text:
-                return True
-            for kw in code_keywords:
-                if kw in text:
-                    return True
-            return False
-
-        channel_name = str(message.channel.name).lower() if hasattr(message.channel, 'name') else ""
-        code_check = is_code_question(content)
         # PR requests delegated for future GH integration (stub)
-        if code_check == "pr":
+        if decision == PR_REQUEST:
             await message.channel.send("👷 PR request detected! This functionality is being implemented and will be available soon.")
             logger.info("Detected PR automation request.")
+            self.metrics.count("gideon_messages_total", outcome="pr_request")
             return
 
-        # ROUTING LOGIC: Call router LLM to select persona/service
-        router = self.openai_client
-        router_persona = await router.ask_router_persona(content)
+        # LLM work goes through the scheduler: global concurrency cap, fair queuing, load shedding
+        outcome = self.scheduler.submit(message, content)
+        self.metrics.count("gideon_messages_total", outcome=outcome)
+        if outcome == "shed":
+            await message.channel.send("⏳ I'm handling a lot of requests right now, please try again in a moment.")
 
+    async def _respond(self, message, content, message_ids):
+        """
+        Produce and send the reply for a scheduled job. content may hold several rapid messages from
+        the same user merged together; message is the latest of them, message_ids all of them.
+        """
+        current_message_id.set(message.id)
+        if self.usage is not None:
+            # Bills this reply's LLM calls and picks how lean they are from the guild's budget
+            current_usage.set(self.usage.scope(
+                message.guild.id if message.guild is not None else 0, message.channel.id, message.author.id
+            ))
+        with self.metrics.stage("respond"):
+            try:
+                await self._reply(message, content, message_ids)
+            except Exception:
+                # The scheduler logs the traceback; the user should not be left waiting for a reply
+                try:
+                    await message.channel.send("Sorry, something went wrong answering that. Please try again!")
+                except discord.HTTPException:
+                    pass
+                raise
+
+    async def _reply(self, message, content, message_ids):
+        bot_names = self.bot_names
+        probe = None
+        if self.answer_cache is not None:
+            # Before routing: a hit skips the router, the history work and the completion
+            with self.metrics.stage("answer_cache"):
+                probe = await self.answer_cache.lookup(message.channel.id, content)
+            if probe is not None and probe.hit is not None:
+                with self.metrics.stage("send"):
+                    sent = await send_chunks(message.channel, probe.hit.answer)
+                self.answer_cache.track(probe.hit, sent)
+                return
+        # Recent messages (oldest first) from the local history cache, trimmed to the context token budget;
+        # the messages being answered are sent separately by ask_chatgpt
+        with self.metrics.stage("history"):
+            recent = await self._history(message.guild).get_messages(message.channel, limit=0, exclude_ids=message_ids)
+        scope = current_usage.get()
+        plan = scope.plan if scope is not None else NORMAL
+        with self.metrics.stage("context"):
+            history, context_stats = self.context_builder.build(
+                recent, message=content, token_budget=int(self.context_builder.token_budget * plan.context_scale)
+            )
+        if self.memory is not None and not plan.economy:
+            # Older, relevant messages that fell out of the recent window (not while short of budget)
+            with self.metrics.stage("memory"):
+                try:
+                    memories = await self.memory.search(
+                        message.guild.id if message.guild is not None else 0, message.channel.id, content,
+                        exclude_ids={m.id for m in recent} | set(message_ids),
+                    )
+                except Exception as e:
+                    # Memory only adds context: answer without it rather than not at all
+                    self.metrics.count("gideon_errors_total", stage="memory")
+                    logger.error(f"Memory search failed: {e}")
+                    memories = []
+            history = self.memory.render(memories) + history
+        logger.info(
+            f"Context: {len(history)} messages, {context_stats['used_tokens']} tokens "
+            f"({context_stats['saved_tokens']} saved)"
+        )
+
+        channel_name = str(message.channel.name).lower() if hasattr(message.channel, 'name') else ""
+
+        # ROUTING LOGIC: pick persona/service and get its reply (sequential, combined or speculative)
         # always start typing right before handling (for any delegated step)
         async with message.channel.typing():
-            if router_persona == "DEVELOPER":
-                response = await self.openai_client.ask_chatgpt(
-                    content, bot_names=bot_names, history=history, persona="developer", channel_name=channel_name
-                )
-                await message.channel.send(response)
-            elif router_persona == "EVENT":
-                # The first LLM pass decides intent; second pass handles specifics (cancel/create/update)
-                # Default: ask_chatgpt with persona="assistant" to prompt for event action or structured block
-                response = await self.openai_client.ask_chatgpt(
-                    content, bot_names=bot_names, history=history, persona="assistant", channel_name=channel_name
-                )
-                if not response or not isinstance(response, str):
-                    await message.channel.send("Sorry, I couldn't process your request right now (event handler problem). Please try again.")
-                    logger.error("ask_chatgpt returned None or non-string for event route.")
-                    return
-                # The rest of the event logic (SCHEDULE_EVENT, CANCEL_EVENT, etc.) is handled as before
-                # Re-use existing parsing branches below (sched_match, update_match, cancel_match...)
-                sched_match = re.search(r"\[SCHEDULE_EVENT\](.*?)\[/SCHEDULE_EVENT\]", response, re.DOTALL)
-                update_match = re.search(r"\[UPDATE_EVENT\](.*?)\[/UPDATE_EVENT\]", response, re.DOTALL)
-                cancel_match = re.search(r"\[CANCEL_EVENT\](.*?)\[/CANCEL_EVENT\]", response, re.DOTALL)
-
-                if sched_match:
-                    block = sched_match.group(1).strip()
-                    try:
-                        event_data = json.loads(block)
-                        logger.info(f"Scheduling Discord event: {event_data}")
-                        await self.create_discord_event(message, event_data)
-                        return
-                    except Exception as e:
-                        error_log = f"Failed to parse or create event: {e}\nBlock:{block}"
-                        logger.error(error_log)
-                        await message.channel.send(
-                            "Sorry, I couldn't schedule that event (invalid details or Discord error).\n"
-                            f"```py\n{error_log}\n```"
-                        )
-                        return
-                elif update_match:
-                    block = update_match.group(1).strip()
-                    try:
-                        event_data = json.loads(block)
-                        logger.info(f"Updating Discord event: {event_data}")
-                        await self.update_discord_event(message, event_data)
-                        return
-                    except Exception as e:
-                        error_log = f"Failed to parse or update event: {e}\nBlock:{block}"
-                        logger.error(error_log)
-                        await message.channel.send(
-                            "Sorry, I couldn't update that event (invalid details or Discord error).\n"
-                            f"```py\n{error_log}\n```"
-                        )
-                        return
-                elif cancel_match:
-                    block = cancel_match.group(1).strip()
-                    try:
-                        event_data = json.loads(block)
-                        logger.info(f"Cancelling Discord event: {event_data}")
-                        await self.cancel_discord_event(message, event_data)
-                        return
-                    except Exception as e:
-                        error_log = f"Failed to parse or cancel event: {e}\nBlock:{block}"
-                        logger.error(error_log)
-                        await message.channel.send(
-                            "Sorry, I couldn't cancel that event (invalid details or Discord error).\n"
-                            f"```py\n{error_log}\n```"
+            if self.openai_client.streaming:
+                # Streamed replies show up as they are generated; event blocks are held back and parsed below
+                with self.metrics.stage("route"):
+                    router_persona = await self.openai_client.route(content)
+                if router_persona == "EVENT" and self.openai_client.tool_calling:
+                    # Event replies are never displayed, so there is nothing to stream: ask for tool calls
+                    with self.metrics.stage("llm", persona=router_persona):
+                        response = await self.openai_client.ask_chatgpt(
+                            content, bot_names=bot_names, history=history,
+                            persona=persona_prompt_for(router_persona), channel_name=channel_name
                         )
-                        return
                 else:
-                    await message.channel.send(
-                        "Sorry, I couldn't understand what to do with your event request. Please specify create, update, or cancel."
+                    reply = StreamingReply(message.channel, edit_interval=self.stream_edit_interval)
+                    # Includes the progressive Discord edits, which overlap with generation
+                    with self.metrics.stage("stream", persona=router_persona):
+                        response = await reply.stream(self.openai_client.stream_chatgpt(
+                            content, bot_names=bot_names, history=history,
+                            persona=persona_prompt_for(router_persona), channel_name=channel_name
+                        ))
+                    if reply.displayed and not reply.is_event:
+                        self._cache_answer(probe, message, router_persona, response, reply.messages, context_stats)
+                        return
+                    if reply.is_event:
+                        router_persona = "EVENT"
+            else:
+                with self.metrics.stage("llm"):
+                    router_persona, response = await self.openai_client.route_and_respond(
+                        content, bot_names=bot_names, history=history, channel_name=channel_name
                     )
+            if not response:
+                # The executor already retried transient failures; don't burn another call on a fallback
+                await message.channel.send("Sorry, I couldn't reach my language model right now. Please try again in a moment.")
+                return
+            if router_persona == "DEVELOPER":
+                with self.metrics.stage("send"):
+                    sent = await send_chunks(message.channel, response)
+                self._cache_answer(probe, message, router_persona, response, sent, context_stats)
+                return
+            # One pass over the reply finds every event block; whatever else is left is plain text.
+            # In tool-calling mode the actions arrive already parsed.
+            parsed = response if isinstance(response, ParsedResponse) else parse_response(response)
+            if parsed.has_actions:
+                await self._run_actions(message, parsed)
+            elif router_persona == "EVENT" and not self.openai_client.tool_calling:
+                # (with tools the model is told to ask for clarification in text, which is sent below)
+                await message.channel.send(
+                    "Sorry, I couldn't understand what to do with your event request. Please specify create, update, or cancel."
+                )
             else:
                 # Default to assistant (for "ASSISTANT" or error/fallback)
-                response = await self.openai_client.ask_chatgpt(
-                    content, bot_names=bot_names, history=history, persona="assistant", channel_name=channel_name
-                )
-                await message.channel.send(response)
+                with self.metrics.stage("send"):
+                    sent = await send_chunks(message.channel, parsed.text)
+                if not parsed.invalid:
+                    self._cache_answer(probe, message, router_persona, parsed.text, sent, context_stats)
 
-        # typing only if we are actually responding
-        async with message.channel.typing():
-            # Look for event blocks in response
-            sched_match = re.search(r"\[SCHEDULE_EVENT\](.*?)\[/SCHEDULE_EVENT\]", response, re.DOTALL)
-            update_match = re.search(r"\[UPDATE_EVENT\](.*?)\[/UPDATE_EVENT\]", response, re.DOTALL)
-            cancel_match = re.search(r"\[CANCEL_EVENT\](.*?)\[/CANCEL_EVENT\]", response, re.DOTALL)
+    def _cache_answer(self, probe, message, router_persona, answer, sent, context_stats):
+        """Keep a plain ASSISTANT/DEVELOPER answer for near-duplicate questions in the channel."""
+        if probe is not None:
+            self.answer_cache.store(
+                probe, message.id, router_persona, answer, sent, prompt_tokens=context_stats["used_tokens"]
+            )
 
-            if sched_match:
-                block = sched_match.group(1).strip()
-                try:
-                    event_data = json.loads(block)
-                    logger.info(f"Scheduling Discord event: {event_data}")
-                    await self.create_discord_event(message, event_data)
-                    return
-                except Exception as e:
-                    error_log = f"Failed to parse or create event: {e}\nBlock:{block}"
-                    logger.error(error_log)
-                    await message.channel.send(
-                        "Sorry, I couldn't schedule that event (invalid details or Discord error).\n"
-                        f"```py\n{error_log}\n```"
-                    )
-                    return
-            elif update_match:
-                block = update_match.group(1).strip()
-                try:
-                    event_data = json.loads(block)
-                    logger.info(f"Updating Discord event: {event_data}")
-                    await self.update_discord_event(message, event_data)
-                    return
-                except Exception as e:
-                    error_log = f"Failed to parse or update event: {e}\nBlock:{block}"
-                    logger.error(error_log)
-                    await message.channel.send(
-                        "Sorry, I couldn't update that event (invalid details or Discord error).\n"
-                        f"```py\n{error_log}\n```"
-                    )
-                    return
-            elif cancel_match:
-                block = cancel_match.group(1).strip()
-                try:
-                    event_data = json.loads(block)
-                    logger.info(f"Cancelling Discord event: {event_data}")
-                    await self.cancel_discord_event(message, event_data)
-                    return
-                except Exception as e:
-                    error_log = f"Failed to parse or cancel event: {e}\nBlock:{block}"
-                    logger.error(error_log)
-                    await message.channel.send(
-                        "Sorry, I couldn't cancel that event (invalid details or Discord error).\n"
-                        f"```py\n{error_log}\n```"
-                    )
-                    return
+    async def _run_actions(self, message, parsed):
+        """Dispatch the validated action blocks of a reply in order; report the rejected ones."""
+        for action in parsed.invalid:
+            self.metrics.count("gideon_errors_total", stage="parse", kind=action.kind)
+            error_log = f"Failed to parse {action.kind} block: {action.error}\nBlock:{action.raw}"
+            await message.channel.send(
+                f"Sorry, I couldn't {ACTION_VERBS[action.kind]} that event (invalid details).\n"
+                f"```py\n{error_log}\n```"
+            )
+        for action in parsed.actions:
+            logger.info(f"{ACTION_VERBS[action.kind].capitalize()} Discord event: {body(action.data)}")
+            with self.metrics.stage("event_action", kind=action.kind):
+                await getattr(self, ACTION_HANDLERS[action.kind])(message, action.data)
+
+    async def on_message_edit(self, before, after):
+        self._history(after.guild).update(after)
+        if self.answer_cache is not None and not after.author.bot:
+            # The cached answer was to the old question
+            self.answer_cache.forget(after.id)
+        if self.memory is not None:
+            self.memory.update(after)
+
+    async def on_message_delete(self, message):
+        self._history(message.guild).remove(message.channel.id, message.id)
+        if self.answer_cache is not None:
+            self.answer_cache.forget(message.id)
+        if self.memory is not None:
+            await self.memory.forget(message.guild.id if message.guild is not None else 0, message.id)
+
+    async def on_scheduled_event_create(self, event):
+        self._events(event.guild_id).upsert(event)
+
+    async def on_scheduled_event_update(self, before, after):
+        self._events(after.guild_id).upsert(after)
 
-            # Otherwise, normal response
-            await message.channel.send(response)
+    async def on_scheduled_event_delete(self, event):
+        self._events(event.guild_id).remove(event)
 
     async def create_discord_event(self, message, event_data):
         """
@@ -278,7 +411,6 @@ class GideonBot(discord.Client):
             tz = event_data.get("timezone", "Europe/Brussels")
             title = event_data.get("title", "Scheduled Event")
             desc = event_data.get("description", "")
-            from datetime import timezone, timedelta
             start_dt = datetime.fromisoformat(start)
             if start_dt.tzinfo is None:
                 start_dt = start_dt.replace(tzinfo=timezone.utc)
@@ -332,8 +464,10 @@ class GideonBot(discord.Client):
                     entity_type=entity_type,
                     location="Discord"
                 )
+            self._events(guild.id).upsert(scheduled_event)
             await message.channel.send(f"✅ Created event **{title}** for {start} ({tz})!")
         except Exception as e:
+            self.metrics.count("gideon_errors_total", stage="event_action", kind="SCHEDULE_EVENT")
             error_log = f"Discord event creation failed: {e}"
             logger.error(error_log)
             await message.channel.send(
@@ -353,13 +487,18 @@ class GideonBot(discord.Client):
             title = event_data.get("title")
             dt_str = event_data.get("datetime")
             new_fields = event_data.get("fields_to_update", {})
-            found_event = await self._find_event(guild, title, dt_str)
+            found_event, candidates = await self._find_event(guild, title, dt_str)
             if not found_event:
-                await message.channel.send(f"Sorry, couldn't find an event to update for title/datetime: {title} / {dt_str}")
+                hint = ""
+                if candidates:
+                    hint = " Did you mean: " + ", ".join(f"**{m.event.name}**" for m in candidates) + "?"
+                await message.channel.send(f"Sorry, couldn't find an event to update for title/datetime: {title} / {dt_str}.{hint}")
                 return
-            await found_event.edit(**new_fields)
+            updated = await found_event.edit(**new_fields)
+            self._events(guild.id).upsert(updated or found_event)
             await message.channel.send(f"✅ Updated event **{title}**.")
         except Exception as e:
+            self.metrics.count("gideon_errors_total", stage="event_action", kind="UPDATE_EVENT")
             error_log = f"Event update failed: {e}"
             logger.error(error_log)
             await message.channel.send(
@@ -378,10 +517,15 @@ class GideonBot(discord.Client):
         try:
             title = event_data.get("title")
             dt_str = event_data.get("datetime")
-            found_event = await self._find_event(guild, title, dt_str)
-            # If not found, use LLM to disambiguate among all events
+            found_event, candidates = await self._find_event(guild, title, dt_str)
+            # Ambiguous: let the LLM choose, but only among the ranked shortlist when there is one
             if not found_event:
-                events = await guild.fetch_scheduled_events()
+                index = await self._events(guild.id).get(guild)
+                events = [m.event for m in candidates] or index.all()
+                if not events:
+                    await message.channel.send("There are no scheduled events to cancel.")
+                    return
+                allowed = {e.id: e for e in events}
                 event_summaries = [
                     {
                         "id": str(e.id),
@@ -400,12 +544,12 @@ class GideonBot(discord.Client):
                     await message.channel.send("Sorry, couldn't determine which event to cancel. Please specify the exact event or time.")
                     return
                 ids_to_cancel = [id_.strip() for id_ in llm_event_id.split(",") if id_.strip()]
-                ids_found = set(e.id for e in events)
                 any_cancelled = False
                 for eid in ids_to_cancel:
-                    if eid.isdigit() and int(eid) in ids_found:
-                        ev = next(ev for ev in events if ev.id == int(eid))
+                    ev = allowed.get(int(eid)) if eid.isdigit() else None
+                    if ev is not None:
                         await ev.delete()
+                        self._events(guild.id).remove(ev)
                         await message.channel.send(f"🗑️ Cancelled event **{ev.name}** (id={eid}).")
                         any_cancelled = True
                 if not any_cancelled:
@@ -414,8 +558,10 @@ class GideonBot(discord.Client):
 
             # Otherwise, standard workflow (found event)
             await found_event.delete()
+            self._events(guild.id).remove(found_event)
             await message.channel.send(f"🗑️ Cancelled event **{found_event.name}**.")
         except Exception as e:
+            self.metrics.count("gideon_errors_total", stage="event_action", kind="CANCEL_EVENT")
             error_log = f"Event cancel failed: {e}"
             logger.error(error_log)
             await message.channel.send(
@@ -425,41 +571,67 @@ class GideonBot(discord.Client):
 
     async def _find_event(self, guild, title, dt_str):
         """
-        Find the closest matching scheduled event by title and datetime (ISO), fallback to best (fuzzy) match if needed.
+        Match title/datetime (ISO) against the guild's cached event index.
+        Returns (event, candidates): event is set only when the best match is confident and clearly
+        ahead of the runner-up; candidates is the ranked shortlist of EventMatch objects.
         """
-        events = await guild.fetch_scheduled_events()
-        norm = lambda s: s.lower() if s else ""
-        title_norm = norm(title)
-        dt_norm = norm(dt_str)
-        found_event = None
-
-        # Try exact datetime+title match
-        for ev in events:
-            if dt_str:
-                try:
-                    iso_cmp = ev.scheduled_start_time.isoformat().replace("+00:00", "Z")
-                    # Allow match with or without ms, Z or not
-                    if iso_cmp.startswith(dt_str.replace("+00:00", "Z")) or dt_str.startswith(iso_cmp):
-                        if title and title_norm in norm(ev.name):
-                            return ev
-                        if not title:
-                            return ev
-                except Exception:
-                    continue
-        # If no datetime, try title-based fuzzy match (most recent first)
-        if title:
-            for ev in sorted(events, key=lambda e: e.scheduled_start_time, reverse=True):
-                if title_norm in norm(ev.name) or title_norm in norm(ev.description):
-                    return ev
-        # If neither found, but only one event exists, assume that's what user means
-        if len(events) == 1:
-            return events[0]
-        # Fallback: return most recent if nothing else
-        if events:
-            return sorted(events, key=lambda e: e.scheduled_start_time, reverse=True)[0]
-        return None
-
-from bot.openai_client import OpenAIClient
+        index = await self._events(guild.id).get(guild)
+        if not title and not dt_str and len(index) == 1:
+            # Nothing to match on, but there is only one event the user can mean
+            return index.all()[0], []
+        candidates = self.event_matcher.rank(index, title, dt_str)
+        if self.event_matcher.is_confident(candidates):
+            return candidates[0].event, candidates
+        logger.info(f"No confident event match for {title!r} / {dt_str!r}: {candidates}")
+        return None, candidates
+
+class ShardedGideonBot(GideonBot, discord.AutoShardedClient):
+    """
+    GideonBot on discord.AutoShardedClient: this process runs several gateway shards (all of them,
+    or the shard_ids handed out by bot.launcher). History and event caches are per shard, and each
+    shard's connection state and heartbeat latency are exported as shard-labelled gauges.
+    """
+
+    def _register_collectors(self):
+        super()._register_collectors()
+        self.metrics.add_collector("shard", self._shard_health, label="shard")
+
+    def _shard_health(self) -> dict:
+        health = {}
+        for shard_id, shard in self.shards.items():
+            latency = shard.latency
+            health[shard_id] = {
+                "up": not shard.is_closed(),
+                "ratelimited": shard.is_ws_ratelimited(),
+                # Heartbeat round trip; -1 until the first ACK
+                "latency_seconds": latency if math.isfinite(latency) else -1.0,
+            }
+        return health
+
+    async def on_shard_connect(self, shard_id):
+        self.metrics.count("gideon_shard_events_total", shard=shard_id, event="connect")
+
+    async def on_shard_disconnect(self, shard_id):
+        logger.warning(f"Shard {shard_id} disconnected")
+        self.metrics.count("gideon_shard_events_total", shard=shard_id, event="disconnect")
+
+    async def on_shard_resumed(self, shard_id):
+        logger.info(f"Shard {shard_id} resumed its session")
+        self.metrics.count("gideon_shard_events_total", shard=shard_id, event="resumed")
+
+    async def on_shard_ready(self, shard_id):
+        # A new session (rather than a resume) means this shard's gateway events were missed while it
+        # was away, so its caches can no longer be trusted; other shards keep theirs
+        logger.info(f"Shard {shard_id} ready")
+        self.history_cache.reset(shard_id)
+        self.event_cache.reset(shard_id)
+        self.metrics.count("gideon_shard_events_total", shard=shard_id, event="ready")
+
+from bot.openai_client import OpenAIClient, persona_prompt_for
+from bot.intent import IntentClassifier
+from bot.response_cache import ResponseCache
+from bot.request_executor import RequestExecutor
+from bot.backends import Backend, BackendPool
 
 def main():
     try:
@@ -467,17 +639,42 @@ def main():
     except ValueError as e:
         logger.error(f"Config error: {e}")
         exit(1)
+    configure_logging(**config.get_logging_options())
 
-    openai_client = OpenAIClient(api_key=config.get_openai_key())
+    metrics = Metrics(**config.get_metrics_options())
+    usage = UsageLedger(**config.get_usage_options()) if config.get_usage_enabled() else None
+    backends = None
+    if config.get_backend_specs():
+        # Each provider gets its own executor: rate limits and retry budgets are per backend
+        backends = BackendPool(
+            [Backend(executor=RequestExecutor(**config.get_retry_options()), **spec) for spec in config.get_backend_specs()],
+            metrics=metrics, **config.get_backend_pool_options()
+        )
+    openai_client = OpenAIClient(
+        api_key=config.get_openai_key(),
+        routing_mode=config.get_routing_mode(),
+        intent_classifier=IntentClassifier(threshold=config.get_intent_confidence()),
+        streaming=config.get_streaming(),
+        tool_calling=config.get_tool_calling(),
+        response_cache=ResponseCache(**config.get_response_cache_options()),
+        executor=RequestExecutor(**config.get_retry_options()),
+        metrics=metrics,
+        backends=backends,
+        usage=usage,
+        **config.get_http_pool_options()
+    )
     intents = discord.Intents.default()
     intents.messages = True
     intents.message_content = True  # Needed to reliably access message.content
 
-    client = GideonBot(
+    bot_class = ShardedGideonBot if config.get_sharding() else GideonBot
+    client = bot_class(
         channel_id=config.get_channel_id(),
         openai_client=openai_client,
         config=config,
-        intents=intents
+        metrics=metrics,
+        intents=intents,
+        **config.get_shard_options()
     )
     client.run(config.get_token())
 
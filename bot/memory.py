@@ -0,0 +1,448 @@
+import asyncio
+import re
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from bot.context import default_tokenizer
+from bot.logger import setup_logger
+
+logger = setup_logger("Memory")
+
+_WORD_RE = re.compile(r"[a-z0-9_']+")
+
+EMBED_JOB = "memory_embed"
+MEMORY_HEADER = "Earlier messages that may be relevant to this conversation (oldest first):"
+
+
+class HashingEmbedder:
+    """
+    Local embeddings with no model or network call: signed feature hashing of words, word bigrams
+    and character trigrams into `dim` buckets, L2-normalised. Good at lexical overlap, which is
+    most of what "what did we say about X" recall needs.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _vector(self, text: str, out):
+        lowered = text.lower()
+        words = _WORD_RE.findall(lowered)
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {' '.join(words)} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        for g in grams:
+            h = zlib.crc32(g.encode("utf-8"))
+            out[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+
+    async def embed(self, texts: list):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(vectors, texts):
+            self._vector(text, row)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class OpenAIEmbedder:
+    """
+    Embeddings from the OpenAI embeddings endpoint, one request per batch, on the client's pooled session.
+    dim is the model's width, learned from its first response unless given.
+    """
+
+    def __init__(self, client, model: str = "text-embedding-3-small", dim: int = None):
+        self.client = client
+        self.model = model
+        self.dim = dim
+        self.name = model
+
+    async def embed(self, texts: list):
+        data = await self.client.embed(texts, model=self.model)
+        if data is None:
+            return None
+        vectors = np.asarray(data, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+def make_embedder(kind: str, client=None, model: str = "text-embedding-3-small"):
+    """MEMORY_EMBEDDER: "hashing" (local, free) or "openai" (the embeddings endpoint via client)."""
+    if kind == "openai":
+        return OpenAIEmbedder(client, model=model)
+    return HashingEmbedder()
+
+
+class MemoryEntry:
+    __slots__ = ("message_id", "guild_id", "channel_id", "role", "author", "content", "created", "updated")
+
+    def __init__(self, message_id, guild_id, channel_id, role, author, content, created, updated=0.0):
+        self.message_id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.role = role
+        self.author = author
+        self.content = content
+        self.created = created
+        self.updated = updated
+
+    @classmethod
+    def from_discord(cls, message, now):
+        created = message.created_at.timestamp() if getattr(message, "created_at", None) else now
+        return cls(
+            message.id, message.guild.id if message.guild is not None else 0, message.channel.id,
+            "assistant" if message.author.bot else "user", str(message.author.display_name),
+            message.content, created, now,
+        )
+
+    def text(self) -> str:
+        return f"{self.author}: {self.content}"
+
+    def to_payload(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "updated"}
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(**payload)
+
+
+class GuildIndex:
+    """
+    One guild's vectors in a float32 matrix used as a ring of at most `capacity` rows: it starts
+    small and doubles as the guild fills up, and once full the oldest memory is overwritten, so a
+    guild never holds more than `capacity` entries. Search is one matrix-vector product over the
+    filled rows.
+    """
+
+    INITIAL_ROWS = 64
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        rows = min(capacity, self.INITIAL_ROWS)
+        self.vectors = np.zeros((rows, dim), dtype=np.float32)
+        self.channels = np.zeros(rows, dtype=np.int64)
+        self.entries = [None] * rows
+        self.slots = {}
+        self.size = 0
+        self.next = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        rows = min(self.capacity, 2 * len(self.entries))
+        vectors = np.zeros((rows, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        channels = np.zeros(rows, dtype=np.int64)
+        channels[:self.size] = self.channels[:self.size]
+        self.vectors, self.channels = vectors, channels
+        self.entries.extend([None] * (rows - len(self.entries)))
+
+    def replaced_next(self):
+        """The entry the next new message overwrites; None while the ring still has room."""
+        return self.entries[self.next] if self.next < len(self.entries) else None
+
+    def add(self, entry, vector):
+        """Insert or replace entry; returns the message id evicted to make room, if any."""
+        evicted = None
+        slot = self.slots.get(entry.message_id)
+        if slot is None:
+            slot = self.next
+            if slot == len(self.entries):
+                self._grow()
+            old = self.entries[slot]
+            if old is not None:
+                evicted = old.message_id
+                del self.slots[evicted]
+            self.next = (slot + 1) % self.capacity
+            self.size = max(self.size, slot + 1)
+            self.slots[entry.message_id] = slot
+        self.vectors[slot] = vector
+        self.channels[slot] = entry.channel_id
+        self.entries[slot] = entry
+        return evicted
+
+    def remove(self, message_id):
+        slot = self.slots.pop(message_id, None)
+        if slot is not None:
+            self.vectors[slot] = 0.0
+            self.entries[slot] = None
+
+    def search(self, query, channel_id, k: int, min_score: float, exclude_ids=()) -> list:
+        """Best (score, entry) pairs, best first. channel_id=None searches the whole guild."""
+        if not self.slots:
+            return []
+        scores = self.vectors[:self.size] @ query
+        if channel_id is not None:
+            scores[self.channels[:self.size] != channel_id] = -np.inf
+        for message_id in exclude_ids:
+            slot = self.slots.get(message_id)
+            if slot is not None:
+                scores[slot] = -np.inf
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[i]), self.entries[i]) for i in top
+            if scores[i] >= min_score and self.entries[i] is not None
+        ]
+
+
+class MemoryStore:
+    """
+    Long-term conversation memory. Messages and the bot's replies are written to SQLite and
+    embedded in the background, in batches, once they have stopped changing (streamed replies are
+    edited for a few seconds); with a JobQueue the batches run on its workers. Each guild's vectors
+    are loaded lazily into a bounded GuildIndex; search() returns the top-k past messages from the
+    channel that fit a token budget.
+    """
+
+    def __init__(self, path: str = "gideon_memory.sqlite3", embedder=None, max_per_guild: int = 5000,
+                 top_k: int = 4, token_budget: int = 300, min_score: float = 0.3, scope: str = "channel",
+                 batch_size: int = 64, flush_interval: float = 2.0, tokenizer=None, jobs=None, clock=time.time):
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.max_per_guild = max_per_guild
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.min_score = min_score
+        self.scope = scope
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.tokenizer = tokenizer or default_tokenizer()
+        self.clock = clock
+        self.jobs = jobs
+        if jobs is not None:
+            jobs.register(EMBED_JOB, self._run_embed_jobs, batch_size=batch_size, priority=5)
+        self._conn = None
+        # sqlite calls run in a worker thread so they never block the event loop; one at a time
+        self._db_lock = asyncio.Lock()
+        self._pending = {}
+        self._guilds = {}
+        self._loading = {}
+        self._task = None
+        self.stored = 0
+        self.batches = 0
+        self.embed_failures = 0
+        self.searches = 0
+        self.hits = 0
+        self.search_ms = 0.0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS memories (message_id INTEGER PRIMARY KEY, guild_id INTEGER NOT NULL, "
+            "channel_id INTEGER NOT NULL, role TEXT NOT NULL, author TEXT NOT NULL, content TEXT NOT NULL, "
+            "created REAL NOT NULL, model TEXT NOT NULL, embedding BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS memories_guild ON memories (guild_id, created)")
+        conn.commit()
+        return conn
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._conn = await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Conversation memory at {self.path} ({self.embedder.name}, {self.max_per_guild} per guild)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Whatever was still settling is written now rather than lost
+        await self.flush(force=True)
+        await asyncio.to_thread(self._conn.close)
+        self._conn = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Memory flush failed: {e}")
+
+    def add(self, message):
+        """Queue a gateway message (user or bot) for embedding."""
+        if message.content:
+            now = self.clock()
+            self._pending[message.id] = MemoryEntry.from_discord(message, now)
+
+    def update(self, message):
+        """An edit: re-queue the message if it is still settling or already remembered."""
+        guild_id = message.guild.id if message.guild is not None else 0
+        index = self._guilds.get(guild_id)
+        if message.content and (message.id in self._pending or (index is not None and message.id in index.slots)):
+            self._pending[message.id] = MemoryEntry.from_discord(message, self.clock())
+
+    async def forget(self, guild_id, message_id):
+        """A deleted message leaves memory too."""
+        self._pending.pop(message_id, None)
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            index.remove(message_id)
+        if self._conn is not None:
+            async with self._db_lock:
+                await asyncio.to_thread(self._delete, message_id)
+
+    def _delete(self, message_id):
+        self._conn.execute("DELETE FROM memories WHERE message_id = ?", (message_id,))
+        self._conn.commit()
+
+    def _settled(self, force: bool) -> list:
+        cutoff = self.clock() - self.flush_interval
+        ready = [e for e in self._pending.values() if force or e.updated <= cutoff]
+        for entry in ready:
+            del self._pending[entry.message_id]
+        return ready
+
+    async def flush(self, force: bool = False):
+        """
+        Embed and store every settled pending message, batch_size texts per embedding call.
+        With a job queue the batches are handed to its workers instead (durable, and deferred while
+        replies are in flight).
+        """
+        ready = self._settled(force)
+        if self.jobs is not None:
+            for entry in ready:
+                # Run by the process serving the guild, which holds its index
+                self.jobs.submit(EMBED_JOB, entry.to_payload(), guild_id=entry.guild_id)
+            return
+        for start in range(0, len(ready), self.batch_size):
+            batch = ready[start:start + self.batch_size]
+            if not await self._store(batch):
+                # Put them back; the next flush retries
+                for entry in batch:
+                    self._pending.setdefault(entry.message_id, entry)
+                return
+
+    async def _store(self, batch) -> bool:
+        vectors = await self.embedder.embed([e.text() for e in batch])
+        if vectors is None:
+            self.embed_failures += 1
+            return False
+        self.batches += 1
+        async with self._db_lock:
+            await asyncio.to_thread(self._persist, batch, vectors)
+        for entry, vector in zip(batch, vectors):
+            index = self._guilds.get(entry.guild_id)
+            if index is not None:
+                index.add(entry, vector)
+        self.stored += len(batch)
+        return True
+
+    async def _run_embed_jobs(self, payloads):
+        """JobQueue handler: one embedding call for the whole batch; raising makes the queue retry it."""
+        if not await self._store([MemoryEntry.from_payload(p) for p in payloads]):
+            raise RuntimeError("embedding request failed")
+
+    def _persist(self, batch, vectors):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO memories "
+            "(message_id, guild_id, channel_id, role, author, content, created, model, embedding) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (e.message_id, e.guild_id, e.channel_id, e.role, e.author, e.content, e.created,
+                 self.embedder.name, v.astype(np.float32).tobytes())
+                for e, v in zip(batch, vectors)
+            ],
+        )
+        # Bounded per guild: only the newest max_per_guild rows are kept
+        for guild_id in {e.guild_id for e in batch}:
+            self._conn.execute(
+                "DELETE FROM memories WHERE guild_id = ? AND message_id NOT IN "
+                "(SELECT message_id FROM memories WHERE guild_id = ? ORDER BY created DESC LIMIT ?)",
+                (guild_id, guild_id, self.max_per_guild),
+            )
+        self._conn.commit()
+
+    def _load_rows(self, guild_id):
+        return self._conn.execute(
+            "SELECT message_id, channel_id, role, author, content, created, embedding FROM memories "
+            "WHERE guild_id = ? AND model = ? ORDER BY created DESC LIMIT ?",
+            (guild_id, self.embedder.name, self.max_per_guild),
+        ).fetchall()
+
+    async def _load(self, guild_id):
+        async with self._db_lock:
+            rows = await asyncio.to_thread(self._load_rows, guild_id)
+        index = GuildIndex(self.max_per_guild, self.embedder.dim)
+        for message_id, channel_id, role, author, content, created, blob in reversed(rows):
+            entry = MemoryEntry(message_id, guild_id, channel_id, role, author, content, created)
+            index.add(entry, np.frombuffer(blob, dtype=np.float32))
+        return index
+
+    async def _index(self, guild_id) -> GuildIndex:
+        index = self._guilds.get(guild_id)
+        if index is not None:
+            return index
+        # Concurrent first searches in a guild share one load
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(guild_id))
+            self._loading[guild_id] = task
+        try:
+            index = await task
+        finally:
+            self._loading.pop(guild_id, None)
+        return self._guilds.setdefault(guild_id, index)
+
+    async def search(self, guild_id, channel_id, query: str, exclude_ids=()) -> list:
+        """
+        Past messages relevant to `query`, oldest first, limited to top_k and token_budget.
+        exclude_ids: messages already in the prompt (the recent history window).
+        """
+        if self._conn is None or not query:
+            return []
+        started = time.perf_counter()
+        # Embed first: the guild's index is sized by the embedder's dim, known once it has answered
+        vectors = await self.embedder.embed([query])
+        if vectors is None:
+            return []
+        index = await self._index(guild_id)
+        scope = channel_id if self.scope == "channel" else None
+        found = index.search(vectors[0], scope, self.top_k, self.min_score, exclude_ids)
+        selected, used = [], 0
+        for score, entry in found:
+            tokens = self.tokenizer(entry.text())
+            if used + tokens > self.token_budget:
+                continue
+            selected.append(entry)
+            used += tokens
+        selected.sort(key=lambda e: e.created)
+        self.searches += 1
+        self.hits += bool(selected)
+        self.search_ms += (time.perf_counter() - started) * 1000
+        return selected
+
+    def render(self, entries) -> list:
+        """Retrieved memories as one system message to put ahead of the recent history ([] when none)."""
+        if not entries:
+            return []
+        lines = [
+            f"[{time.strftime('%Y-%m-%d %H:%M', time.gmtime(e.created))}] {e.text()}" for e in entries
+        ]
+        return [{"role": "system", "content": MEMORY_HEADER + "\n" + "\n".join(lines)}]
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "guilds": len(self._guilds),
+            "entries": sum(len(i) for i in self._guilds.values()),
+            "stored": self.stored,
+            "batches": self.batches,
+            "embed_failures": self.embed_failures,
+            "searches": self.searches,
+            "hit_ratio": (self.hits / self.searches) if self.searches else 0.0,
+            "avg_search_ms": (self.search_ms / self.searches) if self.searches else 0.0,
+        }
@@ -0,0 +1,225 @@
+import time
+from contextvars import ContextVar
+from bisect import bisect_left
+from aiohttp import web
+from bot.logger import setup_logger
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional: spans are only exported when opentelemetry-api is installed
+    otel_trace = None
+
+logger = setup_logger("Metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Id of the Discord message being handled by the current task, attached to spans
+current_message_id = ContextVar("current_message_id", default=None)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(key: tuple, le=None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one per label set."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "labels", "start", "span")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.span = None
+
+    def __enter__(self):
+        tracer = self.metrics.tracer
+        if tracer is not None:
+            attributes = {k: str(v) for k, v in self.labels.items()}
+            message_id = current_message_id.get()
+            if message_id is not None:
+                attributes["discord.message_id"] = str(message_id)
+            self.span = tracer.start_as_current_span(f"gideon.{self.name}", attributes=attributes)
+            self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        labels = dict(self.labels, stage=self.name)
+        self.metrics.observe("gideon_stage_seconds", elapsed, **labels)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.metrics.count("gideon_errors_total", **labels)
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms, exposed in Prometheus text format on a local
+    aiohttp /metrics endpoint.
+      - stage(name, **labels): times a block into gideon_stage_seconds{stage=...} and counts
+        exceptions in gideon_errors_total; with tracing on it is also an OpenTelemetry span
+      - count / observe: plain counters and histograms
+      - add_collector(prefix, fn): fn() is a stats() dict, exported as gauges at scrape time;
+        with label="shard", fn() returns {shard id: stats dict} and each gauge carries that label
+    When disabled every call returns immediately and stage() hands back a shared no-op.
+    """
+
+    def __init__(self, enabled: bool = False, host: str = "127.0.0.1", port: int = 9108, tracing: bool = False):
+        self.enabled = enabled
+        self.host = host
+        self.port = port
+        self.tracer = None
+        if enabled and tracing:
+            if otel_trace is None:
+                logger.error("METRICS_TRACING is on but opentelemetry-api is not installed; spans disabled")
+            else:
+                self.tracer = otel_trace.get_tracer("gideon")
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._runner = None
+
+    def stage(self, name: str, **labels):
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _Stage(self, name, labels)
+
+    def count(self, name: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        series = self._counters.setdefault(name, {})
+        key = _labels_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        series = self._histograms.setdefault(name, {})
+        key = _labels_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def record_usage(self, persona: str, usage):
+        """Token counters from the usage field of an OpenAI response."""
+        if not self.enabled or not usage:
+            return
+        self.count("gideon_tokens_total", usage.get("prompt_tokens") or 0, persona=persona, kind="prompt")
+        self.count("gideon_tokens_total", usage.get("completion_tokens") or 0, persona=persona, kind="completion")
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        self.count("gideon_tokens_total", cached, persona=persona, kind="cached")
+
+    def add_collector(self, prefix: str, stats_fn, label: str = None):
+        self._collectors.append((prefix, stats_fn, label))
+
+    def value(self, name: str, **labels):
+        """Current counter value (tests and ad-hoc inspection)."""
+        return self._counters.get(name, {}).get(_labels_key(labels), 0)
+
+    def histogram(self, name: str, **labels):
+        return self._histograms.get(name, {}).get(_labels_key(labels))
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self._counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(self._histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_format_labels(key, bound)} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, '+Inf')} {h.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        for prefix, stats_fn, label in self._collectors:
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                logger.error(f"Metrics collector {prefix} failed: {e}")
+                continue
+            series = {}
+            groups = stats.items() if label else [(None, stats)]
+            for label_value, group in groups:
+                key = ((label, label_value),) if label else ()
+                for stat, value in group.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if not isinstance(value, (int, float)):
+                        continue
+                    series.setdefault(f"gideon_{prefix}_{stat}", []).append((key, value))
+            for name, values in series.items():
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in values:
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        if not self.enabled or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 binds an ephemeral port; report the real one
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Default for components constructed without a Metrics instance
+NULL_METRICS = Metrics(enabled=False)
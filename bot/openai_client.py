@@ -1,12 +1,172 @@
+import asyncio
+import json
+import time
+import aiohttp
 from bot.logger import setup_logger
+from bot.request_executor import RequestExecutor
+from bot.backends import Backend, BackendPool, OPENAI_CHAT_URL
+from bot.response_parser import EVENT_TOOLS, parse_tool_calls
+from bot.prompts import PromptLibrary, ROUTER_PERSONA_DEFINITIONS, SUMMARY_PROMPT
+from bot.metrics import NULL_METRICS
+from bot.usage import current_usage
 
 logger = setup_logger("OpenAI")
 
+PERSONAS = ("DEVELOPER", "EVENT", "ASSISTANT")
+ROUTING_MODES = ("sequential", "combined", "speculative")
+
+ROUTER_SYSTEM_PROMPT = (
+    "You are a routing assistant. You will be given a user's message. "
+    "You MUST select and output EXACTLY ONE of these personalities or services "
+    "(no natural language):\n\n"
+    + ROUTER_PERSONA_DEFINITIONS +
+    "Return only the one service/personality name (no extra text, no chat, uppercase, no explanations)."
+)
+
+def estimate_payload_tokens(payload: dict) -> int:
+    """Rough prompt + completion size of a request, used to pace against the tokens-per-minute limit."""
+    chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+    if "tools" in payload:
+        chars += len(json.dumps(payload["tools"]))
+    return chars // 4 + payload.get("max_tokens", 0)
+
+
+def persona_prompt_for(router_persona: str) -> str:
+    """Map a router persona (DEVELOPER/EVENT/ASSISTANT) to the ask_chatgpt persona prompt that serves it."""
+    return "developer" if router_persona == "DEVELOPER" else "assistant"
+
 class OpenAIClient:
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", pool_size: int = 100,
+                 pool_per_host: int = 20, keepalive_timeout: float = 75.0, dns_cache_ttl: int = 300,
+                 routing_mode: str = "sequential", intent_classifier=None, streaming: bool = False,
+                 response_cache=None, executor=None, tool_calling: bool = False, prompts=None,
+                 metrics=None, api_url: str = OPENAI_CHAT_URL, backends=None, usage=None):
+        if routing_mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode '{routing_mode}', expected one of {ROUTING_MODES}")
         self.api_key = api_key
+        self.routing_mode = routing_mode
+        self.intent_classifier = intent_classifier
+        # Streamed replies need the persona up front, so they are not available in combined mode
+        self.streaming = streaming and routing_mode != "combined"
+        # Event actions as OpenAI tools instead of tag blocks; the combined JSON reply has no room for them
+        self.tool_calling = tool_calling and routing_mode != "combined"
+        self.response_cache = response_cache
+        self.executor = executor or RequestExecutor()
+        self.prompts = prompts or PromptLibrary()
+        self.metrics = metrics or NULL_METRICS
+        self.usage = usage
         self.model = model
-        self.api_url = "https://api.openai.com/v1/chat/completions"
+        self.api_url = api_url
+        self.embeddings_url = "https://api.openai.com/v1/embeddings"
+        self.pool_size = pool_size
+        self.pool_per_host = pool_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        # Where chat calls go: by default just api_url and model; a configured pool can give the
+        # router call its own small model and fail over or hedge across providers
+        self.backends = backends or BackendPool(
+            [Backend("openai", api_url, model, api_key, executor=self.executor)], metrics=self.metrics
+        )
+        self._session = None
+
+    async def start(self):
+        """
+        Open the long-lived HTTP session. Every request made by this client reuses its
+        pooled keep-alive connections instead of paying a new TCP+TLS handshake per call.
+        """
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+            # Authorization is per request: each backend sends its own key
+            headers={"Content-Type": "application/json"},
+        )
+        logger.info(f"OpenAI HTTP session started (pool={self.pool_size}, per_host={self.pool_per_host})")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Lazily start so the client also works outside GideonBot's lifecycle (scripts, tests)
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _post_chat(self, payload: dict, label: str, cacheable: bool = False, role: str = "chat", persona=None):
+        """
+        POST a chat completion on the shared session, to the best backend serving `role` (router or chat).
+        Returns the decoded JSON response, or None on any failure (already logged).
+        cacheable: the request is deterministic, so it may be answered from (and merged in) the response cache.
+        persona: record the response's usage under this name; only calls that reached a backend are
+        recorded, never answers served from the cache or merged onto another caller's request.
+        """
+        async def fetch():
+            data = await self._send_chat(payload, label, role=role)
+            if data and persona is not None:
+                self._record_usage(None, data.get("usage"), persona=persona, model=data.get("model"))
+            return data
+
+        if cacheable and self.response_cache is not None:
+            return await self.response_cache.get_or_fetch(payload, fetch)
+        return await fetch()
+
+    async def _send_chat(self, payload: dict, label: str, role: str = "chat"):
+        if role == "chat":
+            role = self._chat_role()
+        session = await self._get_session()
+        with self.metrics.stage("openai", call=label):
+            data = await self.backends.post_json(
+                session, payload, label, role=role, estimated_tokens=estimate_payload_tokens(payload)
+            )
+        if data is None:
+            self.metrics.count("gideon_errors_total", stage="openai", call=label)
+        return data
+
+    def _record_usage(self, template, usage, persona=None, model=None):
+        """Feed a response's usage into the prompt-cache stats, the per-persona token counters and the usage ledger."""
+        if template is not None:
+            self.prompts.record_usage(template, usage)
+        self.metrics.record_usage(persona or template.name, usage)
+        if self.usage is not None:
+            self.usage.record(persona or template.name, model or self.model, usage)
+
+    def _max_tokens(self, default: int) -> int:
+        """Reply length cap, lowered while the guild being answered is using up its token budget."""
+        scope = current_usage.get()
+        if scope is not None and scope.plan.max_tokens:
+            return min(default, scope.plan.max_tokens)
+        return default
+
+    def _chat_role(self) -> str:
+        scope = current_usage.get()
+        return "economy" if scope is not None and scope.plan.economy else "chat"
+
+    def _persona_payload(self, message, bot_names, history, persona, channel_name, tools: bool = False):
+        """Returns (payload, template). The compiled static prompt leads; per-request context trails."""
+        tools = tools and persona != "developer"
+        template = self.prompts.get(persona, tools=tools)
+        payload = {
+            "model": self.model,
+            "messages": self.prompts.messages(template, history, message, bot_names, channel_name),
+            "max_tokens": self._max_tokens(256),
+            "temperature": 0.7
+        }
+        if tools:
+            payload["tools"] = EVENT_TOOLS
+            payload["tool_choice"] = "auto"
+        return payload, template
 
     async def ask_chatgpt(self, message: str, bot_names=None, history=None, persona="assistant", channel_name="") -> str:
         """
@@ -15,88 +175,117 @@ class OpenAIClient:
         history: A list of {"role": "user"|"assistant", "content": str} dicts representing recent chat history.
         persona: "assistant" (default) or "developer" for code/software answers.
         channel_name: The name of the Discord channel where this message was posted, for context.
+        Returns the reply text, or a ParsedResponse when the model called event tools (tool_calling mode).
         """
-        if bot_names is None:
-            bot_names = []
-        if history is None:
-            history = []
-        if channel_name is None:
-            channel_name = ""
-        # allow both str and list
-        if isinstance(bot_names, str):
-            bot_names = [bot_names]
-        names_str = ", ".join(f'"{n}"' for n in bot_names if n)
-
-        # Add current date/time context in prompt
-        import datetime
-        now = datetime.datetime.now(datetime.timezone.utc).astimezone()
-        now_str = now.isoformat()
-        tz_str = now.tzname() or str(now.utcoffset())
-
-        dev_keywords = ["dev", "code", "engineering", "developer", "backend", "frontend", "python", "java", "typescript", "review"]
-        is_dev_channel = any(k in channel_name for k in dev_keywords)
-
-        if persona == "developer":
-            sys_prompt = (
-                f"It is now {now_str} ({tz_str}). "
-                f"This message was sent in the Discord channel '{channel_name}'. "
-                "You are Gideon, a senior software engineer developer on Discord. "
-                "You ONLY answer technical questions about programming, software, code, design, bugs, code review, or engineering topics. "
-                "If the user asks for help with code, architecture, dev tools, pull requests, or anything technical, reply in detail as a helpful, concise expert. "
-                "You may use Markdown code blocks and explain like a top Stack Overflow answer. "
-                f"If the current channel name contains development-related keywords (like dev, code, engineering), you SHOULD always answer technical questions even if not explicitly tagged. "
-                "If the channel is for casual chat (like 'coffee-machine', 'random', 'social'), only answer if you are directly addressed, mentioned, or tagged in a technical question—but still err on the side of helping if clearly called on. "
-                "If the question is not technical, or is about events/scheduling/personal help, reply ONLY (exactly) with 'NO_REPLY'."
-            )
-        else:
-            sys_prompt = (
-                f"It is now {now_str} ({tz_str}). "
-                f"This message was sent in the Discord channel '{channel_name}'. "
-                f"You are Gideon, a Discord bot assistant. "
-                f"Your recognized names and aliases are: {names_str}. "
-                "If the user asks a factual, calculation, or informational question (e.g., 'what's 3+2', 'what year is it?', 'how do I X?'), always answer directly and informatively—do not reply with generic help offers. "
-                "If the user is asking to schedule/plan a meeting, event, or reminder, respond ONLY in this strict format—replace fields, do NOT add any commentary or explanation, do NOT answer outside this format:"
-                "\n[SCHEDULE_EVENT]\n"
-                "{\n  \"title\": \"...\","
-                "\n  \"description\": \"...\","
-                "\n  \"participants\": [\"...\"],"
-                "\n  \"datetime\": \"...\","
-                "\n  \"timezone\": \"...\""
-                "\n}\n[/SCHEDULE_EVENT]\n"
-                "If the user is asking you to update or edit an existing event, respond ONLY in this format (do not add extra text or chat):"
-                "\n[UPDATE_EVENT]\n"
-                "{\n  \"title\": \"...\","
-                "\n  \"datetime\": \"...\","
-                "\n  \"fields_to_update\": { \"location\": \"...\", \"description\": \"...\", ... }"
-                "\n}\n[/UPDATE_EVENT]\n"
-                "If the user is asking you to cancel/delete an event, respond ONLY in this format (do not add extra text or chat):"
-                "\n[CANCEL_EVENT]\n"
-                "{\n  \"title\": \"...\","
-                "\n  \"datetime\": \"...\""
-                "\n}\n[/CANCEL_EVENT]\n"
-                "IMPORTANT: The \"datetime\" field MUST ALWAYS be a valid ISO 8601 string (e.g., 2025-06-25T20:00:00), NOT natural language. DO NOT use 'tonight', 'tomorrow', etc.—always convert to a full ISO timestamp. "
-                "If the user uses natural language (such as 'tonight', 'tomorrow at 8pm', etc), ALWAYS interpret this as Europe/Brussels time unless they specify a different timezone. "
-                "If the user requests a date/time that is in the past, explain that scheduling past events is not possible and ask them to give a valid time in the future. "
-                "If you do not have enough context to identify the event, ask the user for clarification."
-                "Do NOT explain the format—ONLY use one of the event blocks."
-                "Be brief, direct, and concise. If asked about future features, answer based on known roadmap plans."
+        payload, template = self._persona_payload(
+            message, bot_names, history, persona, channel_name, tools=self.tool_calling
+        )
+        data = await self._post_chat(payload, f"OpenAI {persona} completion")
+        if not data:
+            return ""
+        self._record_usage(template, data.get("usage"), model=data.get("model"))
+        try:
+            reply = data["choices"][0]["message"]
+            if reply.get("tool_calls"):
+                return parse_tool_calls(reply)
+            return reply["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            logger.error(f"OpenAI {persona} completion returned an unexpected body: {e}")
+            return ""
+
+    async def stream_chatgpt(self, message: str, bot_names=None, history=None, persona="assistant", channel_name=""):
+        """
+        Same prompt as ask_chatgpt, but yields the reply as text deltas while the model produces it
+        (server-sent events). Yields nothing if the request fails. Always uses the tag-block prompt:
+        streamed tool calls are not handled, event requests are expected to go through ask_chatgpt.
+        """
+        payload, template = self._persona_payload(message, bot_names, history, persona, channel_name)
+        payload["stream"] = True
+        # The final chunk then carries usage, including how much of the prompt was a cache hit
+        payload["stream_options"] = {"include_usage": True}
+        label = f"OpenAI {persona} stream"
+        session = await self._get_session()
+        started = time.perf_counter()
+        first_token = True
+        resp = await self.backends.open(
+            session, payload, label, role=self._chat_role(), estimated_tokens=estimate_payload_tokens(payload)
+        )
+        if resp is None:
+            self.metrics.count("gideon_errors_total", stage="openai", call=label)
+            return
+        try:
+            async with resp:
+                async for raw in resp.content:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    try:
+                        chunk = json.loads(data)
+                        if chunk.get("usage"):
+                            self._record_usage(template, chunk["usage"], model=chunk.get("model"))
+                        if not chunk.get("choices"):
+                            continue
+                        delta = chunk["choices"][0]["delta"].get("content")
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        continue
+                    if delta:
+                        if first_token:
+                            first_token = False
+                            self.metrics.observe("gideon_first_token_seconds", time.perf_counter() - started, call=label)
+                        yield delta
+        except Exception as e:
+            self.metrics.count("gideon_errors_total", stage="openai", call=label)
+            logger.error(f"{label} failure: {e}")
+
+    async def embed(self, texts: list, model: str = "text-embedding-3-small"):
+        """One embeddings request for a batch of texts. Returns the vectors in input order, or None on failure."""
+        payload = {"model": model, "input": texts}
+        label = "OpenAI embeddings"
+        session = await self._get_session()
+        with self.metrics.stage("openai", call=label):
+            data = await self.executor.post_json(
+                session, self.embeddings_url, payload, label, estimated_tokens=sum(len(t) for t in texts) // 4,
+                headers={"Authorization": f"Bearer {self.api_key}"},
             )
+        if data is None:
+            self.metrics.count("gideon_errors_total", stage="openai", call=label)
+            return None
+        self.metrics.record_usage("embeddings", data.get("usage"))
+        if self.usage is not None:
+            self.usage.record("embeddings", data.get("model") or model, data.get("usage"))
+        try:
+            return [item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"])]
+        except (KeyError, TypeError) as e:
+            logger.error(f"{label} returned an unexpected body: {e}")
+            return None
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    async def summarize(self, texts: list, max_words: int = 80):
+        """Summaries of several long messages from one request, in input order; None on failure."""
         payload = {
             "model": self.model,
             "messages": [
-                {"role": "system", "content": sys_prompt}
-            ] + history + [
-                {"role": "user", "content": message}
+                {"role": "system", "content": SUMMARY_PROMPT.format(max_words=max_words)},
+                {"role": "user", "content": json.dumps(texts, ensure_ascii=False)},
             ],
-            "max_tokens": 256,
-            "temperature": 0.7
+            "max_tokens": 40 + len(texts) * max_words * 2,
+            "temperature": 0.2,
+            "response_format": {"type": "json_object"},
         }
-
+        data = await self._post_chat(payload, "OpenAI summarize", cacheable=True, persona="summarize")
+        if not data:
+            return None
+        try:
+            summaries = json.loads(data["choices"][0]["message"]["content"])["summaries"]
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(f"OpenAI summarize returned an unexpected body: {e}")
+            return None
+        if not isinstance(summaries, list) or len(summaries) != len(texts):
+            logger.error(f"OpenAI summarize returned {len(summaries) if isinstance(summaries, list) else 0} summaries for {len(texts)} messages")
+            return None
+        return [str(s).strip() for s in summaries]
 
     async def ask_select_event_to_cancel(self, original_prompt: str, events: list) -> str:
             """
@@ -122,10 +311,6 @@ class OpenAIClient:
                 + original_prompt
                 + "\nWhich event id(s) should be cancelled (csv or single id, or NONE)?"
             )
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
             payload = {
                 "model": self.model,
                 "messages": [
@@ -134,16 +319,14 @@ class OpenAIClient:
                 "max_tokens": 32,
                 "temperature": 0.1
             }
-            import aiohttp
+            data = await self._post_chat(
+                payload, "OpenAI event select to cancel", cacheable=True, role="router", persona="event_select"
+            )
+            if not data:
+                return ""
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.api_url, json=payload, headers=headers, timeout=30) as resp:
-                        if resp.status != 200:
-                            logger.error(f"OpenAI event select to cancel failure: {resp.status}: {await resp.text()}")
-                            return ""
-                        data = await resp.json()
-                        content = data["choices"][0]["message"]["content"]
-                        return content.strip()
+                content = data["choices"][0]["message"]["content"]
+                return content.strip()
             except Exception as e:
                 logger.error(f"OpenAI event select to cancel failure: {e}")
                 return ""
@@ -154,36 +337,135 @@ class OpenAIClient:
             Calls a dedicated router system prompt to select from predefined personas/services.
             Returns the selected persona string, e.g. 'DEVELOPER', 'EVENT', 'ASSISTANT'.
             """
-            system_prompt = (
-                "You are a routing assistant. You will be given a user's message. "
-                "You MUST select and output EXACTLY ONE of these personalities or services "
-                "(no natural language):\n\n"
-                "DEVELOPER: for any programming, code, bug, review, code generation, software/dev questions.\n"
-                "EVENT: for anything related to meeting scheduling, event planning, reminders, times, or Discord event management.\n"
-                "ASSISTANT: for all other requests—productivity, general knowledge, fun, or when the request fits none of the above.\n\n"
-                "Return only the one service/personality name (no extra text, no chat, uppercase, no explanations)."
-            )
             payload = {
                 "model": self.model,
                 "messages": [
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": ROUTER_SYSTEM_PROMPT},
                     {"role": "user", "content": message},
                 ],
                 "max_tokens": 12,
                 "temperature": 0.0
             }
-            import aiohttp
+            data = await self._post_chat(payload, "Router LLM persona select", cacheable=True, role="router", persona="router")
+            if not data:
+                return ""
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.api_url, json=payload, headers={
-                        "Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"
-                    }, timeout=30) as resp:
-                        if resp.status != 200:
-                            logger.error(f"Router LLM returned {resp.status}: {await resp.text()}")
-                            return ""
-                        data = await resp.json()
-                        content = data["choices"][0]["message"]["content"]
-                        return content.strip().upper()
+                content = data["choices"][0]["message"]["content"]
+                return content.strip().upper()
             except Exception as e:
                 logger.error(f"Router LLM persona select failure: {e}")
-                return ""
\ No newline at end of file
+                return ""
+
+    def _classify_locally(self, message: str):
+        return self.intent_classifier.classify(message) if self.intent_classifier else None
+
+    async def _ask_router(self, message: str, fallback: str = "ASSISTANT") -> str:
+        """
+        LLM router call that always yields a known persona. When the router fails even after retries
+        (or answers garbage), use the local classifier's best guess rather than blindly ASSISTANT.
+        """
+        router_persona = await self.ask_router_persona(message)
+        if router_persona in PERSONAS:
+            return router_persona
+        logger.info(f"Router returned '{router_persona}', falling back to {fallback}")
+        return fallback
+
+    async def route(self, message: str) -> str:
+        """Pick the persona only: local classifier when confident, otherwise the LLM router."""
+        intent = self._classify_locally(message)
+        if intent is not None and self.intent_classifier.is_confident(intent):
+            self.intent_classifier.record_local_route()
+            return intent.persona
+        return await self._ask_router(message, fallback=intent.persona if intent is not None else "ASSISTANT")
+
+    async def route_and_respond(self, message: str, bot_names=None, history=None, channel_name="") -> tuple:
+        """
+        Pick a persona for the message and produce its reply, using the configured routing mode:
+          sequential:  router call, then the persona call (two serial round trips)
+          combined:    one structured call returning both persona and reply
+          speculative: router and the likely persona call in parallel; the loser is cancelled
+        When a local intent classifier is configured and confident, no router call is made at all.
+        Returns (router_persona, response). response is "" when the completion failed.
+        """
+        intent = self._classify_locally(message)
+        if intent is not None and self.intent_classifier.is_confident(intent):
+            self.intent_classifier.record_local_route()
+            response = await self.ask_chatgpt(
+                message, bot_names=bot_names, history=history,
+                persona=persona_prompt_for(intent.persona), channel_name=channel_name
+            )
+            return intent.persona, response
+        if self.routing_mode == "combined":
+            return await self.ask_combined(message, bot_names=bot_names, history=history, channel_name=channel_name)
+        if self.routing_mode == "speculative":
+            return await self.ask_speculative(
+                message, bot_names=bot_names, history=history, channel_name=channel_name,
+                guess=intent.persona if intent is not None else "ASSISTANT"
+            )
+        router_persona = await self._ask_router(
+            message, fallback=intent.persona if intent is not None else "ASSISTANT"
+        )
+        response = await self.ask_chatgpt(
+            message, bot_names=bot_names, history=history,
+            persona=persona_prompt_for(router_persona), channel_name=channel_name
+        )
+        return router_persona, response
+
+    async def ask_combined(self, message: str, bot_names=None, history=None, channel_name="") -> tuple:
+        """
+        Single round trip: the model classifies the message and answers it in the same JSON object,
+        {"persona": "DEVELOPER|EVENT|ASSISTANT", "reply": "..."}. For EVENT the reply is the event block.
+        """
+        template = self.prompts.get("combined")
+        payload = {
+            "model": self.model,
+            "messages": self.prompts.messages(template, history, message, bot_names, channel_name),
+            "max_tokens": self._max_tokens(320),
+            "temperature": 0.7,
+            "response_format": {"type": "json_object"},
+        }
+        data = await self._post_chat(payload, "OpenAI combined route+reply")
+        if not data:
+            return "", ""
+        self._record_usage(template, data.get("usage"), model=data.get("model"))
+        try:
+            content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            logger.error(f"OpenAI combined route+reply returned an unexpected body: {e}")
+            return "", ""
+        try:
+            parsed = json.loads(content)
+            router_persona = str(parsed.get("persona", "")).strip().upper()
+            reply = str(parsed.get("reply", "")).strip()
+        except (ValueError, AttributeError):
+            # The model ignored the JSON contract; treat the raw text as a plain assistant reply
+            logger.error("OpenAI combined route+reply did not return valid JSON, using raw text")
+            return "ASSISTANT", content.strip()
+        if router_persona not in PERSONAS:
+            router_persona = "ASSISTANT"
+        return router_persona, reply
+
+    async def ask_speculative(self, message: str, bot_names=None, history=None, channel_name="", guess="ASSISTANT") -> tuple:
+        """
+        Fire the router and the persona call for `guess` at the same time. If the router agrees with
+        the guess (EVENT and ASSISTANT share the assistant prompt) the speculative answer is used,
+        otherwise it is cancelled and the right persona is asked.
+        """
+        guessed_prompt = persona_prompt_for(guess)
+        speculative = asyncio.create_task(self.ask_chatgpt(
+            message, bot_names=bot_names, history=history, persona=guessed_prompt, channel_name=channel_name
+        ))
+        try:
+            router_persona = await self._ask_router(message, fallback=guess)
+        except BaseException:
+            speculative.cancel()
+            raise
+        if persona_prompt_for(router_persona) == guessed_prompt:
+            return router_persona, await speculative
+        speculative.cancel()
+        logger.info(f"Speculative {guess} call discarded, router picked {router_persona}")
+        response = await self.ask_chatgpt(
+            message, bot_names=bot_names, history=history,
+            persona=persona_prompt_for(router_persona), channel_name=channel_name
+        )
+        return router_persona, response
@@ -0,0 +1,199 @@
+import datetime
+import hashlib
+from bot.logger import setup_logger
+
+logger = setup_logger("Prompts")
+
+# Bump whenever the wording of a template changes; it is logged and reported with the cache stats
+TEMPLATE_VERSION = 2
+
+ROUTER_PERSONA_DEFINITIONS = (
+    "DEVELOPER: for any programming, code, bug, review, code generation, software/dev questions.\n"
+    "EVENT: for anything related to meeting scheduling, event planning, reminders, times, or Discord event management.\n"
+    "ASSISTANT: for all other requests—productivity, general knowledge, fun, or when the request fits none of the above.\n\n"
+)
+
+DEVELOPER_PROMPT = (
+    "You are Gideon, a senior software engineer developer on Discord. "
+    "You ONLY answer technical questions about programming, software, code, design, bugs, code review, or engineering topics. "
+    "If the user asks for help with code, architecture, dev tools, pull requests, or anything technical, reply in detail as a helpful, concise expert. "
+    "You may use Markdown code blocks and explain like a top Stack Overflow answer. "
+    "If the current channel name contains development-related keywords (like dev, code, engineering), you SHOULD always answer technical questions even if not explicitly tagged. "
+    "If the channel is for casual chat (like 'coffee-machine', 'random', 'social'), only answer if you are directly addressed, mentioned, or tagged in a technical question—but still err on the side of helping if clearly called on. "
+    "If the question is not technical, or is about events/scheduling/personal help, reply ONLY (exactly) with 'NO_REPLY'."
+)
+
+ASSISTANT_PROMPT = (
+    "You are Gideon, a Discord bot assistant. "
+    "If the user asks a factual, calculation, or informational question (e.g., 'what's 3+2', 'what year is it?', 'how do I X?'), always answer directly and informatively—do not reply with generic help offers. "
+    "{event_instructions}"
+    "Be brief, direct, and concise. If asked about future features, answer based on known roadmap plans."
+)
+
+EVENT_BLOCK_INSTRUCTIONS = (
+    "If the user is asking to schedule/plan a meeting, event, or reminder, respond ONLY in this strict format—replace fields, do NOT add any commentary or explanation, do NOT answer outside this format:"
+    "\n[SCHEDULE_EVENT]\n"
+    "{\n  \"title\": \"...\","
+    "\n  \"description\": \"...\","
+    "\n  \"participants\": [\"...\"],"
+    "\n  \"datetime\": \"...\","
+    "\n  \"timezone\": \"...\""
+    "\n}\n[/SCHEDULE_EVENT]\n"
+    "If the user is asking you to update or edit an existing event, respond ONLY in this format (do not add extra text or chat):"
+    "\n[UPDATE_EVENT]\n"
+    "{\n  \"title\": \"...\","
+    "\n  \"datetime\": \"...\","
+    "\n  \"fields_to_update\": { \"location\": \"...\", \"description\": \"...\", ... }"
+    "\n}\n[/UPDATE_EVENT]\n"
+    "If the user is asking you to cancel/delete an event, respond ONLY in this format (do not add extra text or chat):"
+    "\n[CANCEL_EVENT]\n"
+    "{\n  \"title\": \"...\","
+    "\n  \"datetime\": \"...\""
+    "\n}\n[/CANCEL_EVENT]\n"
+    "IMPORTANT: The \"datetime\" field MUST ALWAYS be a valid ISO 8601 string (e.g., 2025-06-25T20:00:00), NOT natural language. DO NOT use 'tonight', 'tomorrow', etc.—always convert to a full ISO timestamp. "
+    "If the user uses natural language (such as 'tonight', 'tomorrow at 8pm', etc), ALWAYS interpret this as Europe/Brussels time unless they specify a different timezone. "
+    "If the user requests a date/time that is in the past, explain that scheduling past events is not possible and ask them to give a valid time in the future. "
+    "If you do not have enough context to identify the event, ask the user for clarification."
+    "Do NOT explain the format—ONLY use one of the event blocks."
+)
+
+# Tool-calling mode: the formats live in EVENT_TOOLS, sent once per request as structured schemas
+EVENT_TOOL_INSTRUCTIONS = (
+    "To schedule, update or cancel a Discord event, call the matching tool instead of replying in text. "
+    "Datetimes are ISO 8601; read natural language times ('tonight', 'tomorrow at 8pm') as Europe/Brussels time unless the user gives another timezone. "
+    "If the requested time is in the past, or you cannot tell which event is meant, ask the user instead of calling a tool. "
+)
+
+COMBINED_PROMPT = (
+    "First classify the user's message as exactly one of:\n"
+    + ROUTER_PERSONA_DEFINITIONS
+    + "Then answer it. If you chose DEVELOPER, answer following these instructions:\n"
+    + DEVELOPER_PROMPT
+    + "\n\nOtherwise (EVENT or ASSISTANT), answer following these instructions:\n"
+    + ASSISTANT_PROMPT.format(event_instructions=EVENT_BLOCK_INSTRUCTIONS)
+    + "\n\nOutput ONLY a JSON object of the form "
+    '{"persona": "DEVELOPER" | "EVENT" | "ASSISTANT", "reply": "<your answer or event block>"}.'
+)
+
+# Background job: shortens long messages (code pastes, walls of text) for later turns' history
+SUMMARY_PROMPT = (
+    "You shorten Discord messages so they can be kept in a chat history. "
+    "You get a JSON array of messages. For each one write a summary of at most {max_words} words that keeps "
+    "what was asked or claimed, names, numbers, error messages, and file, function and variable names. "
+    "For code, say what it does and quote the lines that matter. "
+    'Output ONLY a JSON object {{"summaries": ["...", ...]}} with one summary per message, in the same order.'
+)
+
+# Everything that changes per request; sent as a trailing system message right before the user turn
+CONTEXT_TEMPLATE = (
+    "Request context (not part of the user's message): "
+    "it is now {now} ({tz}). "
+    "This message was sent in the Discord channel '{channel}'. "
+    "{aliases}"
+)
+
+
+class PromptTemplate:
+    """
+    A compiled system prompt: the static text is built once and stays byte-identical across
+    requests, so the provider's prompt cache can reuse it. fingerprint identifies the exact bytes.
+    """
+    __slots__ = ("name", "version", "text", "fingerprint")
+
+    def __init__(self, name: str, text: str, version: int = TEMPLATE_VERSION):
+        self.name = name
+        self.version = version
+        self.text = text
+        self.fingerprint = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+    def message(self) -> dict:
+        return {"role": "system", "content": self.text}
+
+    def __repr__(self):
+        return f"PromptTemplate({self.name} v{self.version} {self.fingerprint})"
+
+
+def render_context(bot_names=None, channel_name="", now=None) -> str:
+    """The per-request part of the prompt: current time, channel and (for the assistant) the bot's aliases."""
+    if isinstance(bot_names, str):
+        bot_names = [bot_names]
+    now = now or datetime.datetime.now(datetime.timezone.utc).astimezone()
+    names_str = ", ".join(f'"{n}"' for n in bot_names or () if n)
+    return CONTEXT_TEMPLATE.format(
+        now=now.isoformat(),
+        tz=now.tzname() or str(now.utcoffset()),
+        channel=channel_name or "",
+        aliases=f"Your recognized names and aliases are: {names_str}." if names_str else "",
+    ).rstrip()
+
+
+class PromptLibrary:
+    """
+    The persona prompts, compiled once at startup and looked up by (persona, tools).
+    Also tracks how much of each template's prompt the provider served from its prompt cache,
+    from usage.prompt_tokens_details.cached_tokens of every response.
+    """
+
+    def __init__(self):
+        self.templates = {
+            ("developer", False): PromptTemplate("developer", DEVELOPER_PROMPT),
+            ("assistant", False): PromptTemplate(
+                "assistant", ASSISTANT_PROMPT.format(event_instructions=EVENT_BLOCK_INSTRUCTIONS)
+            ),
+            ("assistant", True): PromptTemplate(
+                "assistant+tools", ASSISTANT_PROMPT.format(event_instructions=EVENT_TOOL_INSTRUCTIONS)
+            ),
+            ("combined", False): PromptTemplate("combined", COMBINED_PROMPT),
+        }
+        self._usage = {}
+        logger.info(
+            f"Compiled prompt templates v{TEMPLATE_VERSION}: "
+            + ", ".join(f"{t.name}={t.fingerprint}" for t in self.templates.values())
+        )
+
+    def get(self, persona: str, tools: bool = False) -> PromptTemplate:
+        template = self.templates.get((persona, tools and persona == "assistant"))
+        return template if template is not None else self.templates[("assistant", False)]
+
+    def messages(self, template: PromptTemplate, history, message: str, bot_names=None, channel_name="") -> list:
+        """Static system prompt, then history, then the per-request context, then the user's message."""
+        return (
+            [template.message()]
+            + list(history or [])
+            + [
+                {"role": "system", "content": render_context(bot_names, channel_name)},
+                {"role": "user", "content": message},
+            ]
+        )
+
+    def record_usage(self, template: PromptTemplate, usage):
+        if not usage:
+            return
+        entry = self._usage.setdefault(template.name, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += usage.get("prompt_tokens") or 0
+        entry[2] += (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+
+    def stats(self) -> dict:
+        prompt_tokens = sum(e[1] for e in self._usage.values())
+        cached_tokens = sum(e[2] for e in self._usage.values())
+        return {
+            "version": TEMPLATE_VERSION,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": (cached_tokens / prompt_tokens) if prompt_tokens else 0.0,
+            "templates": {
+                name: {
+                    "fingerprint": self._fingerprint(name),
+                    "requests": requests,
+                    "cached_ratio": (cached / tokens) if tokens else 0.0,
+                }
+                for name, (requests, tokens, cached) in self._usage.items()
+            },
+        }
+
+    def _fingerprint(self, name):
+        for template in self.templates.values():
+            if template.name == name:
+                return template.fingerprint
+        return None
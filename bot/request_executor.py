@@ -0,0 +1,210 @@
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+import aiohttp
+from bot.logger import setup_logger, body as log_body
+
+logger = setup_logger("RequestExecutor")
+
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str):
+    """Parse OpenAI reset durations like '20ms', '1s', '6m0s' into seconds (None if unparseable)."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def parse_retry_after(headers):
+    """Seconds to wait from retry-after-ms / Retry-After (delta seconds or HTTP date), or None."""
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Client-side bucket refilled continuously at capacity per `window` seconds. Its level is
+    re-synchronised from the provider's x-ratelimit-* headers after every response, so the
+    bot slows itself down before the provider starts answering 429.
+    """
+
+    def __init__(self, capacity=None, window: float = 60.0, clock=time.monotonic):
+        self.capacity = capacity
+        self.window = window
+        self.level = capacity
+        self.clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        if self.capacity is not None and self.level is not None:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / self.window)
+        self._updated = now
+
+    def sync(self, remaining, limit=None, reset_seconds=None):
+        if limit is not None:
+            self.capacity = limit
+        if reset_seconds and self.capacity and remaining is not None:
+            # Refill so that the bucket is full again exactly when the provider says it resets
+            self.window = max(reset_seconds * self.capacity / max(self.capacity - remaining, 1), 0.001)
+        self._refill()
+        if remaining is not None:
+            self.level = remaining
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 when unknown or already available); reserves it."""
+        self._refill()
+        if self.capacity is None or self.level is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+        return -self.level * self.window / self.capacity
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RequestExecutor:
+    """
+    Shared HTTP request path for OpenAI calls: paces requests with request/token buckets driven by
+    the rate-limit headers, retries 429/5xx/network errors with full-jitter exponential backoff
+    (honouring Retry-After), and counts retries, wait time and the remaining budget.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0, rng=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self.request_bucket = TokenBucket()
+        self.token_bucket = TokenBucket()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.backoff_seconds = 0.0
+        self.throttle_seconds = 0.0
+
+    def _observe(self, headers):
+        self.request_bucket.sync(
+            _header_int(headers, "x-ratelimit-remaining-requests"),
+            _header_int(headers, "x-ratelimit-limit-requests"),
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.token_bucket.sync(
+            _header_int(headers, "x-ratelimit-remaining-tokens"),
+            _header_int(headers, "x-ratelimit-limit-tokens"),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+    async def _pace(self, estimated_tokens: int):
+        wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(estimated_tokens))
+        if wait > 0:
+            self.throttle_seconds += wait
+            logger.info(f"Pacing OpenAI request for {wait:.2f}s to stay inside the rate limit")
+            await asyncio.sleep(wait)
+
+    def _backoff(self, attempt: int, retry_after):
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def open(self, session, url: str, payload: dict, label: str, estimated_tokens: int = 0, headers=None):
+        """
+        Send the request, retrying transient failures. Returns the 200 ClientResponse (the caller reads
+        and releases it, which allows streaming) or None once retries are exhausted (already logged).
+        headers: per-request headers on top of the session's (e.g. the backend's Authorization).
+        """
+        return await self._send(session, url, payload, label, estimated_tokens, headers, read_json=False)
+
+    async def post_json(self, session, url: str, payload: dict, label: str, estimated_tokens: int = 0, headers=None):
+        """Like open(), but returns the decoded JSON body (or None); a body that stalls or breaks off is retried."""
+        return await self._send(session, url, payload, label, estimated_tokens, headers, read_json=True)
+
+    async def _send(self, session, url, payload, label, estimated_tokens, headers, read_json):
+        self.requests += 1
+        for attempt in range(self.max_retries + 1):
+            await self._pace(estimated_tokens)
+            retry_after = None
+            try:
+                resp = await session.post(url, json=payload, headers=headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                self._observe(resp.headers)
+                if resp.status == 200:
+                    if not read_json:
+                        return resp
+                    try:
+                        async with resp:
+                            return await resp.json()
+                    except (aiohttp.ContentTypeError, ValueError) as e:
+                        self.failures += 1
+                        logger.error(f"{label} failure: unreadable body: {e}")
+                        return None
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        # Stalled past the session timeout or cut off: as transient as a 5xx
+                        error = f"body read failed: {type(e).__name__}: {e}"
+                else:
+                    body = await resp.text()
+                    resp.release()
+                    if resp.status not in RETRYABLE_STATUSES:
+                        self.failures += 1
+                        logger.error(f"{label} failure: {resp.status}: {log_body(body)}")
+                        return None
+                    error = f"{resp.status}: {log_body(body)}"
+                    retry_after = parse_retry_after(resp.headers)
+            if attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt, retry_after)
+            self.retries += 1
+            self.backoff_seconds += delay
+            logger.info(f"{label} attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        self.failures += 1
+        logger.error(f"{label} failure after {self.max_retries + 1} attempts: {error}")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "backoff_seconds": self.backoff_seconds,
+            "throttle_seconds": self.throttle_seconds,
+            "remaining_requests": self.request_bucket.level,
+            "remaining_tokens": self.token_bucket.level,
+        }
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from bot.logger import setup_logger
+
+logger = setup_logger("ResponseCache")
+
+_WS_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s!?.,;:~]+$")
+
+
+def normalize_prompt(text: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation so 'Hey Gideon!' == 'hey gideon'."""
+    return _TRAILING_PUNCT_RE.sub("", _WS_RE.sub(" ", text.strip().lower()))
+
+
+def make_cache_key(payload: dict) -> str:
+    """
+    Key a chat completion on model, system-prompt version (hash of the system messages),
+    the normalized conversation and the sampling parameters that change the answer.
+    """
+    system = "\n".join(m["content"] for m in payload["messages"] if m["role"] == "system")
+    prompt_version = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+    conversation = [
+        (m["role"], normalize_prompt(m["content"])) for m in payload["messages"] if m["role"] != "system"
+    ]
+    material = json.dumps([
+        payload.get("model"), prompt_version, conversation,
+        payload.get("max_tokens"), payload.get("temperature"),
+    ], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < self.clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk cache that survives restarts. Uses wall-clock expiry since entries outlive the process."""
+
+    def __init__(self, path: str, ttl: float = 3600.0, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < self.clock():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), self.clock() + self.ttl),
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class ResponseCache:
+    """
+    Cache for deterministic chat completions: an in-process LRU in front of an optional
+    SQLite store. Identical requests already in flight share a single upstream call.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, path: str = None):
+        self.memory = MemoryCache(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteCache(path, ttl=ttl) if path else None
+        # sqlite calls run in a worker thread so they never block the event loop; one at a time
+        self._disk_lock = asyncio.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+
+    async def _lookup_disk(self, key):
+        if self.disk is None:
+            return None
+        async with self._disk_lock:
+            value = await asyncio.to_thread(self.disk.get, key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def _store(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            async with self._disk_lock:
+                await asyncio.to_thread(self.disk.set, key, value)
+
+    async def get_or_fetch(self, payload: dict, fetch):
+        """
+        Return the cached response for payload, or await fetch() once for all concurrent callers.
+        Failed fetches (None) are not cached.
+        """
+        key = make_cache_key(payload)
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.merged += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The caller we merged onto was cancelled, not us: make the request ourselves
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_fetch(payload, fetch)
+                raise
+        # Register before the first await so concurrent callers merge onto this request
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._lookup_disk(key)
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                value = await fetch()
+                if value is not None:
+                    await self._store(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged": self.merged,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
@@ -0,0 +1,202 @@
+import json
+import re
+from bot.logger import setup_logger, body
+
+logger = setup_logger("ResponseParser")
+
+ACTION_KINDS = ("SCHEDULE_EVENT", "UPDATE_EVENT", "CANCEL_EVENT")
+ACTION_OPEN_TAGS = tuple(f"[{kind}]" for kind in ACTION_KINDS)
+
+# One alternation over every block kind: a single left-to-right scan finds all of them
+_BLOCK_RE = re.compile(r"\[(" + "|".join(ACTION_KINDS) + r")\](.*?)\[/\1\]", re.DOTALL)
+
+# fields: expected type per known field (None is accepted for any of them; unknown fields are kept)
+# required: fields that must be present and non-empty; one_of: at least one of these must be
+ACTION_SCHEMAS = {
+    "SCHEDULE_EVENT": {
+        "fields": {
+            "title": str, "description": str, "participants": list,
+            "datetime": str, "start_time": str, "timezone": str,
+        },
+        "required": (),
+        "one_of": ("datetime", "start_time"),
+    },
+    "UPDATE_EVENT": {
+        "fields": {"title": str, "datetime": str, "fields_to_update": dict},
+        "required": ("fields_to_update",),
+        "one_of": (),
+    },
+    "CANCEL_EVENT": {
+        "fields": {"title": str, "datetime": str},
+        "required": (),
+        "one_of": (),
+    },
+}
+
+
+# The same three actions declared as OpenAI tools, for tool-calling mode (see OpenAIClient.tool_calling)
+_DATETIME_SCHEMA = {
+    "type": "string",
+    "description": "ISO 8601 start, e.g. 2025-06-25T20:00:00. Never natural language.",
+}
+EVENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "schedule_event",
+            "description": "Create a Discord scheduled event (meeting, event or reminder).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "participants": {"type": "array", "items": {"type": "string"}},
+                    "datetime": _DATETIME_SCHEMA,
+                    "timezone": {"type": "string", "description": "IANA name, default Europe/Brussels"},
+                },
+                "required": ["title", "datetime"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_event",
+            "description": "Change an existing Discord scheduled event, identified by its title and/or start.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "datetime": _DATETIME_SCHEMA,
+                    "fields_to_update": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "description": {"type": "string"},
+                            "location": {"type": "string"},
+                        },
+                        "additionalProperties": False,
+                    },
+                },
+                "required": ["fields_to_update"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "cancel_event",
+            "description": "Cancel an existing Discord scheduled event, identified by its title and/or start.",
+            "parameters": {
+                "type": "object",
+                "properties": {"title": {"type": "string"}, "datetime": _DATETIME_SCHEMA},
+            },
+        },
+    },
+]
+TOOL_ACTIONS = {"schedule_event": "SCHEDULE_EVENT", "update_event": "UPDATE_EVENT", "cancel_event": "CANCEL_EVENT"}
+
+
+class Action:
+    """One action block from an LLM reply. data is the validated JSON object; error is set instead when invalid."""
+    __slots__ = ("kind", "data", "raw", "error")
+
+    def __init__(self, kind, data, raw, error=None):
+        self.kind = kind
+        self.data = data
+        self.raw = raw
+        self.error = error
+
+    def __repr__(self):
+        return f"Action({self.kind}, {self.error or self.data})"
+
+
+class ParsedResponse:
+    """
+    Result of parse_response: text is the reply with every action block removed, actions the
+    valid blocks in the order they appeared, invalid those whose JSON or schema check failed.
+    """
+    __slots__ = ("text", "actions", "invalid")
+
+    def __init__(self, text, actions, invalid):
+        self.text = text
+        self.actions = actions
+        self.invalid = invalid
+
+    @property
+    def has_actions(self) -> bool:
+        return bool(self.actions or self.invalid)
+
+    def __bool__(self):
+        return bool(self.text) or self.has_actions
+
+
+def validate_action(kind: str, data) -> str:
+    """Check data against the schema for kind. Returns an error message, or None when valid."""
+    if not isinstance(data, dict):
+        return f"expected a JSON object, got {type(data).__name__}"
+    schema = ACTION_SCHEMAS[kind]
+    for field, expected in schema["fields"].items():
+        value = data.get(field)
+        if value is not None and not isinstance(value, expected):
+            return f"field '{field}' must be {expected.__name__}, got {type(value).__name__}"
+    for field in schema["required"]:
+        if not data.get(field):
+            return f"missing required field '{field}'"
+    if schema["one_of"] and not any(data.get(field) for field in schema["one_of"]):
+        return f"one of {', '.join(schema['one_of'])} is required"
+    return None
+
+
+def _check(kind, data, raw, actions, invalid, error=None):
+    error = error or validate_action(kind, data)
+    if error:
+        logger.error(f"Rejected {kind} block: {error}\nBlock:{body(raw)}")
+        invalid.append(Action(kind, data, raw, error))
+    else:
+        actions.append(Action(kind, data, raw))
+
+
+def parse_tool_calls(message: dict) -> ParsedResponse:
+    """Turn the tool_calls of a chat completion message into actions; its content (if any) is the text."""
+    actions = []
+    invalid = []
+    for call in message.get("tool_calls") or ():
+        function = call.get("function") or {}
+        raw = function.get("arguments") or "{}"
+        kind = TOOL_ACTIONS.get(function.get("name"))
+        if kind is None:
+            logger.error(f"Ignoring call to unknown tool {function.get('name')!r}")
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            _check(kind, None, raw, actions, invalid, error=f"invalid JSON: {e}")
+            continue
+        _check(kind, data, raw, actions, invalid)
+    return ParsedResponse((message.get("content") or "").strip(), actions, invalid)
+
+
+def parse_response(text: str) -> ParsedResponse:
+    """Find every action block in one pass, decode and validate each, and return what is left as text."""
+    if not text or "[" not in text:
+        return ParsedResponse(text or "", [], [])
+    actions = []
+    invalid = []
+    pieces = []
+    last = 0
+    for match in _BLOCK_RE.finditer(text):
+        pieces.append(text[last:match.start()])
+        last = match.end()
+        kind = match.group(1)
+        raw = match.group(2).strip()
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            _check(kind, None, raw, actions, invalid, error=f"invalid JSON: {e}")
+            continue
+        _check(kind, data, raw, actions, invalid)
+    if last == 0:
+        return ParsedResponse(text, [], [])
+    pieces.append(text[last:])
+    return ParsedResponse("".join(pieces).strip(), actions, invalid)
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections import deque
+from bot.logger import setup_logger
+from bot.metrics import NULL_METRICS
+
+logger = setup_logger("Scheduler")
+
+
+class Job:
+    __slots__ = ("key", "message", "content", "message_ids", "enqueued_at", "started")
+
+    def __init__(self, key, message, content):
+        self.key = key
+        self.message = message
+        self.content = content
+        self.message_ids = [message.id]
+        self.enqueued_at = time.monotonic()
+        self.started = False
+
+
+class _Node:
+    """One level of the fair-queuing tree: children served round-robin, `weight` picks per turn."""
+    __slots__ = ("children", "order", "weight", "credits", "jobs")
+
+    def __init__(self, weight=1):
+        self.children = {}
+        self.order = deque()
+        self.weight = weight
+        self.credits = weight
+        self.jobs = 0
+
+
+class MessageScheduler:
+    """
+    Sits between Discord events and the LLM calls.
+      - at most max_concurrency handlers run at once (global cap on upstream calls)
+      - pending work is served by weighted round-robin across guilds, then channels, then users,
+        so one busy channel or chatty user cannot starve the others
+      - at most max_pending jobs wait; past that new messages are shed (caller sends a "busy" reply)
+      - a message from a user who already has a job waiting in the same channel is merged into it;
+        coalesce_window holds each new job back briefly, before it is queued (so without taking
+        a concurrency slot), so rapid follow-ups can join it
+    handler(message, content, message_ids) is awaited for every dispatched job; a handler that
+    raises is logged with its traceback and counted as failed.
+    """
+
+    def __init__(self, handler, max_concurrency: int = 4, max_pending: int = 50,
+                 coalesce_window: float = 0.0, guild_weights=None, metrics=None):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        self.guild_weights = guild_weights or {}
+        self.metrics = metrics or NULL_METRICS
+        self._root = _Node()
+        self._waiting = {}
+        self._wakeup = asyncio.Event()
+        self._workers = []
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.merged = 0
+        self.shed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_concurrency)]
+
+    async def stop(self):
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @staticmethod
+    def job_key(message):
+        guild_id = message.guild.id if message.guild is not None else 0
+        return guild_id, message.channel.id, message.author.id
+
+    def submit(self, message, content: str) -> str:
+        """Queue a message. Returns "queued", "merged" or "shed"."""
+        key = self.job_key(message)
+        job = self._waiting.get(key)
+        if job is not None and not job.started:
+            job.content = f"{job.content}\n{content}"
+            job.message = message
+            job.message_ids.append(message.id)
+            self.merged += 1
+            return "merged"
+        if self.pending >= self.max_pending:
+            self.shed += 1
+            logger.info(f"Shedding message {message.id}: {self.pending} jobs pending")
+            return "shed"
+        job = Job(key, message, content)
+        self._waiting[key] = job
+        # Held jobs count as pending (for shedding and stats) but are not in the tree yet
+        self.pending += 1
+        if self.coalesce_window > 0:
+            asyncio.get_running_loop().call_later(self.coalesce_window, self._enqueue, job)
+        else:
+            self._enqueue(job)
+        return "queued"
+
+    def _enqueue(self, job):
+        node = self._root
+        node.jobs += 1
+        for depth, part in enumerate(job.key):
+            child = node.children.get(part)
+            if child is None:
+                weight = self.guild_weights.get(part, 1) if depth == 0 else 1
+                child = _Node(weight)
+                node.children[part] = child
+                node.order.append(part)
+            child.jobs += 1
+            node = child
+        node.order.append(job)
+        self._wakeup.set()
+
+    def _dequeue(self):
+        """Walk guild -> channel -> user, taking the head of each round-robin ring."""
+        if self._root.jobs == 0:
+            return None
+        path = []
+        node = self._root
+        for _ in range(3):
+            part = node.order[0]
+            child = node.children[part]
+            path.append((node, part, child))
+            node = child
+        job = node.order.popleft()
+        self.pending -= 1
+        self._root.jobs -= 1
+        for parent, part, child in path:
+            child.jobs -= 1
+            child.credits -= 1
+            if child.jobs == 0:
+                parent.order.popleft()
+                del parent.children[part]
+            elif child.credits <= 0:
+                child.credits = child.weight
+                parent.order.rotate(-1)
+        return job
+
+    async def _worker(self, index):
+        while True:
+            job = self._dequeue()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            job.started = True
+            self.metrics.observe("gideon_queue_wait_seconds", time.monotonic() - job.enqueued_at)
+            if self._waiting.get(job.key) is job:
+                del self._waiting[job.key]
+            self.running += 1
+            try:
+                await self.handler(job.message, job.content, job.message_ids)
+                self.completed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Message handler failed for {job.key}")
+            finally:
+                self.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "completed": self.completed,
+            "merged": self.merged,
+            "shed": self.shed,
+            "failed": self.failed,
+        }
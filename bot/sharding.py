@@ -0,0 +1,53 @@
+from bot.logger import setup_logger
+
+logger = setup_logger("Sharding")
+
+
+def shard_for(guild_id, shard_count) -> int:
+    """Gateway shard that receives a guild's events (Discord's (guild_id >> 22) % shard_count)."""
+    if guild_id is None or not shard_count:
+        return 0
+    return (guild_id >> 22) % shard_count
+
+
+def split_shards(shard_count: int, processes: int) -> list:
+    """Spread shard ids 0..shard_count-1 over at most `processes` contiguous, near-equal slices."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    slices, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        slices.append(list(range(start, start + size)))
+        start += size
+    return slices
+
+
+class ShardLocal:
+    """
+    One instance of a cache per gateway shard, built by factory() on first use.
+    A guild's events only ever arrive on one shard, so the instances never overlap: each keeps
+    its own size budget, and a shard that had to start a fresh session (and so missed events)
+    drops only its own state with reset(). Unsharded bots only ever use shard 0.
+    """
+
+    def __init__(self, factory, name: str = "cache"):
+        self.factory = factory
+        self.name = name
+        self._shards = {}
+
+    def __getitem__(self, shard_id):
+        cache = self._shards.get(shard_id)
+        if cache is None:
+            cache = self._shards[shard_id] = self.factory()
+        return cache
+
+    def __len__(self):
+        return len(self._shards)
+
+    def reset(self, shard_id):
+        if self._shards.pop(shard_id, None) is not None:
+            logger.info(f"Dropped shard {shard_id} {self.name} cache")
+
+    def stats(self) -> dict:
+        """{shard id: that shard's stats()}, for a shard-labelled metrics collector."""
+        return {shard_id: cache.stats() for shard_id, cache in self._shards.items()}
@@ -0,0 +1,143 @@
+import time
+from bot.logger import setup_logger
+from bot.response_parser import ACTION_OPEN_TAGS
+
+logger = setup_logger("Streaming")
+
+DISCORD_MESSAGE_LIMIT = 2000
+EVENT_OPEN_TAGS = ACTION_OPEN_TAGS
+FENCE = "```"
+
+
+def _fence_state(text: str, lang=None):
+    """Return the language of the code fence left open at the end of text, or None if all fences are closed."""
+    open_lang = lang
+    pos = 0
+    while True:
+        i = text.find(FENCE, pos)
+        if i < 0:
+            return open_lang
+        if open_lang is None:
+            end = text.find("\n", i + 3)
+            open_lang = text[i + 3:end if end >= 0 else len(text)].strip()
+        else:
+            open_lang = None
+        pos = i + 3
+
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> list:
+    """
+    Split text into Discord-sized chunks, preferring newline then space boundaries.
+    A code fence that straddles a boundary is closed at the end of one chunk and reopened
+    (with the same language) at the start of the next, so every chunk renders on its own.
+    """
+    chunks = []
+    open_lang = None
+    rest = text
+    while rest:
+        prefix = f"{FENCE}{open_lang}\n" if open_lang is not None else ""
+        room = limit - len(prefix) - len(FENCE) - 1  # keep space for a closing fence
+        if len(rest) <= room:
+            body = rest
+            rest = ""
+        else:
+            cut = rest.rfind("\n", 0, room)
+            if cut <= 0:
+                cut = rest.rfind(" ", 0, room)
+            if cut <= 0:
+                cut = room
+            body = rest[:cut]
+            rest = rest[cut:].lstrip("\n")
+        chunk = prefix + body
+        open_lang = _fence_state(body, open_lang)
+        if open_lang is not None:
+            chunk = chunk.rstrip("\n") + "\n" + FENCE
+        chunks.append(chunk)
+    return chunks
+
+
+async def send_chunks(channel, text: str):
+    """Send a possibly long reply as one or more messages under Discord's length limit."""
+    sent = []
+    for chunk in split_message(text):
+        sent.append(await channel.send(chunk))
+    return sent
+
+
+def _displayable(text: str):
+    """
+    Return (visible_text, is_event). Everything from the first event tag on is never shown,
+    and a trailing partial tag ("[SCHED") is held back until it can be told apart from plain text.
+    """
+    cut = len(text)
+    for tag in EVENT_OPEN_TAGS:
+        i = text.find(tag)
+        if 0 <= i < cut:
+            cut = i
+    if cut < len(text):
+        return text[:cut].rstrip(), True
+    bracket = text.rfind("[")
+    if bracket >= 0 and any(tag.startswith(text[bracket:]) for tag in EVENT_OPEN_TAGS):
+        return text[:bracket].rstrip(), False
+    return text, False
+
+
+class StreamingReply:
+    """
+    Shows a streamed completion progressively: the first message is posted as soon as there is
+    visible text, then edited in coalesced batches no more often than edit_interval (stretched when
+    Discord is slow to acknowledge edits, which is where its rate limiting shows up). Output that
+    turns into an event block is never displayed; the caller parses the returned full text instead.
+    """
+
+    def __init__(self, channel, edit_interval: float = 1.0, limit: int = DISCORD_MESSAGE_LIMIT):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.limit = limit
+        self.messages = []
+        self._shown = []
+        self._last_flush = 0.0
+        self._interval = edit_interval
+        self.is_event = False
+        self.edits = 0
+
+    @property
+    def displayed(self) -> bool:
+        return bool(self.messages)
+
+    async def _flush(self, visible: str):
+        started = time.monotonic()
+        for i, chunk in enumerate(split_message(visible, self.limit)):
+            if i < len(self.messages):
+                if self._shown[i] != chunk:
+                    await self.messages[i].edit(content=chunk)
+                    self._shown[i] = chunk
+                    self.edits += 1
+            else:
+                self.messages.append(await self.channel.send(chunk))
+                self._shown.append(chunk)
+        finished = time.monotonic()
+        # Back off when Discord holds our edits back (discord.py sleeps through 429s for us)
+        self._interval = max(self.edit_interval, 2 * (finished - started))
+        self._last_flush = finished
+
+    async def stream(self, deltas) -> str:
+        """Consume an async iterator of text deltas; returns the full response text."""
+        text = ""
+        visible = ""
+        async for delta in deltas:
+            text += delta
+            if self.is_event:
+                continue
+            visible, self.is_event = _displayable(text)
+            if not visible.strip() or self.is_event and not self.messages:
+                continue
+            if not self.messages or time.monotonic() - self._last_flush >= self._interval:
+                await self._flush(visible)
+        if not self.is_event:
+            visible, self.is_event = _displayable(text)
+            if not self.is_event:
+                visible = text
+        if visible.strip() and (self.messages or not self.is_event):
+            await self._flush(visible)
+        return text.strip()
@@ -0,0 +1,305 @@
+"""
+Token usage per guild, channel, user and persona, with daily per-guild budgets.
+
+Report from the usage database:
+
+    python -m bot.usage --days 7 --by guild_id,persona
+    python -m bot.usage --by persona --guild 81384788765712384
+"""
+import argparse
+import asyncio
+import math
+import sqlite3
+import time
+from contextvars import ContextVar
+from bot.logger import setup_logger
+
+logger = setup_logger("Usage")
+
+# Who the LLM calls of the current reply are billed to; unset for background work
+current_usage = ContextVar("current_usage", default=None)
+
+# USD per million (prompt, completion) tokens, matched on the longest model-name prefix.
+# Only used for the cost estimates in stats and reports; budgets are in tokens.
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+REPORT_COLUMNS = ("guild_id", "channel_id", "user_id", "persona", "model", "day")
+
+
+class BudgetPlan:
+    """How replies are trimmed as a guild uses up its budget."""
+    __slots__ = ("tier", "context_scale", "max_tokens", "economy")
+
+    def __init__(self, tier, context_scale, max_tokens, economy):
+        self.tier = tier
+        self.context_scale = context_scale
+        self.max_tokens = max_tokens
+        self.economy = economy
+
+
+NORMAL = BudgetPlan("normal", 1.0, None, False)
+# (share of the daily budget used below which the plan applies, plan)
+PLANS = (
+    (0.5, NORMAL),
+    # Past half the budget: shorter context and replies
+    (0.8, BudgetPlan("reduced", 0.6, 192, False)),
+    # Nearly (or fully) spent: shortest context and replies, chat calls on the economy backends
+    (math.inf, BudgetPlan("economy", 0.35, 128, True)),
+)
+
+
+class UsageScope:
+    __slots__ = ("guild_id", "channel_id", "user_id", "plan")
+
+    def __init__(self, guild_id, channel_id, user_id, plan=NORMAL):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.plan = plan
+
+
+def price_for(model: str):
+    """(prompt, completion) USD per million tokens, or None for unknown models."""
+    best = None
+    for prefix, price in MODEL_PRICES.items():
+        if model and model.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, price)
+    return best[1] if best else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price = price_for(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+class UsageLedger:
+    """
+    Accounting for every response's usage field. record() adds to in-memory counters keyed by
+    (day, guild, channel, user, persona, model); a background task adds them to SQLite every
+    flush_interval seconds, so a reply never waits on disk. Per guild it also keeps today's token
+    total (UTC days, reloaded on start) and turns it into a BudgetPlan against the guild's daily
+    budget: `daily_tokens` for every guild, or its entry in `guild_budgets` (0 = unlimited).
+    """
+
+    def __init__(self, path: str = "gideon_usage.sqlite3", flush_interval: float = 30.0, daily_tokens: int = 0,
+                 guild_budgets=None, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.daily_tokens = daily_tokens
+        self.guild_budgets = guild_budgets or {}
+        self.clock = clock
+        self._conn = None
+        # sqlite calls run in a worker thread so they never block the event loop; one at a time
+        self._db_lock = asyncio.Lock()
+        self._pending = {}
+        self._today = _day(clock())
+        self._spent = {}
+        self._task = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.flushes = 0
+        self.plans = {plan.tier: 0 for _, plan in PLANS}
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage (day TEXT NOT NULL, guild_id INTEGER NOT NULL, "
+            "channel_id INTEGER NOT NULL, user_id INTEGER NOT NULL, persona TEXT NOT NULL, model TEXT NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, calls INTEGER NOT NULL, "
+            "PRIMARY KEY (day, guild_id, channel_id, user_id, persona, model))"
+        )
+        conn.commit()
+        return conn
+
+    def _load_spent(self, day):
+        rows = self._conn.execute(
+            "SELECT guild_id, SUM(prompt_tokens + completion_tokens) FROM usage WHERE day = ? GROUP BY guild_id", (day,)
+        ).fetchall()
+        return dict(rows)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._conn = await asyncio.to_thread(self._open)
+        # Budgets are per day: what was spent before a restart still counts
+        for guild_id, tokens in (await asyncio.to_thread(self._load_spent, self._today)).items():
+            self._spent[guild_id] = self._spent.get(guild_id, 0) + tokens
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._conn is not None:
+            await self.flush()
+            async with self._db_lock:
+                await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    def _roll(self, now):
+        day = _day(now)
+        if day != self._today:
+            self._today = day
+            self._spent = {}
+        return day
+
+    def scope(self, guild_id, channel_id, user_id) -> UsageScope:
+        """The scope to bill a reply to, with the plan for the guild's budget as of now."""
+        plan = self.plan(guild_id)
+        self.plans[plan.tier] += 1
+        return UsageScope(guild_id, channel_id, user_id, plan)
+
+    def budget_for(self, guild_id) -> int:
+        return self.guild_budgets.get(guild_id, self.daily_tokens)
+
+    def plan(self, guild_id) -> BudgetPlan:
+        budget = self.budget_for(guild_id)
+        if not budget:
+            return NORMAL
+        self._roll(self.clock())
+        used = self._spent.get(guild_id, 0) / budget
+        for limit, plan in PLANS:
+            if used < limit:
+                return plan
+        return PLANS[-1][1]
+
+    def record(self, persona: str, model, usage):
+        """Add a response's usage, billed to the current scope (guild/channel/user 0 for background work)."""
+        if not usage:
+            return
+        prompt = usage.get("prompt_tokens") or 0
+        completion = usage.get("completion_tokens") or 0
+        scope = current_usage.get()
+        guild_id, channel_id, user_id = (scope.guild_id, scope.channel_id, scope.user_id) if scope else (0, 0, 0)
+        model = model or ""
+        key = (self._roll(self.clock()), guild_id, channel_id, user_id, persona, model)
+        totals = self._pending.get(key)
+        if totals is None:
+            totals = self._pending[key] = [0, 0, 0]
+        totals[0] += prompt
+        totals[1] += completion
+        totals[2] += 1
+        self._spent[guild_id] = self._spent.get(guild_id, 0) + prompt + completion
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cost += estimate_cost(model, prompt, completion)
+
+    def _write(self, rows):
+        self._conn.executemany(
+            "INSERT INTO usage (day, guild_id, channel_id, user_id, persona, model, prompt_tokens, completion_tokens, calls) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (day, guild_id, channel_id, user_id, persona, model) DO UPDATE SET "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens, calls = calls + excluded.calls",
+            rows,
+        )
+        self._conn.commit()
+
+    async def flush(self):
+        if not self._pending or self._conn is None:
+            return
+        pending, self._pending = self._pending, {}
+        rows = [key + tuple(totals) for key, totals in pending.items()]
+        async with self._db_lock:
+            await asyncio.to_thread(self._write, rows)
+        self.flushes += 1
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Flushing token usage failed: {e}")
+
+    def stats(self) -> dict:
+        stats = {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost,
+            "pending_rows": len(self._pending),
+            "flushes": self.flushes,
+            "guilds_today": len(self._spent),
+        }
+        for tier, count in self.plans.items():
+            stats[f"{tier}_replies"] = count
+        return stats
+
+
+def report(path: str, by=("guild_id",), days: int = 7, guild_id=None, limit: int = 20, now=None) -> list:
+    """Usage of the last `days` days grouped by the `by` columns, biggest first, with estimated cost."""
+    columns = [c for c in by if c in REPORT_COLUMNS] or ["guild_id"]
+    since = _day((now if now is not None else time.time()) - (days - 1) * 86400)
+    where = "day >= ?"
+    params = [since]
+    if guild_id is not None:
+        where += " AND guild_id = ?"
+        params.append(guild_id)
+    group = ", ".join(columns)
+    # Read-only: a report never creates or locks the bot's database
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        # Cost depends on the model, so sum per model first
+        rows = conn.execute(
+            f"SELECT {group}, model, SUM(prompt_tokens), SUM(completion_tokens), SUM(calls) FROM usage "
+            f"WHERE {where} GROUP BY {group}, model",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+    totals = {}
+    for row in rows:
+        key = row[:len(columns)]
+        model, prompt, completion, calls = row[len(columns):]
+        item = totals.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+        item["calls"] += calls
+        item["prompt_tokens"] += prompt
+        item["completion_tokens"] += completion
+        item["cost_usd"] += estimate_cost(model, prompt, completion)
+    ordered = sorted(totals.items(), key=lambda kv: -(kv[1]["prompt_tokens"] + kv[1]["completion_tokens"]))
+    return [dict(zip(columns, key), **item) for key, item in ordered[:limit]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="gideon_usage.sqlite3", help="USAGE_PATH of the bot")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--by", default="guild_id", help=f"comma-separated columns from {', '.join(REPORT_COLUMNS)}")
+    parser.add_argument("--guild", type=int, default=None, help="only this guild")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+    by = [c.strip() for c in args.by.split(",") if c.strip()]
+    try:
+        rows = report(args.path, by=by, days=args.days, guild_id=args.guild, limit=args.limit)
+    except sqlite3.Error as e:
+        parser.exit(1, f"Cannot read usage from {args.path}: {e}\n")
+    columns = [c for c in by if c in REPORT_COLUMNS] or ["guild_id"]
+    header = "".join(f"{c:<22}" for c in columns) + f"{'calls':>8}{'prompt':>12}{'completion':>12}{'total':>12}{'est. $':>10}"
+    print(header)
+    for row in rows:
+        total = row["prompt_tokens"] + row["completion_tokens"]
+        print("".join(f"{str(row[c]):<22}" for c in columns)
+              + f"{row['calls']:>8}{row['prompt_tokens']:>12}{row['completion_tokens']:>12}{total:>12}{row['cost_usd']:>10.4f}")
+    if not rows:
+        print(f"(no usage in the last {args.days} days)")
+
+
+if __name__ == "__main__":
+    main()
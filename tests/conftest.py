@@ -0,0 +1,121 @@
+import contextlib
+import inspect
+from types import SimpleNamespace
+
+import discord
+import pytest
+from aiohttp import web
+
+from bot.main import GideonBot
+from bot.openai_client import OpenAIClient
+
+
+# Label of the LLM router call, to tell it apart from persona calls in respond()
+ROUTER_LABEL = "Router LLM persona select"
+
+
+def completion(content=None, usage=None, **message) -> dict:
+    """A chat completions response body with one choice; extra keyword arguments go into its message."""
+    data = {"choices": [{"message": dict(message, content=content)}]}
+    if usage is not None:
+        data["usage"] = usage
+    return data
+
+
+class FakeCompletionClient(OpenAIClient):
+    """
+    OpenAIClient whose chat calls never leave the process: respond(payload, label) returns each
+    response body (it may also be a coroutine function, or raise). Every payload and label sent
+    is kept in `sent` and `labels`.
+    """
+
+    def __init__(self, respond, api_key: str = "x", **kwargs):
+        super().__init__(api_key=api_key, **kwargs)
+        self.respond = respond
+        self.sent = []
+        self.labels = []
+
+    async def _send_chat(self, payload, label, role="chat"):
+        self.sent.append(payload)
+        self.labels.append(label)
+        with self.metrics.stage("openai", call=label):
+            data = self.respond(payload, label)
+            if inspect.isawaitable(data):
+                data = await data
+            return data
+
+
+class LocalServer:
+    """An aiohttp app on a free 127.0.0.1 port, for code that has to talk real HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+        self.port = None
+        self._runner = None
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    def url(self, path: str = "/") -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+class FakeChannel:
+    """A text channel that records what the bot sends; each send returns a message with a new id."""
+
+    def __init__(self, id: int = 5, name: str = "dev"):
+        self.id = id
+        self.name = name
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(text)
+        return SimpleNamespace(id=500 + len(self.sent))
+
+    def typing(self):
+        return contextlib.nullcontext()
+
+
+@pytest.fixture
+def fake_client():
+    """FakeCompletionClient factory: fake_client(body or respond(payload, label), **OpenAIClient options)."""
+    def make(response, **kwargs):
+        respond = response if callable(response) else (lambda payload, label: response)
+        return FakeCompletionClient(respond, **kwargs)
+    return make
+
+
+@pytest.fixture
+def local_server():
+    """LocalServer factory from aiohttp route definitions: local_server(web.post("/", handler))."""
+    def make(*routes):
+        app = web.Application()
+        app.add_routes(routes)
+        return LocalServer(app)
+    return make
+
+
+@pytest.fixture
+def gideon_bot():
+    """GideonBot factory around an OpenAI client: returns (bot, channel), the channel's history already cached."""
+    def make(client):
+        bot = GideonBot(channel_id=1, openai_client=client, intents=discord.Intents.none())
+        bot.bot_names = ["gideon"]
+        channel = FakeChannel()
+        bot.history_cache[0]._touch(channel.id, [])
+        return bot, channel
+    return make
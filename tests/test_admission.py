@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from bot.admission import MessageAdmission
+
+BOT_ID = 42
+MAIN = 1
+OTHER = 2
+
+
+def _message(content, channel=MAIN, bot=False, reply_to=None):
+    reference = None
+    if reply_to is not None:
+        reference = SimpleNamespace(resolved=SimpleNamespace(author=SimpleNamespace(id=reply_to)))
+    return SimpleNamespace(
+        content=content, author=SimpleNamespace(bot=bot), channel=SimpleNamespace(id=channel), reference=reference
+    )
+
+
+def test_main_channel_and_rejections():
+    admission = MessageAdmission(BOT_ID, channel_ids=[MAIN])
+    assert admission.admit(_message("hello")) == "accept"
+    assert admission.admit(_message("hello", bot=True)) == "ignored_bot"
+    assert admission.admit(_message("   ")) == "ignored_empty"
+    assert admission.admit(_message("hello", channel=OTHER)) == "ignored_channel"
+    assert admission.admit(_message("please open a PR for this")) == "pr_request"
+    assert admission.stats() == {
+        "accept": 1, "pr_request": 1, "ignored_bot": 1, "ignored_empty": 1, "ignored_channel": 1,
+    }
+
+
+def test_addressed_outside_main_channel():
+    admission = MessageAdmission(BOT_ID, channel_ids=[MAIN])
+    assert admission.admit(_message(f"<@{BOT_ID}> hi", channel=OTHER)) == "accept"
+    assert admission.admit(_message(f"hey <@!{BOT_ID}>", channel=OTHER)) == "accept"
+    assert admission.admit(_message("<@4242> hi", channel=OTHER)) == "ignored_channel"
+    assert admission.admit(_message("thanks", channel=OTHER, reply_to=BOT_ID)) == "accept"
+    assert admission.admit(_message("thanks", channel=OTHER, reply_to=7)) == "ignored_channel"
+    # A reply to a deleted message has no resolved author
+    deleted = _message("thanks", channel=OTHER)
+    deleted.reference = SimpleNamespace(resolved=None)
+    assert admission.admit(deleted) == "ignored_channel"
+
+
+def test_wake_words():
+    admission = MessageAdmission(BOT_ID, channel_ids=[MAIN], wake_words=["Gideon", " "])
+    assert admission.admit(_message("gideon, what's up?", channel=OTHER)) == "accept"
+    assert admission.admit(_message("gideonish", channel=OTHER)) == "ignored_channel"
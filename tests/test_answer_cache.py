@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.answer_cache import SemanticAnswerCache
+from conftest import ROUTER_LABEL, completion
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _sent(*ids):
+    return [SimpleNamespace(id=i) for i in ids]
+
+
+def test_near_duplicates_hit_per_channel_and_time_questions_opt_out():
+    clock = Clock()
+    cache = SemanticAnswerCache(threshold=0.9, ttl=60, clock=clock, tokenizer=lambda text: len(text.split()))
+
+    async def scenario():
+        probe = await cache.lookup(1, "how do I run the tests")
+        assert probe.hit is None
+        cache.store(probe, 10, "DEVELOPER", "Run `pytest -q` from the repo root.", _sent(11), prompt_tokens=100)
+        hit = await cache.lookup(1, "How do I run the tests?")
+        other_channel = await cache.lookup(2, "how do I run the tests")
+        unrelated = await cache.lookup(1, "what is the staging url")
+        time_dependent = await cache.lookup(1, "what year is it now")
+        too_short = await cache.lookup(1, "and tests?")
+        return hit, other_channel, unrelated, time_dependent, too_short
+
+    hit, other_channel, unrelated, time_dependent, too_short = asyncio.run(scenario())
+    assert hit.hit.answer == "Run `pytest -q` from the repo root."
+    assert other_channel.hit is None and unrelated.hit is None
+    assert time_dependent is None and too_short is None
+    # Events and anything after a failed routing are never stored
+    cache.store(unrelated, 20, "EVENT", "[SCHEDULE_EVENT]...", _sent(21))
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["lookups"] == 4 and stats["skipped"] == 2
+    assert stats["hit_ratio"] == 0.25 and stats["entries"] == 1
+    assert stats["saved_tokens"] == 100 + 6 + 7
+
+
+def test_ttl_invalidation_and_bounds():
+    clock = Clock()
+    cache = SemanticAnswerCache(ttl=60, max_per_channel=2, clock=clock)
+
+    async def ask(question):
+        return await cache.lookup(1, question)
+
+    async def scenario():
+        cache.store(await ask("how do I run the tests"), 10, "DEVELOPER", "pytest", _sent(11, 12))
+        cache.store(await ask("where is the staging dashboard"), 20, "ASSISTANT", "grafana", _sent(21))
+        # Deleting any chunk of the answer drops it
+        assert cache.forget(12)
+        assert (await ask("how do I run the tests")).hit is None
+        assert not cache.forget(11) and not cache.forget(99)
+        clock.now += 61
+        assert (await ask("where is the staging dashboard")).hit is None
+        # A full channel overwrites its oldest answer
+        for i in range(3):
+            cache.store(await ask(f"question number {i} about releases"), 100 + i, "ASSISTANT", str(i), _sent(200 + i))
+        assert (await ask("question number 0 about releases")).hit is None
+        assert (await ask("question number 2 about releases")).hit.answer == "2"
+        assert not cache.forget(200)
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["invalidated"] == 1 and stats["expired"] == 1 and stats["entries"] == 2
+
+
+def test_bot_answers_repeated_questions_without_routing(fake_client, gideon_bot):
+    client = fake_client(lambda payload, label: completion(
+        "DEVELOPER" if label == ROUTER_LABEL else "Run `pytest -q` from the repo root."
+    ))
+    bot, channel = gideon_bot(client)
+    bot.answer_cache = SemanticAnswerCache()
+
+    def message(id, content):
+        return SimpleNamespace(id=id, content=content, guild=None, channel=channel)
+
+    async def scenario():
+        await bot._reply(message(1, "how do I run the tests"), "how do I run the tests", [1])
+        await bot._reply(message(2, "How do I run the tests?"), "How do I run the tests?", [2])
+        await bot.on_message_delete(SimpleNamespace(id=502, guild=None, channel=channel))
+        await bot._reply(message(3, "how do I run the tests"), "how do I run the tests", [3])
+
+    asyncio.run(scenario())
+    assert channel.sent == ["Run `pytest -q` from the repo root."] * 3
+    # The deleted cached copy invalidated the entry, so the third question went upstream again
+    assert client.labels.count(ROUTER_LABEL) == 2 and len(client.labels) == 4
+    assert bot.answer_cache.stats()["hits"] == 1
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+
+from bot.backends import Backend, BackendPool
+from bot.openai_client import OpenAIClient
+from bot.request_executor import RequestExecutor
+from conftest import LocalServer
+
+
+class StandIn(LocalServer):
+    """Local OpenAI-compatible server whose latency and status can be changed between calls."""
+
+    def __init__(self, name, delay=0.0, status=200):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        super().__init__(app)
+        self.name = name
+        self.delay = delay
+        self.status = status
+        self.models = []
+        self.auth = []
+
+    async def _handle(self, request):
+        payload = await request.json()
+        self.models.append(payload["model"])
+        self.auth.append(request.headers.get("Authorization"))
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status, text="down")
+        return web.json_response({"choices": [{"message": {"content": self.name}}]})
+
+
+def _backend(server, **kwargs):
+    return Backend(server.name, url=server.url("/v1/chat/completions"), model=f"{server.name}-model",
+                   executor=RequestExecutor(max_retries=0), **kwargs)
+
+
+async def _ask(pool, session):
+    data = await pool.post_json(session, {"messages": []}, "test")
+    return data["choices"][0]["message"]["content"] if data else None
+
+
+def test_fastest_backend_wins_and_router_uses_its_own_model():
+    async def scenario():
+        slow, fast, small = StandIn("slow", delay=0.05), StandIn("fast"), StandIn("small")
+        for server in (slow, fast, small):
+            await server.start()
+        try:
+            client = OpenAIClient(api_key="sk-test", backends=BackendPool([
+                _backend(slow, roles=["chat"]), _backend(fast, roles=["chat"]),
+                _backend(small, roles=["router"], api_key="local-key"),
+            ]))
+            # Both chat backends are measured once, then the faster one takes the traffic
+            answers = [await client.ask_chatgpt(f"question {i}") for i in range(6)]
+            persona = await client.ask_router_persona("fix my segfault")
+            await client.close()
+            return answers, persona, slow, fast, small, client.backends.stats()
+        finally:
+            for server in (slow, fast, small):
+                await server.stop()
+
+    answers, persona, slow, fast, small, stats = asyncio.run(scenario())
+    assert answers[2:] == ["fast"] * 4 and len(slow.models) == 1
+    assert persona == "SMALL" and small.models == ["small-model"] and small.auth == ["Bearer local-key"]
+    assert fast.auth[0] is None and fast.models[0] == "fast-model"
+    assert stats["fast/chat"]["latency_ewma_seconds"] < stats["slow/chat"]["latency_ewma_seconds"]
+    assert "small/chat" not in stats and stats["small/router"]["requests"] == 1
+
+
+def test_slow_call_is_hedged_after_p95():
+    async def scenario():
+        primary, secondary = StandIn("primary"), StandIn("secondary")
+        await primary.start()
+        await secondary.start()
+        pool = BackendPool([_backend(primary), _backend(secondary)], hedge_min=0.05, min_samples=5)
+        try:
+            async with aiohttp.ClientSession() as session:
+                # Learn the primary's usual latency (the secondary is measured once and is no faster)
+                secondary.delay = 0.02
+                for _ in range(8):
+                    await _ask(pool, session)
+                secondary.delay = 0.0
+                primary.delay = 2.0
+                started = time.perf_counter()
+                answer = await _ask(pool, session)
+                elapsed = time.perf_counter() - started
+        finally:
+            await primary.stop()
+            await secondary.stop()
+        return answer, elapsed, pool.stats()
+
+    answer, elapsed, stats = asyncio.run(scenario())
+    assert answer == "secondary" and elapsed < 1.0
+    assert stats["primary/chat"]["hedges"] == 1
+
+
+def test_failover_and_unhealthy_backend_is_skipped():
+    async def scenario():
+        broken, healthy = StandIn("broken", status=500), StandIn("healthy", delay=0.01)
+        await broken.start()
+        await healthy.start()
+        pool = BackendPool([_backend(broken), _backend(healthy)], alpha=0.6, cooldown=60)
+        try:
+            async with aiohttp.ClientSession() as session:
+                answers = [await _ask(pool, session) for _ in range(4)]
+        finally:
+            await broken.stop()
+            await healthy.stop()
+        return answers, broken, pool
+
+    answers, broken, pool = asyncio.run(scenario())
+    assert answers == ["healthy"] * 4
+    # Unmeasured, it was tried first once; after the failure it sits out the cooldown
+    assert len(broken.models) == 1 and pool.failovers == 1
+    stats = pool.stats()
+    assert not stats["broken/chat"]["healthy"] and stats["broken/chat"]["error_ewma"] == 0.6
+    assert stats["healthy/chat"]["healthy"]
+
+
+def test_single_backend_slower_than_p95_is_not_hedged():
+    async def scenario():
+        only = StandIn("only")
+        await only.start()
+        pool = BackendPool([_backend(only)], hedge_min=0.01, min_samples=3)
+        try:
+            async with aiohttp.ClientSession() as session:
+                for _ in range(5):
+                    await _ask(pool, session)
+                # Well past its p95, with nothing to hedge to: the call just waits for its answer
+                only.delay = 0.2
+                return await _ask(pool, session), pool.stats()
+        finally:
+            await only.stop()
+
+    answer, stats = asyncio.run(scenario())
+    assert answer == "only" and stats["only/chat"]["hedges"] == 0
+
+
+def test_backend_that_raises_fails_over_to_the_next():
+    async def stalled(session, url, payload, label, estimated_tokens=0, headers=None):
+        raise asyncio.TimeoutError()
+
+    async def answers(session, url, payload, label, estimated_tokens=0, headers=None):
+        return {"choices": [{"message": {"content": "second"}}]}
+
+    pool = BackendPool([
+        Backend("first", executor=SimpleNamespace(post_json=stalled)),
+        Backend("second", executor=SimpleNamespace(post_json=answers)),
+    ])
+
+    answer = asyncio.run(_ask(pool, None))
+    stats = pool.stats()
+    assert answer == "second" and pool.failovers == 1
+    assert stats["first/chat"]["failures"] == 1 and stats["second/chat"]["failures"] == 0
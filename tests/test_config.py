@@ -6,10 +6,22 @@ from bot.config import BotConfig
 def test_valid_config(monkeypatch):
     monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
     monkeypatch.setenv("DISCORD_CHANNEL_ID", "123456789000000001")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
     cfg = BotConfig()
     assert cfg.get_token() == "test-token"
     assert cfg.get_channel_id() == 123456789000000001
 
+def test_routing_mode(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert BotConfig().get_routing_mode() == "sequential"
+    monkeypatch.setenv("OPENAI_ROUTING_MODE", " Speculative ")
+    assert BotConfig().get_routing_mode() == "speculative"
+    monkeypatch.setenv("OPENAI_ROUTING_MODE", "parallel")
+    with pytest.raises(ValueError):
+        BotConfig()
+
 def test_missing_token(monkeypatch):
     monkeypatch.delenv("DISCORD_BOT_TOKEN", raising=False)
     monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
@@ -26,4 +38,145 @@ def test_non_numeric_channel(monkeypatch):
     monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
     monkeypatch.setenv("DISCORD_CHANNEL_ID", "notanumber")
     with pytest.raises(ValueError):
-        BotConfig()
\ No newline at end of file
+        BotConfig()
+
+def test_http_pool_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("HTTP_POOL_SIZE", "8")
+    monkeypatch.delenv("HTTP_POOL_PER_HOST", raising=False)
+    opts = BotConfig().get_http_pool_options()
+    assert opts["pool_size"] == 8
+    assert opts["pool_per_host"] == 20
+
+def test_non_numeric_pool_size(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("HTTP_POOL_SIZE", "lots")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+def test_logging_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("LOG_LEVELS", "DiscordBot=warning, OpenAI=DEBUG")
+    opts = BotConfig().get_logging_options()
+    assert opts["levels"] == {"DiscordBot": "WARNING", "OpenAI": "DEBUG"}
+    assert opts["fmt"] == "text" and opts["body_mode"] == "truncate"
+    monkeypatch.setenv("LOG_LEVELS", "DiscordBot=LOUD")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+def test_admission_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("ADMISSION_CHANNELS", "456, 789")
+    monkeypatch.setenv("ADMISSION_WAKE_WORDS", "gideon, hey bot")
+    opts = BotConfig().get_admission_options()
+    assert opts == {"channel_ids": [123, 456, 789], "wake_words": ["gideon", "hey bot"]}
+    monkeypatch.setenv("ADMISSION_CHANNELS", "general")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+def test_shard_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert BotConfig().get_shard_options() == {}
+    monkeypatch.setenv("SHARDING", "1")
+    assert BotConfig().get_shard_options() == {"shard_count": None, "shard_ids": None}
+    monkeypatch.setenv("SHARD_COUNT", "4")
+    monkeypatch.setenv("SHARD_IDS", "2,3")
+    assert BotConfig().get_shard_options() == {"shard_count": 4, "shard_ids": [2, 3]}
+    monkeypatch.setenv("SHARD_IDS", "4")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+def test_memory_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    cfg = BotConfig()
+    assert not cfg.get_memory_enabled()
+    assert cfg.get_memory_embedder() == ("hashing", "text-embedding-3-small")
+    assert cfg.get_memory_options()["scope"] == "channel"
+    monkeypatch.setenv("MEMORY_SCOPE", "everywhere")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+def test_jobs_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("JOBS_WORKERS", "3")
+    cfg = BotConfig()
+    assert not cfg.get_jobs_enabled()
+    assert cfg.get_jobs_options() == {
+        "path": "gideon_jobs.sqlite3", "workers": 3, "max_attempts": 3, "shard_count": 0, "shard_ids": None,
+    }
+    assert cfg.get_summarize_min_chars() == 1500
+    monkeypatch.setenv("SHARDING", "1")
+    monkeypatch.setenv("SHARD_COUNT", "4")
+    monkeypatch.setenv("SHARD_IDS", "2,3")
+    options = BotConfig().get_jobs_options()
+    assert options["shard_count"] == 4 and options["shard_ids"] == [2, 3]
+
+
+def test_answer_cache_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("ANSWER_CACHE_THRESHOLD", "0.95")
+    monkeypatch.setenv("ANSWER_CACHE_SKIP_WORDS", "on call, sprint")
+    cfg = BotConfig()
+    assert not cfg.get_answer_cache_enabled()
+    assert cfg.get_answer_cache_options() == {
+        "threshold": 0.95, "ttl": 86400.0, "max_per_channel": 500, "skip_words": ["on call", "sprint"],
+    }
+
+
+def test_backend_specs(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    assert BotConfig().get_backend_specs() == []
+    monkeypatch.setenv("LLM_BACKENDS", "mini, local")
+    monkeypatch.setenv("LLM_BACKEND_MINI_MODEL", "gpt-4o-mini")
+    monkeypatch.setenv("LLM_BACKEND_MINI_ROLES", "router")
+    monkeypatch.setenv("LLM_BACKEND_LOCAL_URL", "http://127.0.0.1:8080/v1/chat/completions")
+    monkeypatch.setenv("LLM_BACKEND_LOCAL_MODEL", "llama3")
+    monkeypatch.setenv("LLM_BACKEND_LOCAL_ROLES", "chat")
+    cfg = BotConfig()
+    assert cfg.get_backend_specs() == [
+        {"name": "mini", "url": "https://api.openai.com/v1/chat/completions", "model": "gpt-4o-mini",
+         "api_key": "sk-test", "roles": ["router"]},
+        {"name": "local", "url": "http://127.0.0.1:8080/v1/chat/completions", "model": "llama3",
+         "api_key": None, "roles": ["chat"]},
+    ]
+    assert cfg.get_backend_pool_options() == {"hedge": True, "hedge_min": 0.25, "cooldown": 30.0}
+    monkeypatch.setenv("LLM_BACKEND_LOCAL_ROLES", "router")
+    with pytest.raises(ValueError):
+        BotConfig()
+
+
+def test_usage_options(monkeypatch):
+    monkeypatch.setenv("DISCORD_BOT_TOKEN", "test-token")
+    monkeypatch.setenv("DISCORD_CHANNEL_ID", "123")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("USAGE_GUILD_DAILY_TOKENS", "200000")
+    monkeypatch.setenv("USAGE_GUILD_BUDGETS", "42:0,7:50000")
+    monkeypatch.setenv("USAGE_ECONOMY_MODEL", "gpt-4o-mini")
+    cfg = BotConfig()
+    assert not cfg.get_usage_enabled()
+    assert cfg.get_usage_options() == {
+        "path": "gideon_usage.sqlite3", "flush_interval": 30.0, "daily_tokens": 200000,
+        "guild_budgets": {42: 0, 7: 50000},
+    }
+    # Without LLM_BACKENDS the economy model becomes its own backend next to the default one
+    assert [(s["name"], s["model"], s["roles"]) for s in cfg.get_backend_specs()] == [
+        ("openai", "gpt-3.5-turbo", ["router", "chat"]), ("economy", "gpt-4o-mini", ["economy"]),
+    ]
@@ -0,0 +1,33 @@
+from bot.context import ContextBuilder, compact_code_blocks, estimate_tokens
+from bot.history_cache import CachedMessage
+
+
+def test_fills_budget_newest_first():
+    entries = [CachedMessage(i, "user", "x" * 40) for i in range(10)]  # 10 tokens each
+    builder = ContextBuilder(token_budget=35, tokenizer=estimate_tokens)
+    history, stats = builder.build(entries, message="y" * 8)  # 2 tokens reserved
+    assert len(history) == 3
+    assert stats["used_tokens"] == 30
+    assert stats["saved_tokens"] == 70
+
+
+def test_token_counts_are_cached():
+    calls = []
+
+    def counting(text):
+        calls.append(text)
+        return estimate_tokens(text)
+
+    entries = [CachedMessage(i, "user", f"message {i}") for i in range(3)]
+    builder = ContextBuilder(tokenizer=counting)
+    builder.build(entries, message="a")
+    builder.build(entries, message="b")
+    assert calls.count("message 0") == 1
+
+
+def test_oversize_code_block_is_compacted():
+    code = "```py\n" + "\n".join(f"line{i}" for i in range(100)) + "\n```"
+    compacted = compact_code_blocks(code, max_block_lines=20, keep_head=5, keep_tail=2)
+    assert compacted.startswith("```py\nline0")
+    assert "[93 lines omitted]" in compacted
+    assert compacted.rstrip().endswith("line99\n```")
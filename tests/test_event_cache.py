@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bot.event_cache import GuildEventIndex, ScheduledEventCache, parse_iso_window
+from bot.event_matcher import EventMatcher
+
+
+def make_event(id, name, start, description="", guild_id=1):
+    return SimpleNamespace(
+        id=id, guild_id=guild_id, name=name, description=description,
+        scheduled_start_time=datetime.fromisoformat(start).replace(tzinfo=timezone.utc),
+    )
+
+
+def test_parse_iso_window_uses_given_precision():
+    start, end = parse_iso_window("2025-06-25T20:00")
+    assert end - start == 60
+    start, end = parse_iso_window("2025-06-25")
+    assert end - start == 86400
+    assert parse_iso_window("tonight") is None
+
+
+def test_index_range_and_trigram_lookups():
+    index = GuildEventIndex([
+        make_event(1, "Team sync", "2025-06-25T10:00:00"),
+        make_event(2, "Game night", "2025-06-25T20:00:00", description="bring snacks"),
+        make_event(3, "Team retro", "2025-06-26T10:00:00"),
+    ])
+    assert [e.id for e in index.between(*parse_iso_window("2025-06-25"))] == [1, 2]
+    assert index.by_trigram[" te"] == {1, 3}
+    index.remove(3)
+    assert [e.id for e in index.between(0, float("inf"))] == [1, 2]
+    assert index.by_trigram[" te"] == {1} and "ret" not in index.by_trigram
+
+
+def test_event_updated_in_place_then_deleted_leaves_no_stale_keys():
+    event = make_event(1, "Team sync", "2025-06-25T10:00:00")
+    index = GuildEventIndex([event, make_event(2, "Game night", "2025-06-25T20:00:00")])
+    # discord.py edits the cached ScheduledEvent itself before dispatching the update
+    event.name = "Planning"
+    event.scheduled_start_time = datetime(2025, 6, 27, 9, tzinfo=timezone.utc)
+    index.add(event)
+    event.name = "Planning moved"
+    event.scheduled_start_time = datetime(2025, 6, 28, 9, tzinfo=timezone.utc)
+    index.remove(event.id)
+    assert [e.id for e in index.between(0, float("inf"))] == [2]
+    assert [m.event.id for m in EventMatcher().rank(index, "planning", "2025-06-27")] == []
+    assert [m.event.id for m in EventMatcher().rank(index, "team sync", "2025-06-25")] == [2]
+    assert set(index.trigrams) == {2} and len(index.by_start) == 1
+
+
+def test_cache_fetches_once_and_follows_gateway_events():
+    calls = []
+
+    async def fetch_scheduled_events():
+        calls.append(1)
+        return [make_event(1, "Team sync", "2025-06-25T10:00:00")]
+
+    guild = SimpleNamespace(id=1, fetch_scheduled_events=fetch_scheduled_events)
+    cache = ScheduledEventCache()
+
+    async def scenario():
+        await asyncio.gather(cache.get(guild), cache.get(guild))
+        cache.upsert(make_event(2, "Launch", "2025-07-01T09:00:00"))
+        cache.remove(make_event(1, "Team sync", "2025-06-25T10:00:00"))
+        return await cache.get(guild)
+
+    index = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [e.id for e in index.all()] == [2]
@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bot.event_cache import GuildEventIndex
+from bot.event_matcher import EventMatcher
+
+
+def make_event(id, name, start):
+    return SimpleNamespace(
+        id=id, guild_id=1, name=name, description="",
+        scheduled_start_time=datetime.fromisoformat(start).replace(tzinfo=timezone.utc),
+    )
+
+
+def make_index():
+    return GuildEventIndex([
+        make_event(1, "Team sync", "2025-06-25T10:00:00"),
+        make_event(2, "Game night", "2025-06-25T20:00:00"),
+        make_event(3, "Team retro", "2025-06-26T10:00:00"),
+        make_event(4, "Game night", "2025-07-02T20:00:00"),
+    ])
+
+
+def test_fuzzy_title_match_is_confident():
+    matcher = EventMatcher()
+    matches = matcher.rank(make_index(), "team retrospective")
+    assert matches[0].event.id == 3
+    assert matcher.is_confident(matches)
+
+
+def test_duplicate_titles_are_ambiguous_until_datetime_given():
+    matcher = EventMatcher()
+    index = make_index()
+    matches = matcher.rank(index, "game night")
+    assert {m.event.id for m in matches[:2]} == {2, 4}
+    assert not matcher.is_confident(matches)
+
+    matches = matcher.rank(index, "game night", "2025-07-02")
+    assert matches[0].event.id == 4
+    assert matcher.is_confident(matches)
+
+
+def test_datetime_only_and_unrelated_title():
+    matcher = EventMatcher()
+    index = make_index()
+    matches = matcher.rank(index, None, "2025-06-25T20:00")
+    assert matches[0].event.id == 2 and matches[0].time_score == 1.0
+    assert not matcher.is_confident(matcher.rank(index, "quarterly budget review"))
+    # "team" fits two events about equally well: ambiguous, left for the LLM shortlist
+    assert not matcher.is_confident(matcher.rank(index, "team"))
+
+
+def test_trigram_index_follows_removals():
+    index = make_index()
+    index.remove(3)
+    matches = EventMatcher().rank(index, "team retro")
+    assert all(m.event.id != 3 for m in matches)
+    assert all(3 not in ids for ids in index.by_trigram.values())
@@ -0,0 +1,41 @@
+import asyncio
+
+from aiohttp import web
+
+from bot.github_client import GitHubClient, parse_link_header
+
+
+def test_parse_link_header():
+    links = parse_link_header('<https://x/p2>; rel="next", <https://x/p5>; rel="last"')
+    assert links == {"next": "https://x/p2", "last": "https://x/p5"}
+
+
+def test_pagination_and_conditional_requests(local_server):
+    served = {"full": 0, "not_modified": 0}
+
+    async def repos(request):
+        page = int(request.query.get("page", "1"))
+        etag = f'"page-{page}"'
+        headers = {"ETag": etag, "X-RateLimit-Remaining": "4999"}
+        if request.headers.get("If-None-Match") == etag:
+            served["not_modified"] += 1
+            return web.Response(status=304, headers=headers)
+        served["full"] += 1
+        if page == 1:
+            headers["Link"] = f'<{request.url.with_query(page=2, per_page=100)}>; rel="next"'
+        return web.json_response([{"full_name": f"org/repo{page}"}], headers=headers)
+
+    async def scenario():
+        async with local_server(web.get("/users/org/repos", repos)) as server:
+            client = GitHubClient("token", "org/repo", api_url=server.url(""))
+            try:
+                first = await client.list_repos("org")
+                second = await client.list_repos("org")
+            finally:
+                await client.close()
+        return first, second, client
+
+    first, second, client = asyncio.run(scenario())
+    assert first == second == ["org/repo1", "org/repo2"]
+    assert served == {"full": 2, "not_modified": 2}
+    assert client.rate_limit_remaining == 4999
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.history_cache import ChannelHistoryCache
+
+
+class FakeChannel:
+    def __init__(self, id, messages):
+        self.id = id
+        self.messages = messages
+        self.fetches = 0
+
+    async def history(self, limit):
+        self.fetches += 1
+        for msg in reversed(self.messages[-limit:]):
+            yield msg
+
+
+def make_message(id, channel, content, bot=False):
+    return SimpleNamespace(id=id, channel=channel, content=content, author=SimpleNamespace(bot=bot))
+
+
+def test_seeds_once_then_tracks_gateway_events():
+    channel = FakeChannel(1, [])
+    channel.messages = [make_message(i, channel, f"msg {i}") for i in range(3)]
+    cache = ChannelHistoryCache(per_channel=5)
+
+    async def scenario():
+        history = await cache.get_history(channel)
+        assert [h["content"] for h in history] == ["msg 0", "msg 1", "msg 2"]
+        cache.record(make_message(3, channel, "reply", bot=True))
+        cache.update(make_message(1, channel, "edited"))
+        cache.remove(channel.id, 0)
+        return await cache.get_history(channel, exclude_ids=(3,))
+
+    history = asyncio.run(scenario())
+    assert channel.fetches == 1
+    assert [h["content"] for h in history] == ["edited", "msg 2"]
+
+
+def test_ring_buffer_and_lru_bounds():
+    cache = ChannelHistoryCache(per_channel=2, max_channels=2)
+    channels = [FakeChannel(i, []) for i in range(3)]
+
+    async def scenario():
+        for ch in channels:
+            await cache.get_messages(ch)
+        for i in range(5):
+            cache.record(make_message(i, channels[2], f"m{i}"))
+        return await cache.get_history(channels[2])
+
+    history = asyncio.run(scenario())
+    assert [h["content"] for h in history] == ["m3", "m4"]
+    assert 0 not in cache and 2 in cache
+    assert cache.stats()["evictions"] == 1
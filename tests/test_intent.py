@@ -0,0 +1,35 @@
+from bot.intent import IntentClassifier, is_pr_request
+
+classifier = IntentClassifier()
+
+def test_code_question_routes_to_developer():
+    result = classifier.classify("my python function throws a TypeError")
+    assert result.persona == "DEVELOPER"
+    assert classifier.is_confident(result)
+
+def test_scheduling_routes_to_event():
+    result = classifier.classify("schedule a sync on friday at 3pm")
+    assert result.persona == "EVENT"
+    assert classifier.is_confident(result)
+
+def test_small_talk_routes_to_assistant():
+    result = classifier.classify("thanks gideon!")
+    assert result.persona == "ASSISTANT"
+    assert classifier.is_confident(result)
+
+def test_unclear_message_falls_back_to_router():
+    assert not classifier.is_confident(classifier.classify("is it going to rain"))
+
+def test_pr_request_detection():
+    assert is_pr_request("can you open a pr for this fix")
+    assert not is_pr_request("what's a pr review checklist")
+
+def test_stats_track_saved_calls():
+    c = IntentClassifier()
+    c.classify("hey")
+    c.record_local_route()
+    c.classify("is it going to rain")
+    stats = c.stats()
+    assert stats["calls"] == 2
+    assert stats["saved_fraction"] == 0.5
+    assert stats["avg_latency_us"] > 0
@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+from bot.context import ContextBuilder
+from bot.history_cache import CachedMessage
+from bot.jobs import JobQueue
+from conftest import completion
+
+
+async def _drain(queue, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while (queue.queued or queue.running or queue._incoming) and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_batches_priorities_and_busy_gate(tmp_path):
+    calls = []
+    busy = [True]
+
+    async def scenario():
+        queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=1, batch_window=0.01,
+                         busy=lambda: busy[0], poll_interval=0.01)
+
+        async def embed(payloads):
+            calls.append(("embed", [p["n"] for p in payloads]))
+
+        async def summarize(payloads):
+            calls.append(("summarize", [p["n"] for p in payloads]))
+
+        queue.register("embed", embed, batch_size=4, priority=5)
+        queue.register("summarize", summarize, batch_size=8, priority=1)
+        await queue.start()
+        for n in range(10):
+            queue.submit("embed", {"n": n})
+        queue.submit("summarize", {"n": 99})
+        await asyncio.sleep(0.1)
+        # Replies in flight: nothing may start
+        assert calls == [] and queue.deferrals > 0
+        busy[0] = False
+        await _drain(queue)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert calls == [("summarize", [99]), ("embed", [0, 1, 2, 3]), ("embed", [4, 5, 6, 7]), ("embed", [8, 9])]
+    assert stats["queued"] == 0 and stats["batches"] == 4
+    assert stats["embed_jobs_per_batch"] == 10 / 3
+
+
+def test_jobs_survive_restart_and_failures_are_retried(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    attempts = []
+
+    async def first():
+        queue = JobQueue(path=path, workers=1, batch_window=60)
+        queue.register("embed", None)
+        await queue.start()
+        queue.submit("embed", {"n": 1})
+        # Stopped before the writer tick: the job is still written out
+        await queue.stop()
+
+    async def second():
+        queue = JobQueue(path=path, workers=1, batch_window=0.01, max_attempts=2, retry_delay=0.01)
+
+        async def flaky(payloads):
+            attempts.append(payloads)
+            raise RuntimeError("upstream down")
+
+        queue.register("embed", flaky)
+        await queue.start()
+        await _drain(queue)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    asyncio.run(first())
+    stats = asyncio.run(second())
+    assert attempts == [[{"n": 1}], [{"n": 1}]]
+    assert stats["failed"] == 1 and stats["queued"] == 0
+
+
+def test_processes_sharing_a_queue_only_claim_and_requeue_their_own_shards(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    # Guilds on shard 0 and on shard 1 of two
+    guild0, guild1 = 0 << 22, 1 << 22
+    ran = {0: [], 1: []}
+
+    def child(shard):
+        queue = JobQueue(path=path, workers=1, batch_window=0.01, shard_count=2, shard_ids=[shard])
+
+        async def handler(payloads):
+            ran[shard].extend(p["n"] for p in payloads)
+            await asyncio.sleep(0.2)
+
+        queue.register("summarize", handler, batch_size=8)
+        return queue
+
+    async def scenario():
+        first, second = child(0), child(1)
+        await first.start()
+        await second.start()
+        first.submit("summarize", {"n": 1}, guild_id=guild0)
+        second.submit("summarize", {"n": 2}, guild_id=guild1)
+        # Not a guild of the first process's shards: it is never claimed there (its owner may)
+        first.submit("summarize", {"n": 3}, guild_id=guild1)
+        await asyncio.sleep(0.1)
+        # A sibling restarting while both batches run only takes its own running job back
+        restarted = child(0)
+        await first.stop()
+        await restarted.start()
+        await asyncio.sleep(0.3)
+        await second.stop()
+        await restarted.stop()
+
+    asyncio.run(scenario())
+    assert ran[0] == [1, 1] and ran[1].count(2) == 1
+
+
+def test_summary_replaces_long_message_in_context():
+    entries = [CachedMessage(1, "user", "x" * 4000), CachedMessage(2, "user", "and?")]
+    builder = ContextBuilder(token_budget=500)
+    history, _ = builder.build(entries)
+    assert [m["content"] for m in history] == ["and?"]
+    entries[0].summary = "A 4000 character log of x's."
+    entries[0].tokens = None
+    history, stats = builder.build(entries)
+    assert history[0]["content"] == "A 4000 character log of x's." and stats["saved_tokens"] > 900
+
+
+def test_summarize_batches_many_messages_into_one_call(fake_client):
+    def respond(payload, label):
+        texts = json.loads(payload["messages"][-1]["content"])
+        return completion(json.dumps({"summaries": [f"summary of {t[:5]}" for t in texts]}))
+
+    client = fake_client(respond)
+    summaries = asyncio.run(client.summarize(["first long paste", "second long paste"]))
+    assert summaries == ["summary of first", "summary of secon"]
+    assert len(client.sent) == 1 and client.sent[0]["response_format"] == {"type": "json_object"}
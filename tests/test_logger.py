@@ -0,0 +1,52 @@
+import json
+import logging
+
+from bot import logger as log
+from bot.logger import JSONFormatter, RateLimitFilter, body, configure_logging, setup_logger
+
+
+def make_record(msg, lineno=10, name="Test", **extra):
+    record = logging.LogRecord(name, logging.INFO, __file__, lineno, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_per_call_site_with_summary():
+    now = [0.0]
+    limiter = RateLimitFilter(burst=2, window=10.0, clock=lambda: now[0])
+    passed = [limiter.filter(make_record(f"line {i}")) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    # a different call site has its own budget
+    assert limiter.filter(make_record("other", lineno=11))
+    now[0] = 10.0
+    record = make_record("line 5")
+    assert limiter.filter(record)
+    assert record.getMessage() == "line 5 (3 similar lines suppressed)"
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JSONFormatter().format(make_record("hello", guild=42))
+    entry = json.loads(line)
+    assert entry["msg"] == "hello" and entry["logger"] == "Test" and entry["level"] == "INFO"
+    assert entry["guild"] == 42
+
+
+def test_body_modes_and_levels():
+    try:
+        configure_logging(body_mode="truncate", body_chars=5, levels={"Noisy": "WARNING"})
+        assert body("hello world") == "hello…(+6 chars)"
+        assert body("hi") == "hi"
+        assert setup_logger("Noisy").level == logging.WARNING
+        assert setup_logger("Quiet").level == logging.INFO
+        configure_logging(body_mode="redact")
+        assert body("secret plans") == "<12 chars>"
+    finally:
+        configure_logging()
+
+
+def test_queue_handler_defers_formatting():
+    record = make_record("value %s", guild=1)
+    record.args = (5,)
+    prepared = log._queue_handler.prepare(record)
+    assert prepared.msg == "value 5" and prepared.args is None
+    assert not hasattr(prepared, "asctime")
@@ -0,0 +1,156 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+
+from bot.jobs import JobQueue
+from bot.memory import MEMORY_HEADER, GuildIndex, HashingEmbedder, MemoryEntry, MemoryStore, OpenAIEmbedder
+from conftest import ROUTER_LABEL, completion
+
+GUILD = SimpleNamespace(id=7)
+
+
+def _message(id, content, channel=1, bot=False, name="ana"):
+    return SimpleNamespace(
+        id=id, content=content, guild=GUILD, channel=SimpleNamespace(id=channel),
+        author=SimpleNamespace(bot=bot, display_name=name), created_at=None,
+    )
+
+
+def test_hashing_embedder_is_normalised_and_lexical():
+    vectors = asyncio.run(HashingEmbedder(dim=128).embed(
+        ["the deploy script needs docker", "docker deploy script", "pancake recipe"]
+    ))
+    assert vectors.shape == (3, 128)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+
+def test_guild_index_is_a_bounded_ring():
+    index = GuildIndex(capacity=2, dim=2)
+    for i in range(3):
+        evicted = index.add(MemoryEntry(i, 7, 1, "user", "ana", str(i), float(i)), np.array([1.0, 0.0]))
+    assert evicted == 0 and len(index) == 2 and set(index.slots) == {1, 2}
+    found = index.search(np.array([1.0, 0.0], dtype=np.float32), 1, k=5, min_score=0.5, exclude_ids={2})
+    assert [e.message_id for _, e in found] == [1]
+    assert index.search(np.array([1.0, 0.0], dtype=np.float32), 99, k=5, min_score=0.5) == []
+
+
+def test_guild_index_grows_geometrically_up_to_capacity():
+    index = GuildIndex(capacity=200, dim=4)
+    assert index.vectors.shape == (64, 4)
+    for i in range(150):
+        index.add(MemoryEntry(i, 7, i % 3, "user", "ana", str(i), float(i)), np.eye(4)[i % 4])
+    assert index.vectors.shape == (200, 4) and len(index.entries) == 200
+    for i in range(150, 260):
+        index.add(MemoryEntry(i, 7, i % 3, "user", "ana", str(i), float(i)), np.eye(4)[i % 4])
+    # Rows copied over on growth are still found, and the ring wraps at capacity
+    assert index.vectors.shape == (200, 4) and len(index) == 200 and min(index.slots) == 60
+    found = index.search(np.eye(4)[1].astype(np.float32), 1, k=3, min_score=0.5)
+    assert [e.message_id for _, e in found] and all(e.message_id % 12 == 1 for _, e in found)
+
+
+def test_store_search_persistence_and_bounds(tmp_path):
+    path = str(tmp_path / "memory.sqlite3")
+
+    async def scenario():
+        store = MemoryStore(path=path, max_per_guild=4, top_k=2, token_budget=100, min_score=0.2)
+        await store.start()
+        store.add(_message(1, "the staging database password rotates every friday"))
+        store.add(_message(2, "lunch is at noon"))
+        store.add(_message(3, "gideon, staging database is on port 5433", bot=True, name="Gideon"))
+        store.add(_message(4, "staging database notes for the other channel", channel=2))
+        store.add(_message(5, ""))
+        # Streamed replies settle before they are embedded; edits replace the queued text
+        store.update(_message(3, "the staging database listens on port 5433", bot=True, name="Gideon"))
+        assert store.stats()["pending"] == 4
+        await store.flush(force=True)
+        found = await store.search(7, 1, "which port is the staging database on?", exclude_ids={1})
+        await store.forget(7, 2)
+        await store.stop()
+        return found, store.stats()
+
+    found, stats = asyncio.run(scenario())
+    assert [e.message_id for e in found] == [3]
+    assert "5433" in found[0].content
+    assert stats["stored"] == 4 and stats["batches"] == 1 and stats["searches"] == 1
+
+    async def reload():
+        store = MemoryStore(path=path, max_per_guild=4, min_score=0.2)
+        await store.start()
+        for i in range(10, 14):
+            store.add(_message(i, f"filler message number {i}"))
+        await store.flush(force=True)
+        gone = await store.search(7, 1, "staging database password")
+        found = await store.search(7, 1, "filler message number 12")
+        rendered = store.render(found)
+        await store.stop()
+        return gone, found, rendered
+
+    gone, found, rendered = asyncio.run(reload())
+    # Only the newest max_per_guild messages of the guild survive, on disk and in the index
+    rows = sqlite3.connect(path).execute("SELECT message_id FROM memories ORDER BY message_id").fetchall()
+    assert [r[0] for r in rows] == [10, 11, 12, 13]
+    assert all(e.message_id >= 10 for e in gone)
+    assert 12 in [e.message_id for e in found]
+    assert rendered[0]["role"] == "system" and "ana: filler message number 12" in rendered[0]["content"]
+
+
+def test_openai_embedder_learns_the_model_width(tmp_path):
+    wide = HashingEmbedder(dim=3072)
+
+    async def embed(texts, model):
+        return (await wide.embed(texts)).tolist()
+
+    embedder = OpenAIEmbedder(SimpleNamespace(embed=embed), model="text-embedding-3-large")
+
+    async def scenario():
+        store = MemoryStore(path=str(tmp_path / "memory.sqlite3"), embedder=embedder, min_score=0.2)
+        await store.start()
+        store.add(_message(1, "the release checklist lives in the wiki"))
+        await store.flush(force=True)
+        found = await store.search(7, 1, "where is the release checklist")
+        await store.stop()
+        return found
+
+    found = asyncio.run(scenario())
+    assert embedder.dim == 3072 and [e.message_id for e in found] == [1]
+
+
+def test_embeddings_run_as_batched_background_jobs(tmp_path):
+    async def scenario():
+        jobs = JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=1, batch_window=0.01)
+        store = MemoryStore(path=str(tmp_path / "memory.sqlite3"), jobs=jobs, batch_size=16, min_score=0.2)
+        await jobs.start()
+        await store.start()
+        for i in range(20):
+            store.add(_message(i, f"note {i} about the redis failover drill"))
+        await store.flush(force=True)
+        for _ in range(200):
+            if store.stored == 20:
+                break
+            await asyncio.sleep(0.01)
+        found = await store.search(7, 1, "redis failover")
+        await store.stop()
+        await jobs.stop()
+        return found, jobs.stats()
+
+    found, stats = asyncio.run(scenario())
+    assert found
+    assert stats["batches"] == 2 and stats["memory_embed_batch_fill"] == 20 / 32
+
+
+def test_reply_goes_out_without_memories_when_search_fails(fake_client, gideon_bot):
+    client = fake_client(lambda payload, label: completion("ASSISTANT" if label == ROUTER_LABEL else "Here you go."))
+
+    async def search(*args, **kwargs):
+        raise ValueError("could not broadcast input array from shape (3072,) into shape (1536,)")
+
+    bot, channel = gideon_bot(client)
+    bot.memory = SimpleNamespace(search=search, render=MemoryStore().render)
+    message = SimpleNamespace(id=1, content="what did we decide", guild=None, channel=channel)
+
+    asyncio.run(bot._reply(message, "what did we decide", [1]))
+    assert channel.sent == ["Here you go."]
+    assert MEMORY_HEADER not in str(client.sent[-1]["messages"])
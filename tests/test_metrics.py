@@ -0,0 +1,55 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from bot.metrics import Metrics, NULL_METRICS
+from conftest import completion
+
+
+def test_disabled_metrics_are_noops():
+    metrics = Metrics(enabled=False)
+    assert metrics.stage("llm") is NULL_METRICS.stage("other")
+    with metrics.stage("llm"):
+        pass
+    metrics.count("gideon_messages_total", outcome="queued")
+    assert metrics.render() == "\n"
+
+
+def test_stage_timings_errors_and_collectors():
+    metrics = Metrics(enabled=True)
+    with metrics.stage("history"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.stage("llm", persona="EVENT"):
+            raise RuntimeError("boom")
+    metrics.add_collector("scheduler", lambda: {"pending": 3, "running": 1, "label": "x"})
+    assert metrics.histogram("gideon_stage_seconds", stage="history").count == 1
+    assert metrics.value("gideon_errors_total", stage="llm", persona="EVENT") == 1
+    text = metrics.render()
+    assert 'gideon_stage_seconds_bucket{stage="history",le="+Inf"} 1' in text
+    assert "gideon_scheduler_pending 3" in text
+    assert "gideon_scheduler_label" not in text
+
+
+def test_openai_usage_counters_and_endpoint(fake_client):
+    metrics = Metrics(enabled=True, port=0)
+    client = fake_client(completion("DEVELOPER", usage={"prompt_tokens": 90, "completion_tokens": 2}), metrics=metrics)
+
+    async def scenario():
+        await client.ask_router_persona("fix my segfault")
+        await client.ask_chatgpt("fix my segfault", persona="developer")
+        await metrics.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{metrics.port}/metrics") as resp:
+                    return resp.status, await resp.text()
+        finally:
+            await metrics.stop()
+
+    status, text = asyncio.run(scenario())
+    assert status == 200
+    assert metrics.value("gideon_tokens_total", persona="router", kind="prompt") == 90
+    assert metrics.value("gideon_tokens_total", persona="developer", kind="completion") == 2
+    assert 'gideon_tokens_total{kind="prompt",persona="developer"} 90' in text
+    assert 'stage="openai"' in text
@@ -0,0 +1,39 @@
+import asyncio
+import datetime
+
+from bot.openai_client import OpenAIClient
+from bot.prompts import PromptLibrary, render_context
+from conftest import completion
+
+
+def test_static_prefix_is_byte_stable_and_context_trails():
+    client = OpenAIClient(api_key="x")
+    history = [{"role": "user", "content": "earlier"}]
+    first, template = client._persona_payload("hi", ["Gideon"], history, "assistant", "general")
+    second, _ = client._persona_payload("other", ["Gideon", "gid"], history, "assistant", "random")
+    assert first["messages"][:2] == second["messages"][:2]
+    assert first["messages"][0]["content"] == template.text
+    assert "general" not in template.text and "Gideon\"" not in template.text
+    assert "'general'" in first["messages"][-2]["content"]
+    assert first["messages"][-1] == {"role": "user", "content": "hi"}
+
+
+def test_render_context():
+    now = datetime.datetime(2025, 6, 25, 20, 0, tzinfo=datetime.timezone.utc)
+    text = render_context(["Gideon", ""], "dev-chat", now=now)
+    assert "2025-06-25T20:00:00+00:00" in text
+    assert "'dev-chat'" in text and '"Gideon"' in text
+    assert "aliases" not in render_context([], "dev-chat", now=now)
+
+
+def test_cached_token_ratio_from_usage(fake_client):
+    library = PromptLibrary()
+    usage = {"prompt_tokens": 1200, "prompt_tokens_details": {"cached_tokens": 1024}}
+    client = fake_client(completion("ok", usage=usage), prompts=library)
+    asyncio.run(client.ask_chatgpt("hi"))
+    library.record_usage(library.get("developer"), {"prompt_tokens": 800})
+    stats = library.stats()
+    assert stats["prompt_tokens"] == 2000 and stats["cached_tokens"] == 1024
+    assert abs(stats["cached_ratio"] - 0.512) < 1e-9
+    assert stats["templates"]["assistant"]["cached_ratio"] > 0.85
+    assert stats["templates"]["developer"]["fingerprint"] == library.get("developer").fingerprint
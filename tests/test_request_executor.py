@@ -0,0 +1,92 @@
+import asyncio
+import random
+
+import aiohttp
+from aiohttp import web
+
+from bot.request_executor import RequestExecutor, TokenBucket, parse_duration, parse_retry_after
+
+
+def test_parse_rate_limit_headers():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1.5s") == 1.5
+    assert parse_retry_after({"Retry-After": "2"}) == 2
+    assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+    assert parse_retry_after({}) is None
+
+
+def test_token_bucket_paces_once_budget_is_spent():
+    now = [0.0]
+    bucket = TokenBucket(clock=lambda: now[0])
+    bucket.sync(remaining=1, limit=60, reset_seconds=59)
+    assert bucket.wait_time(1) == 0
+    assert bucket.wait_time(1) > 0
+
+
+def test_retries_429_honouring_retry_after_then_succeeds(local_server):
+    statuses = [429, 503, 200]
+
+    async def handler(request):
+        status = statuses.pop(0)
+        if status != 200:
+            return web.Response(status=status, text="slow down", headers={"Retry-After": "0"})
+        return web.json_response({"ok": True}, headers={
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "499",
+            "x-ratelimit-reset-requests": "120ms",
+        })
+
+    async def scenario():
+        executor = RequestExecutor(max_retries=3, rng=random.Random(0))
+        async with local_server(web.post("/v1/chat/completions", handler)) as server:
+            async with aiohttp.ClientSession() as session:
+                data = await executor.post_json(session, server.url("/v1/chat/completions"), {}, "test")
+        return data, executor.stats()
+
+    data, stats = asyncio.run(scenario())
+    assert data == {"ok": True}
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+    assert stats["remaining_requests"] == 499
+
+
+def test_gives_up_on_non_retryable_status(local_server):
+    async def handler(request):
+        return web.Response(status=401, text="bad key")
+
+    async def scenario():
+        executor = RequestExecutor()
+        async with local_server(web.post("/", handler)) as server:
+            async with aiohttp.ClientSession() as session:
+                data = await executor.post_json(session, server.url(), {}, "test")
+        return data, executor.stats()
+
+    data, stats = asyncio.run(scenario())
+    assert data is None
+    assert stats["retries"] == 0 and stats["failures"] == 1
+
+
+def test_body_stalled_past_the_session_timeout_is_retried(local_server):
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) > 1:
+            return web.json_response({"ok": True})
+        # Headers arrive at once, the body never does
+        resp = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await resp.prepare(request)
+        await asyncio.sleep(1)
+        return resp
+
+    async def scenario():
+        executor = RequestExecutor(base_delay=0.0)
+        async with local_server(web.post("/", handler)) as server:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=0.3)) as session:
+                data = await executor.post_json(session, server.url(), {}, "test")
+        return data, executor.stats()
+
+    data, stats = asyncio.run(scenario())
+    assert data == {"ok": True}
+    assert stats["retries"] == 1 and stats["failures"] == 0
@@ -0,0 +1,91 @@
+import asyncio
+
+from bot.response_cache import MemoryCache, ResponseCache, make_cache_key
+
+
+def payload(text, system="route"):
+    return {
+        "model": "gpt-3.5-turbo",
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": text}],
+        "max_tokens": 12,
+        "temperature": 0.0,
+    }
+
+
+def test_key_normalizes_prompt_but_not_system_version():
+    assert make_cache_key(payload("Hey  Gideon!")) == make_cache_key(payload("hey gideon"))
+    assert make_cache_key(payload("hey gideon")) != make_cache_key(payload("hey gideon", system="route v2"))
+
+
+def test_memory_cache_ttl_and_lru_eviction():
+    now = [0.0]
+    cache = MemoryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.evictions == 1
+    now[0] = 11
+    assert cache.get("a") is None
+
+
+def test_concurrent_identical_requests_share_one_call():
+    cache = ResponseCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"choices": [{"message": {"content": "ASSISTANT"}}]}
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_fetch(payload("thanks"), fetch) for _ in range(5)))
+        await cache.get_or_fetch(payload("Thanks!"), fetch)
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["merged"] == 4 and stats["hits"] == 1
+
+
+def test_merged_caller_fetches_itself_when_the_original_is_cancelled():
+    cache = ResponseCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": len(calls)}
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_fetch(payload("hi"), fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_fetch(payload("hi"), fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        assert first.cancelled()
+        return result
+
+    assert asyncio.run(scenario()) == {"answer": 2}
+    assert len(calls) == 2 and cache.stats()["merged"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    value = {"choices": [{"message": {"content": "EVENT"}}]}
+
+    async def fetch():
+        return value
+
+    async def never():
+        raise AssertionError("should be served from disk")
+
+    first = ResponseCache(path=path)
+    asyncio.run(first.get_or_fetch(payload("what's on tonight"), fetch))
+    first.close()
+    second = ResponseCache(path=path)
+    assert asyncio.run(second.get_or_fetch(payload("what's on tonight"), never)) == value
+    second.close()
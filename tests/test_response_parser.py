@@ -0,0 +1,79 @@
+import asyncio
+
+from bot.openai_client import OpenAIClient
+from bot.response_parser import EVENT_TOOLS, ParsedResponse, parse_response, parse_tool_calls, validate_action
+from conftest import completion
+
+
+def test_plain_text_has_no_actions():
+    parsed = parse_response("Sure, 3 + 2 = 5. [citation needed]")
+    assert not parsed.has_actions
+    assert parsed.text == "Sure, 3 + 2 = 5. [citation needed]"
+
+
+def test_finds_every_block_in_order():
+    reply = (
+        "On it!\n"
+        '[CANCEL_EVENT]\n{"title": "Game night", "datetime": "2025-06-25T20:00:00"}\n[/CANCEL_EVENT]\n'
+        '[SCHEDULE_EVENT]\n{"title": "Game night", "datetime": "2025-06-26T20:00:00", "timezone": "Europe/Brussels"}\n[/SCHEDULE_EVENT]'
+    )
+    parsed = parse_response(reply)
+    assert [a.kind for a in parsed.actions] == ["CANCEL_EVENT", "SCHEDULE_EVENT"]
+    assert parsed.actions[1].data["datetime"] == "2025-06-26T20:00:00"
+    assert parsed.text == "On it!"
+    assert parsed.invalid == []
+
+
+def test_invalid_blocks_are_reported_not_dispatched():
+    reply = (
+        "[SCHEDULE_EVENT]{not json}[/SCHEDULE_EVENT]"
+        '[UPDATE_EVENT]{"title": "Sync"}[/UPDATE_EVENT]'
+        '[CANCEL_EVENT]{"title": ["x"]}[/CANCEL_EVENT]'
+        # mismatched closing tag is not a block at all
+        '[CANCEL_EVENT]{"title": "x"}[/SCHEDULE_EVENT]'
+    )
+    parsed = parse_response(reply)
+    assert parsed.actions == []
+    assert [a.kind for a in parsed.invalid] == ["SCHEDULE_EVENT", "UPDATE_EVENT", "CANCEL_EVENT"]
+    assert "invalid JSON" in parsed.invalid[0].error
+    assert "fields_to_update" in parsed.invalid[1].error
+
+
+def test_schedule_requires_a_start():
+    assert validate_action("SCHEDULE_EVENT", {"title": "x"}) is not None
+    assert validate_action("SCHEDULE_EVENT", {"title": "x", "start_time": "2025-06-26T20:00"}) is None
+    assert validate_action("CANCEL_EVENT", {"title": None, "datetime": None}) is None
+
+
+def test_tool_calls_become_actions():
+    message = {
+        "content": None,
+        "tool_calls": [
+            {"function": {"name": "cancel_event", "arguments": '{"title": "Game night"}'}},
+            {"function": {"name": "update_event", "arguments": '{"title": "Sync"}'}},
+            {"function": {"name": "delete_guild", "arguments": "{}"}},
+        ],
+    }
+    parsed = parse_tool_calls(message)
+    assert [(a.kind, a.data) for a in parsed.actions] == [("CANCEL_EVENT", {"title": "Game night"})]
+    assert [a.kind for a in parsed.invalid] == ["UPDATE_EVENT"]
+    assert parsed and parsed.text == ""
+
+
+def test_tool_calling_mode_sends_tools_and_a_shorter_prompt(fake_client):
+    calling = fake_client(completion(None, tool_calls=[
+        {"function": {"name": "schedule_event", "arguments": '{"title": "Retro", "datetime": "2030-01-02T10:00:00"}'}},
+    ]), tool_calling=True)
+    reply = asyncio.run(calling.ask_chatgpt("plan a retro thursday 10am"))
+    assert isinstance(reply, ParsedResponse)
+    assert reply.actions[0].kind == "SCHEDULE_EVENT"
+    assert calling.sent[0]["tools"] == EVENT_TOOLS
+
+    client = OpenAIClient(api_key="x")
+    with_blocks = client.prompts.get("assistant").text
+    with_tools = client.prompts.get("assistant", tools=True).text
+    assert "[SCHEDULE_EVENT]" in with_blocks and "[SCHEDULE_EVENT]" not in with_tools
+    assert len(with_tools) < len(with_blocks)
+    # The developer persona never handles events, so it gets no tools
+    payload, _ = client._persona_payload("hi", [], [], "developer", "", tools=True)
+    assert "tools" not in payload
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from conftest import ROUTER_LABEL, completion
+
+COMBINED_LABEL = "OpenAI combined route+reply"
+
+
+def scripted(fake_client, router="ASSISTANT", combined="", persona_delay=0.0, **kwargs):
+    """Client answering the router with `router`, the combined call with `combined`, persona calls with their label."""
+    cancelled = []
+
+    async def respond(payload, label):
+        if label in (ROUTER_LABEL, COMBINED_LABEL):
+            # Yields to the event loop, as a request on the wire would
+            await asyncio.sleep(0)
+            return completion(router if label == ROUTER_LABEL else combined)
+        try:
+            await asyncio.sleep(persona_delay)
+        except asyncio.CancelledError:
+            cancelled.append(label)
+            raise
+        return completion(f"reply from {label}")
+
+    client = fake_client(respond, **kwargs)
+    client.cancelled = cancelled
+    return client
+
+
+def _route(client, message="how do I rebase onto main"):
+    return asyncio.run(client.route_and_respond(message))
+
+
+def test_combined_returns_persona_and_reply_from_one_call(fake_client):
+    client = scripted(
+        fake_client, routing_mode="combined", combined=json.dumps({"persona": "developer", "reply": "git rebase main"})
+    )
+    assert _route(client) == ("DEVELOPER", "git rebase main")
+    assert client.labels == [COMBINED_LABEL]
+
+
+def test_combined_falls_back_to_assistant_on_non_json_and_unknown_personas(fake_client):
+    client = scripted(fake_client, routing_mode="combined", combined="  Just run git rebase.  ")
+    assert _route(client) == ("ASSISTANT", "Just run git rebase.")
+    client = scripted(fake_client, routing_mode="combined", combined=json.dumps({"persona": "PIRATE", "reply": "arr"}))
+    assert _route(client) == ("ASSISTANT", "arr")
+
+
+def test_speculative_agreement_reuses_the_speculative_answer(fake_client):
+    client = scripted(fake_client, routing_mode="speculative", router="ASSISTANT", persona_delay=0.01)
+    # EVENT shares the assistant prompt, so the guessed call is still the right one
+    assert _route(client) == ("ASSISTANT", "reply from OpenAI assistant completion")
+    client = scripted(fake_client, routing_mode="speculative", router="EVENT", persona_delay=0.01)
+    assert _route(client) == ("EVENT", "reply from OpenAI assistant completion")
+    assert sorted(client.labels) == sorted([ROUTER_LABEL, "OpenAI assistant completion"]) and client.cancelled == []
+
+
+def test_speculative_disagreement_cancels_the_guess_and_asks_again(fake_client):
+    client = scripted(fake_client, routing_mode="speculative", router="DEVELOPER", persona_delay=0.05)
+    assert _route(client) == ("DEVELOPER", "reply from OpenAI developer completion")
+    assert client.cancelled == ["OpenAI assistant completion"]
+    assert client.labels.count("OpenAI developer completion") == 1
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.scheduler import MessageScheduler
+
+
+def make_message(id, channel_id, user_id, guild_id=1):
+    return SimpleNamespace(
+        id=id,
+        guild=SimpleNamespace(id=guild_id),
+        channel=SimpleNamespace(id=channel_id),
+        author=SimpleNamespace(id=user_id),
+    )
+
+
+def run_scheduler(scheduler, submissions, expected_jobs):
+    handled = []
+
+    async def handler(message, content, message_ids):
+        handled.append((message.channel.id, content, list(message_ids)))
+
+    async def scenario():
+        scheduler.handler = handler
+        outcomes = [scheduler.submit(msg, text) for msg, text in submissions]
+        scheduler.start()
+        while len(handled) < expected_jobs:
+            await asyncio.sleep(0.001)
+        await scheduler.stop()
+        return outcomes
+
+    return asyncio.run(scenario()), handled
+
+
+def test_busy_channel_does_not_starve_others():
+    scheduler = MessageScheduler(None, max_concurrency=1)
+    flood = [(make_message(i, channel_id=10, user_id=i), f"a{i}") for i in range(4)]
+    quiet = [(make_message(99, channel_id=20, user_id=7), "b")]
+    _, handled = run_scheduler(scheduler, flood + quiet, 5)
+    assert [h[0] for h in handled[:2]] == [10, 20]
+
+
+def test_rapid_messages_from_same_user_are_merged():
+    scheduler = MessageScheduler(None, max_concurrency=1)
+    msgs = [(make_message(i, channel_id=10, user_id=5), f"part {i}") for i in range(3)]
+    outcomes, handled = run_scheduler(scheduler, msgs, 1)
+    assert outcomes == ["queued", "merged", "merged"]
+    assert handled == [(10, "part 0\npart 1\npart 2", [0, 1, 2])]
+
+
+def test_sheds_when_queue_is_full():
+    scheduler = MessageScheduler(None, max_concurrency=1, max_pending=2)
+    msgs = [(make_message(i, channel_id=10, user_id=i), "x") for i in range(3)]
+    outcomes, _ = run_scheduler(scheduler, msgs, 2)
+    assert outcomes == ["queued", "queued", "shed"]
+    assert scheduler.stats()["shed"] == 1
+
+
+def test_coalesce_window_does_not_hold_a_concurrency_slot():
+    scheduler = MessageScheduler(None, max_concurrency=1, coalesce_window=0.3)
+    handled = []
+
+    async def handler(message, content, message_ids):
+        handled.append(content)
+
+    async def scenario():
+        scheduler.handler = handler
+        scheduler.start()
+        assert scheduler.submit(make_message(1, channel_id=10, user_id=5), "held") == "queued"
+        await asyncio.sleep(0.01)
+        assert scheduler.pending == 1 and scheduler.running == 0
+        # A job that is ready goes first instead of waiting behind the held one's window
+        scheduler.coalesce_window = 0.0
+        scheduler.submit(make_message(2, channel_id=20, user_id=6), "ready")
+        while len(handled) < 2:
+            await asyncio.sleep(0.001)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert handled == ["ready", "held"]
+
+
+def test_failed_reply_is_reported_to_the_user(fake_client, gideon_bot):
+    def respond(payload, label):
+        raise RuntimeError("boom")
+
+    bot, channel = gideon_bot(fake_client(respond))
+    message = SimpleNamespace(id=1, content="hello", guild=None, channel=channel, author=SimpleNamespace(id=7))
+
+    async def scenario():
+        bot.scheduler.start()
+        bot.scheduler.submit(message, "hello")
+        while not bot.scheduler.failed:
+            await asyncio.sleep(0.001)
+        await bot.scheduler.stop()
+
+    asyncio.run(scenario())
+    assert channel.sent == ["Sorry, something went wrong answering that. Please try again!"]
+    assert bot.scheduler.stats()["failed"] == 1 and bot.scheduler.stats()["pending"] == 0
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import discord
+
+from bot.history_cache import ChannelHistoryCache
+from bot.main import GideonBot, ShardedGideonBot
+from bot.metrics import Metrics
+from bot.openai_client import OpenAIClient
+from bot.sharding import ShardLocal, shard_for, split_shards
+
+
+def test_shard_for_and_split():
+    guild_id = 81384788765712384
+    assert shard_for(guild_id, 4) == (guild_id >> 22) % 4
+    assert shard_for(guild_id, None) == 0
+    assert shard_for(None, 4) == 0
+    assert split_shards(10, 4) == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]]
+    assert split_shards(2, 8) == [[0], [1]]
+
+
+def test_shard_local_caches_are_independent():
+    caches = ShardLocal(ChannelHistoryCache, "history")
+    assert caches[0] is caches[0]
+    assert caches[0] is not caches[1]
+    caches[1]._touch(5, [])
+    assert caches.stats()[1]["channels"] == 1
+    caches.reset(1)
+    assert 1 not in caches.stats() and len(caches) == 1
+
+
+def test_sharded_bot_metrics():
+    metrics = Metrics(enabled=True)
+    bot = ShardedGideonBot(
+        channel_id=1, openai_client=OpenAIClient(api_key="x"), metrics=metrics,
+        intents=discord.Intents.none(), shard_count=4, shard_ids=[2, 3],
+    )
+    assert isinstance(bot, discord.AutoShardedClient)
+    assert not isinstance(GideonBot(channel_id=1, openai_client=OpenAIClient(api_key="x"),
+                                    intents=discord.Intents.none()), discord.AutoShardedClient)
+    guild = SimpleNamespace(id=(7 << 22) | 123)
+    assert bot._history(guild) is bot.history_cache[3]
+    assert bot._history(None) is bot.history_cache[0]
+
+    shards = {
+        2: SimpleNamespace(latency=float("inf"), is_closed=lambda: True, is_ws_ratelimited=lambda: False),
+        3: SimpleNamespace(latency=0.042, is_closed=lambda: False, is_ws_ratelimited=lambda: False),
+    }
+    health = ShardedGideonBot._shard_health(SimpleNamespace(shards=shards))
+    assert health[2] == {"up": False, "ratelimited": False, "latency_seconds": -1.0}
+    metrics.add_collector("shard_test", lambda: health, label="shard")
+    text = metrics.render()
+    assert 'gideon_shard_test_latency_seconds{shard="3"} 0.042' in text
+    assert 'gideon_shard_test_up{shard="3"} 1' in text
+    assert 'gideon_history_cache_channels{shard="3"} 0' in text
+
+
+def test_launcher_slices_and_staggers():
+    from bot.launcher import ShardLauncher
+
+    launcher = ShardLauncher(shard_count=6, processes=3, metrics_port=9108, max_concurrency=1)
+    assert [c.shard_ids for c in launcher.children] == [[0, 1], [2, 3], [4, 5]]
+    assert launcher.children[1].env == {
+        "SHARDING": "1", "SHARD_COUNT": "6", "SHARD_IDS": "2,3", "METRICS_PORT": "9109",
+    }
+    # Two IDENTIFYs per process at one per 5 seconds
+    assert [c.delay for c in launcher.children] == [0.0, 10.0, 20.0]
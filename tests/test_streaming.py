@@ -0,0 +1,54 @@
+import asyncio
+
+from bot.streaming import StreamingReply, split_message
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+    async def edit(self, content):
+        self.content = content
+
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        msg = FakeMessage(content)
+        self.sent.append(msg)
+        return msg
+
+
+async def deltas(parts):
+    for p in parts:
+        yield p
+
+
+def test_split_respects_limit_and_code_fences():
+    text = "intro\n```py\n" + "\n".join(f"x = {i}" for i in range(600)) + "\n```\noutro"
+    chunks = split_message(text)
+    assert len(chunks) > 1
+    assert all(len(c) <= 2000 for c in chunks)
+    assert all(c.count("```") % 2 == 0 for c in chunks)
+    assert chunks[1].startswith("```py\n")
+
+
+def test_stream_posts_then_edits():
+    channel = FakeChannel()
+    reply = StreamingReply(channel, edit_interval=0)
+    text = asyncio.run(reply.stream(deltas(["Hello", " there", ", friend"])))
+    assert text == "Hello there, friend"
+    assert len(channel.sent) == 1
+    assert channel.sent[0].content == "Hello there, friend"
+
+
+def test_event_block_is_never_displayed():
+    channel = FakeChannel()
+    reply = StreamingReply(channel, edit_interval=0)
+    parts = ["[SCHED", "ULE_EVENT]\n", '{"title": "x"}', "\n[/SCHEDULE_EVENT]"]
+    text = asyncio.run(reply.stream(deltas(parts)))
+    assert reply.is_event
+    assert channel.sent == []
+    assert text.startswith("[SCHEDULE_EVENT]")
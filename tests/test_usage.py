@@ -0,0 +1,169 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.backends import Backend, BackendPool
+from bot.openai_client import OpenAIClient
+from bot.response_cache import ResponseCache
+from bot.usage import UsageLedger, UsageScope, current_usage, estimate_cost, main, report
+
+DAY = 1_700_000_000.0
+
+
+class Clock:
+    def __init__(self, now=DAY):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_usage_is_attributed_flushed_and_reported(tmp_path, capsys):
+    path = str(tmp_path / "usage.sqlite3")
+    clock = Clock()
+
+    async def scenario():
+        ledger = UsageLedger(path=path, clock=clock)
+        await ledger.start()
+        current_usage.set(ledger.scope(7, 70, 700))
+        ledger.record("assistant", "gpt-4o-mini-2024-07-18", {"prompt_tokens": 1000, "completion_tokens": 200})
+        ledger.record("assistant", "gpt-4o-mini-2024-07-18", {"prompt_tokens": 500, "completion_tokens": 100})
+        current_usage.set(ledger.scope(8, 80, 800))
+        ledger.record("developer", "gpt-4o", {"prompt_tokens": 100, "completion_tokens": 50})
+        current_usage.set(None)
+        ledger.record("summarize", "gpt-4o-mini", {"prompt_tokens": 30, "completion_tokens": 10})
+        assert ledger.stats()["pending_rows"] == 3
+        await ledger.flush()
+        current_usage.set(UsageScope(7, 70, 700))
+        ledger.record("assistant", "gpt-4o-mini-2024-07-18", {"prompt_tokens": 10, "completion_tokens": 0})
+        await ledger.stop()
+        return ledger.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["prompt_tokens"] == 1640 and stats["flushes"] == 2 and stats["pending_rows"] == 0
+    by_guild = report(path, by=["guild_id"], now=DAY)
+    assert [(r["guild_id"], r["prompt_tokens"], r["completion_tokens"], r["calls"]) for r in by_guild] == [
+        (7, 1510, 300, 3), (8, 100, 50, 1), (0, 30, 10, 1),
+    ]
+    assert by_guild[0]["cost_usd"] == estimate_cost("gpt-4o-mini", 1510, 300)
+    assert report(path, by=["persona", "user_id"], guild_id=8, now=DAY)[0]["persona"] == "developer"
+    assert report(path, now=DAY + 30 * 86400) == []
+
+    main(["--path", path, "--by", "channel_id,persona", "--days", "36500"])
+    out = capsys.readouterr().out
+    assert "channel_id" in out and "70" in out and "assistant" in out
+
+
+def test_budget_plans_tighten_and_survive_restarts(tmp_path):
+    path = str(tmp_path / "usage.sqlite3")
+    clock = Clock()
+
+    async def scenario():
+        ledger = UsageLedger(path=path, daily_tokens=1000, guild_budgets={9: 0}, clock=clock)
+        await ledger.start()
+        tiers = [ledger.plan(7).tier]
+        current_usage.set(UsageScope(7, 1, 1))
+        ledger.record("assistant", "gpt-3.5-turbo", {"prompt_tokens": 500, "completion_tokens": 100})
+        tiers.append(ledger.plan(7).tier)
+        ledger.record("assistant", "gpt-3.5-turbo", {"prompt_tokens": 250, "completion_tokens": 0})
+        tiers.append(ledger.plan(7).tier)
+        current_usage.set(UsageScope(9, 1, 1))
+        ledger.record("assistant", "gpt-3.5-turbo", {"prompt_tokens": 5000, "completion_tokens": 0})
+        tiers.append(ledger.plan(9).tier)
+        await ledger.stop()
+
+        # What was spent today still counts after a restart; a new UTC day starts from zero
+        ledger = UsageLedger(path=path, daily_tokens=1000, clock=clock)
+        await ledger.start()
+        tiers.append(ledger.plan(7).tier)
+        clock.now += 86400
+        tiers.append(ledger.plan(7).tier)
+        await ledger.stop()
+        return tiers
+
+    assert asyncio.run(scenario()) == ["normal", "reduced", "economy", "normal", "economy", "normal"]
+
+
+def test_economy_plan_caps_replies_and_uses_economy_backends():
+    sent = []
+
+    def executor(name):
+        async def post_json(session, url, payload, label, estimated_tokens=0, headers=None):
+            sent.append((name, payload["model"], payload["max_tokens"]))
+            return {"model": payload["model"], "choices": [{"message": {"content": "ok"}}],
+                    "usage": {"prompt_tokens": 100, "completion_tokens": 20}}
+        return SimpleNamespace(post_json=post_json)
+
+    ledger = UsageLedger(daily_tokens=1000)
+    client = OpenAIClient(api_key="x", usage=ledger, backends=BackendPool([
+        Backend("main", model="gpt-4o", executor=executor("main")),
+        Backend("cheap", model="gpt-4o-mini", roles=["economy"], executor=executor("cheap")),
+    ]))
+
+    async def ask(guild_id):
+        current_usage.set(ledger.scope(guild_id, 1, 1))
+        return await client.ask_chatgpt("hello there")
+
+    async def scenario():
+        await ask(7)
+        ledger._spent[7] = 900
+        await ask(7)
+        await ask(8)
+        await client.close()
+
+    asyncio.run(scenario())
+    assert sent == [("main", "gpt-4o", 256), ("cheap", "gpt-4o-mini", 128), ("main", "gpt-4o", 256)]
+    assert ledger.stats()["economy_replies"] == 1 and ledger._spent[8] == 120
+
+
+def test_over_budget_guild_without_economy_backend_uses_chat():
+    sent = []
+
+    async def post_json(session, url, payload, label, estimated_tokens=0, headers=None):
+        sent.append(payload["max_tokens"])
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+    async def open_stream(*args, **kwargs):
+        return None
+
+    ledger = UsageLedger(daily_tokens=100)
+    ledger._spent[7] = 95
+    pool = BackendPool([Backend("main", executor=SimpleNamespace(post_json=post_json, open=open_stream))])
+    client = OpenAIClient(api_key="x", usage=ledger, backends=pool)
+
+    async def scenario():
+        current_usage.set(ledger.scope(7, 1, 1))
+        reply = await client.ask_chatgpt("hello there")
+        streamed = [delta async for delta in client.stream_chatgpt("hello there")]
+        await client.close()
+        return reply, streamed
+
+    reply, streamed = asyncio.run(scenario())
+    assert reply == "ok" and streamed == [] and sent == [128]
+    stats = pool.stats()
+    assert stats["main/chat"]["requests"] == 2 and "main/economy" not in stats
+
+
+def test_cached_and_merged_answers_are_not_charged_again():
+    calls = []
+
+    async def post_json(session, url, payload, label, estimated_tokens=0, headers=None):
+        calls.append(label)
+        await asyncio.sleep(0.01)
+        return {"choices": [{"message": {"content": "developer"}}], "usage": {"prompt_tokens": 40, "completion_tokens": 2}}
+
+    ledger = UsageLedger()
+    pool = BackendPool([Backend("main", executor=SimpleNamespace(post_json=post_json))])
+    client = OpenAIClient(api_key="x", usage=ledger, backends=pool, response_cache=ResponseCache())
+
+    async def scenario():
+        current_usage.set(ledger.scope(7, 1, 1))
+        # Two identical calls in flight merge onto one request; the third is a cache hit
+        merged = await asyncio.gather(client.ask_router_persona("fix my build"), client.ask_router_persona("fix my build"))
+        cached = await client.ask_router_persona("fix my build")
+        await client.close()
+        return merged, cached
+
+    merged, cached = asyncio.run(scenario())
+    assert merged == ["DEVELOPER", "DEVELOPER"] and cached == "DEVELOPER" and len(calls) == 1
+    assert ledger._spent[7] == 42 and ledger.stats()["prompt_tokens"] == 40
+    assert client.response_cache.stats()["merged"] == 1 and client.response_cache.stats()["hits"] == 1